@@ -0,0 +1,207 @@
+# accounts/activation_service.py
+
+"""
+accounts.activation_service モジュール
+
+アカウント有効化のサービス層。
+
+有効化リンクのトークンはユーザーの状態（パスワード・最終ログイン・is_active など）に結び付いている
+（accounts.tokens.ActivationTokenGenerator）。検証に必要な列だけを SELECT し、
+「未有効化・未ログインで、検証時とパスワードが同じ行だけを更新する」条件付き UPDATE で有効化して、
+更新件数で成否を判定する。ユーザー全体を save() し直すことはしない。
+（同じリンクへの同時アクセスでも、更新できるのは 1 リクエストだけになる）
+
+含まれる主な関数:
+- activate_account: 有効化リンク（uidb64 / token）からアカウントを有効化
+- aactivate_account: activate_account() の非同期版（ASGI 用）
+- activate_pending_accounts: 未認証アカウントをチャンク単位で一括有効化
+- expire_pending_accounts: 期限切れの未認証アカウントをチャンク単位で一括削除
+"""
+
+import copy
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.db import router, transaction
+from django.utils.http import urlsafe_base64_decode
+
+from .authentication import invalidate_users
+from .routers import pin_to_primary
+from .sharding import adb_for_user_id, db_for_user_id, use_shard
+from .tokens import check_activation_token
+
+User = get_user_model()
+
+ACTIVATED = "activated"
+ALREADY_ACTIVE = "already_active"
+INVALID = "invalid"
+
+# 有効化トークンの検証に使う列
+TOKEN_FIELDS = ("pk", "email", "password", "last_login", "is_active")
+
+
+def pending_accounts():
+    """
+    未認証アカウント（未有効化・未ログイン）のクエリセット。
+    管理者が無効化したアカウント（ログイン履歴あり）は含めない。
+    """
+    return User.objects.filter(is_active=False, last_login__isnull=True)
+
+
+def _invalidate_after_commit(pks):
+    """
+    is_active を QuerySet.update() で変えたユーザーを、トークン認証キャッシュから捨てる（post_save は送られない）。
+    コミット前に捨てると、他のリクエストが古い状態をキャッシュし直すことがあるので、コミット後に行う。
+    """
+    transaction.on_commit(lambda: invalidate_users(pks), using=router.db_for_write(User))
+
+
+def _parse_uid(uidb64):
+    try:
+        return int(urlsafe_base64_decode(uidb64).decode())
+    except (TypeError, ValueError, OverflowError, UnicodeDecodeError):
+        return None
+
+
+def activate_account(uidb64, token):
+    """
+    有効化リンクのパラメータを検証してアカウントを有効化する。
+    シャーディング有効時は UserDirectory で引いたユーザーのシャードで実行する。
+
+    Returns:
+        str: ACTIVATED（有効化した）/ ALREADY_ACTIVE（有効化済み）/ INVALID（リンクが無効）
+    """
+    uid = _parse_uid(uidb64)
+    if uid is None:
+        return INVALID
+    with use_shard(db_for_user_id(uid)):
+        return _activate(uid, token)
+
+
+def _verify(user, token):
+    """
+    トークンを検証する。有効化できるなら None、できなければ ALREADY_ACTIVE / INVALID を返す。
+    """
+    if user is None:
+        return INVALID
+    if user.is_active:
+        # 有効化でトークンは一致しなくなる。有効化前の状態で一致すれば、使用済みのリンクへの再アクセス
+        before = copy.copy(user)
+        before.is_active = False
+        return ALREADY_ACTIVE if check_activation_token(before, token) else INVALID
+    if user.last_login is not None:
+        # 管理者が無効化したアカウント
+        return INVALID
+    # 旧形式（default_token_generator）のリンクも受け付ける
+    if check_activation_token(user, token) or default_token_generator.check_token(user, token):
+        return None
+    return INVALID
+
+
+def _verified_pending(user):
+    """検証したときの状態のままの未認証アカウント（検証後のパスワード変更・有効化・ログインを除く）"""
+    return pending_accounts().filter(pk=user.pk, password=user.password)
+
+
+def _activate(uid, token):
+    user = User.objects.only(*TOKEN_FIELDS).filter(pk=uid).first()
+    result = _verify(user, token)
+    if result is not None:
+        return result
+
+    if _verified_pending(user).update(is_active=True):
+        _invalidate_after_commit([uid])
+        pin_to_primary()  # 直後のログインが遅れたレプリカで「未有効化」を読まないように
+        return ACTIVATED
+    # 同じリンクへの同時アクセスで先に有効化された場合など
+    if User.objects.filter(pk=uid, is_active=True).exists():
+        return ALREADY_ACTIVE
+    return INVALID
+
+
+async def aactivate_account(uidb64, token):
+    """activate_account() の非同期版"""
+    uid = _parse_uid(uidb64)
+    if uid is None:
+        return INVALID
+    with use_shard(await adb_for_user_id(uid)):
+        return await _aactivate(uid, token)
+
+
+async def _aactivate(uid, token):
+    user = await User.objects.only(*TOKEN_FIELDS).filter(pk=uid).afirst()
+    result = _verify(user, token)
+    if result is not None:
+        return result
+
+    if await _verified_pending(user).aupdate(is_active=True):
+        # 自動コミットの UPDATE なので、コミット済み
+        await sync_to_async(invalidate_users)([uid])
+        pin_to_primary()
+        return ACTIVATED
+    if await User.objects.filter(pk=uid, is_active=True).aexists():
+        return ALREADY_ACTIVE
+    return INVALID
+
+
+def _process_in_chunks(queryset, chunk_size, apply):
+    """
+    queryset の主キーを chunk_size 件ずつ取り出し、チャンクごとのトランザクションで apply を実行する。
+    長時間のロックを避けるため、1 トランザクションで扱うのは 1 チャンクだけにする。
+    シャーディング有効時は use_shard() で対象のシャードを選んでから呼び出す。
+
+    Returns:
+        int: 処理した件数
+    """
+    total = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+        )
+        if not pks:
+            return total
+        last_pk = pks[-1]
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            total += apply(pks)
+
+
+def activate_pending_accounts(queryset=None, chunk_size=1000):
+    """
+    未認証アカウントを chunk_size 件ずつ一括有効化する。
+
+    Args:
+        queryset (QuerySet, optional): 対象の絞り込み（省略時は未認証アカウントすべて）
+        chunk_size (int): 1 トランザクションで更新する件数
+
+    Returns:
+        int: 有効化した件数
+    """
+    queryset = pending_accounts() if queryset is None else queryset & pending_accounts()
+
+    def activate(pks):
+        # 条件を UPDATE にも含め、取り出し後に有効化・ログインされた行は更新しない
+        updated = pending_accounts().filter(pk__in=pks).update(is_active=True)
+        _invalidate_after_commit(pks)
+        return updated
+
+    return _process_in_chunks(queryset, chunk_size, activate)
+
+
+def expire_pending_accounts(joined_before, queryset=None, chunk_size=1000):
+    """
+    joined_before より前に登録された未認証アカウントを chunk_size 件ずつ削除する。
+    プロフィールなど関連する行も連鎖削除される。
+
+    Returns:
+        int: 削除したアカウントの件数
+    """
+    queryset = pending_accounts() if queryset is None else queryset & pending_accounts()
+    queryset = queryset.filter(date_joined__lt=joined_before)
+
+    def delete(pks):
+        _, deleted = pending_accounts().filter(pk__in=pks).delete()
+        return deleted.get(User._meta.label, 0)
+
+    return _process_in_chunks(queryset, chunk_size, delete)
@@ -0,0 +1,204 @@
+# accounts/admission.py
+
+"""
+accounts.admission モジュール
+
+パスワードのハッシュ化・照合を伴う重いエンドポイント（ログイン・サインアップ）の同時実行数を
+プロセスごとに制限する（accounts.middleware.AdmissionControlMiddleware が使う）。
+
+- 同時に実行できるのは ADMISSION_MAX_CONCURRENT 件まで。超えた分は最大 ADMISSION_MAX_QUEUE 件まで待たせ、
+  空きができたら到着順に実行する
+- 待ち行列が満杯のリクエストと、ADMISSION_QUEUE_TIMEOUT 秒待っても空かなかったリクエストは
+  すぐに 503（Retry-After 付き）を返す
+ログインが殺到してもワーカーのスレッドを使い切らず、me/ などの軽いリクエストを処理し続けられる。
+
+含まれる主な関数・クラス:
+- AdmissionLimiter: 同時実行数の上限と待ち行列（スレッド・イベントループのどちらからも使える）
+- get_limiter: プロセス内で共有するリミッター
+- is_limited: 制限の対象のリクエストか
+- get_admission_stats: 実行中・待機中の件数と受け付け・拒否の回数
+"""
+
+import asyncio
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+OVERLOADED_ERROR = {"detail": "混雑しています。しばらくしてから再試行してください。"}
+
+
+class _Waiter:
+    """待ち行列の 1 件。release() から実行枠を渡されると granted が True になる"""
+
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class AdmissionLimiter:
+    """
+    同時実行数の上限（max_concurrent）と長さの上限付きの待ち行列（max_queue）。
+
+    acquire() / aacquire() が True を返したら処理を実行し、終わったら release() を呼ぶ。
+    False（待ち行列が満杯・待ち時間切れ）なら実行せずに 503 を返す。
+    release() は空いた枠を待ち行列の先頭に直接渡すので、後から来たリクエストが割り込むことはない。
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._in_flight = 0
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0, "max_queue_depth": 0}
+
+    def _enter(self, waiter_factory):
+        """
+        ロックを取って枠を確保する。戻り値: True（すぐ実行できる）/ False（満杯で拒否）/ _Waiter（待つ）
+        """
+        with self._lock:
+            if self._in_flight < self.max_concurrent and not self._waiters:
+                self._in_flight += 1
+                self._stats["admitted"] += 1
+                return True
+            if len(self._waiters) >= self.max_queue or self.queue_timeout <= 0:
+                self._stats["rejected_queue_full"] += 1
+                return False
+            waiter = waiter_factory()
+            self._waiters.append(waiter)
+            self._stats["queued"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiters))
+            return waiter
+
+    def _abandon(self, waiter, timed_out):
+        """
+        待つのをやめる。直前に枠を渡されていたら True（タイムアウトなら実行する、キャンセルなら返却する）
+        """
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                if timed_out:
+                    self._stats["rejected_timeout"] += 1
+                return False
+        if not timed_out:
+            self.release()
+        return True
+
+    def acquire(self):
+        """実行枠を確保する（空くまで最長 queue_timeout 秒待つ）"""
+        waiter = self._enter(_Waiter)
+        if not isinstance(waiter, _Waiter):
+            return waiter
+        if waiter.event.wait(self.queue_timeout):
+            return True
+        return self._abandon(waiter, timed_out=True)
+
+    async def aacquire(self):
+        """acquire() の非同期版（待っている間イベントループを止めない）"""
+        loop = asyncio.get_running_loop()
+        waiter = self._enter(lambda: _Waiter(loop))
+        if not isinstance(waiter, _Waiter):
+            return waiter
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            return True
+        except TimeoutError:
+            return self._abandon(waiter, timed_out=True)
+        except asyncio.CancelledError:
+            # クライアントの切断など。渡された枠があれば次の待機者に回す
+            self._abandon(waiter, timed_out=False)
+            raise
+
+    def release(self):
+        """枠を返す。待っているリクエストがあれば先頭に枠を渡す"""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self._stats["admitted"] += 1
+                waiter.wake()
+            else:
+                self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                **self._stats,
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def _default_concurrency():
+    # ハッシュ化は CPU を占有するので、同時に計算できる数（プロセスプールの大きさ、なければ CPU 数）に合わせる
+    return getattr(settings, "PASSWORD_HASH_WORKERS", None) or os.cpu_count() or 1
+
+
+def get_limiter():
+    """ADMISSION_* の設定に従ったリミッター（プロセス内で 1 つ）"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                max_concurrent = getattr(settings, "ADMISSION_MAX_CONCURRENT", None) or _default_concurrency()
+                max_queue = getattr(settings, "ADMISSION_MAX_QUEUE", None)
+                _limiter = AdmissionLimiter(
+                    max_concurrent,
+                    max_concurrent * 2 if max_queue is None else max_queue,
+                    getattr(settings, "ADMISSION_QUEUE_TIMEOUT", 2.0),
+                )
+    return _limiter
+
+
+@receiver(setting_changed)
+def _reset_limiter(*, setting, **kwargs):
+    """テストなどで設定が変わったらリミッターを作り直す"""
+    global _limiter
+    if setting.startswith("ADMISSION_") or setting == "PASSWORD_HASH_WORKERS":
+        with _limiter_lock:
+            _limiter = None
+
+
+def is_limited(request):
+    """制限の対象: ADMISSION_PATHS で始まるパスへの POST"""
+    if request.method != "POST":
+        return False
+    return request.path.startswith(tuple(getattr(settings, "ADMISSION_PATHS", [])))
+
+
+def overloaded_response():
+    """受け付けられなかったリクエストへの 503"""
+    response = JsonResponse(OVERLOADED_ERROR, status=503)
+    response["Retry-After"] = str(getattr(settings, "ADMISSION_RETRY_AFTER", 1))
+    return response
+
+
+def get_admission_stats():
+    """実行中・待機中の件数と、受け付け・待機・拒否（満杯 / 待ち時間切れ）の回数（このプロセスの値）"""
+    return get_limiter().stats()
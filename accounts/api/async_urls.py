@@ -0,0 +1,46 @@
+# accounts/api/async_urls.py (ASGI 用)
+# サインアップ・認証・ログイン・ログアウト・エクスポートを非同期ビューに差し替えた URLconf。
+# その他のエンドポイントは同期版（urls.py）と共通。
+from django.urls import path
+from . import async_views
+from .views import (
+    AdmissionStatsView,
+    AvatarView,
+    CustomerDirectoryView,
+    EmployeeBulkSignupView,
+    EmployeeDirectoryView,
+    MeView,
+    ProfileSearchView,
+    TokenCacheStatsView,
+)
+
+app_name = "accounts"
+
+urlpatterns = [
+    # サインアップ (API)
+    path("signup/customer/", async_views.CustomerSignupView.as_view(), name="signup_customer"),
+    path("signup/employee/", async_views.EmployeeSignupView.as_view(), name="signup_employee"),
+    path("signup/employee/bulk/", EmployeeBulkSignupView.as_view(), name="signup_employee_bulk"),
+    path("signup/sns/", async_views.SNSSignupView.as_view(), name="signup_sns"),
+
+    # メール認証 (API)
+    path("activate/<uidb64>/<token>/", async_views.ActivateAccountView.as_view(), name="activate"),
+
+    # ログイン / ログアウト (API)
+    path("login/", async_views.LoginView.as_view(), name="login_api"),
+    path("logout/", async_views.LogoutView.as_view(), name="logout_api"),
+    path("me/", MeView.as_view(), name="me"),
+    path("me/avatar/", AvatarView.as_view(), name="avatar"),
+
+    # 統計 (API, 管理者のみ)
+    path("stats/token-cache/", TokenCacheStatsView.as_view(), name="token_cache_stats"),
+    path("stats/admission/", AdmissionStatsView.as_view(), name="admission_stats"),
+
+    # 一覧 (API, 管理者のみ)
+    path("employees/", EmployeeDirectoryView.as_view(), name="employee_directory"),
+    path("customers/", CustomerDirectoryView.as_view(), name="customer_directory"),
+    path("search/", ProfileSearchView.as_view(), name="profile_search"),
+
+    # エクスポート (API, 管理者のみ)
+    path("export/users/", async_views.UserExportView.as_view(), name="user_export"),
+]
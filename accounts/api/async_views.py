@@ -0,0 +1,261 @@
+"""
+accounts.api.async_views モジュール
+
+accounts.api.views の非同期（ASGI）版。ACCOUNTS_API_ASYNC=True のときに async_urls から使われる。
+
+DRF の APIView は同期ビューのため、ASGI ではリクエストごとに sync_to_async のスレッド切り替えが入る。
+ここでは Django の非同期ビューと非同期 ORM（aget / adelete など）で実装し、
+パスワードのハッシュ化はハッシュエグゼキュータの amake_password / acheck_password で
+イベントループの外で実行する。入力の検証には同期版と同じシリアライザを使う。
+
+含まれる主なクラス:
+- CustomerSignupView / EmployeeSignupView / SNSSignupView: 新規ユーザー登録
+- ActivateAccountView: 認証
+- LoginView: ログイン
+- LogoutView: ログアウト（Authorization ヘッダーのトークンで認証）
+- UserExportView: ユーザーとプロフィールの全件エクスポート（管理者のみ）
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import alogout, get_user_model
+from django.core import signing
+from django.db import IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+
+from .serializers import (
+    CustomerSignupSerializer,
+    EmployeeSignupSerializer,
+    SNSSignupSerializer,
+    UserExportQuerySerializer,
+)
+from ..activation_service import ACTIVATED, ALREADY_ACTIVE, aactivate_account
+from ..export_service import aiter_export, content_type, export_filename
+from ..hashing import get_hash_executor
+from ..models import CustomerProfile, EmployeeProfile, SNSProfile
+from ..sharding import adb_for_user_id, bind_user, user_databases
+from ..signup_service import is_duplicate_email, signup_account
+from ..token_service import aobtain_token, arefresh_token_expiry, is_token_expired
+from ..tokens import (
+    arevoke_access_tokens,
+    averify_access_token,
+    get_max_age,
+    get_token_mode,
+    issue_access_token,
+)
+
+User = get_user_model()
+
+DUPLICATE_EMAIL_ERROR = {"email": ["このメールアドレスは既に登録されています。"]}
+
+
+def _parse_body(request):
+    """JSON またはフォーム形式のリクエストボディを dict で返す（解析できなければ None）"""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+def _bad_request(detail="リクエストの形式が不正です。"):
+    return JsonResponse({"detail": detail}, status=400)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class BaseSignupView(View):
+    """
+    サインアップの共通処理（非同期版）。
+
+    パスワードはハッシュエグゼキュータの amake_password でイベントループの外でハッシュ化し、
+    ユーザー・プロフィール・有効化メールのアウトボックスは同期版と同じ signup_service.signup_account で
+    1 トランザクションで作成する（非同期 ORM ではトランザクションを張れないため sync_to_async で呼ぶ）。
+    メールアドレスの重複は INSERT 時の一意制約違反で検出する（それ以外の制約違反は 400 にせず送出する）。
+    """
+
+    serializer_class = None
+    profile_model = None
+
+    async def post(self, request):
+        data = _parse_body(request)
+        if data is None:
+            return _bad_request()
+        serializer = self.serializer_class(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        validated = serializer.validated_data
+
+        password_hash = await get_hash_executor().amake_password(validated["password"])
+        try:
+            await sync_to_async(signup_account)(request, validated, self.profile_model, password_hash=password_hash)
+        except IntegrityError as exc:
+            if not is_duplicate_email(exc):
+                raise
+            return JsonResponse(DUPLICATE_EMAIL_ERROR, status=400)
+        return JsonResponse(serializer.data, status=201)
+
+
+class CustomerSignupView(BaseSignupView):
+    serializer_class = CustomerSignupSerializer
+    profile_model = CustomerProfile
+
+
+class EmployeeSignupView(BaseSignupView):
+    serializer_class = EmployeeSignupSerializer
+    profile_model = EmployeeProfile
+
+
+class SNSSignupView(BaseSignupView):
+    serializer_class = SNSSignupSerializer
+    profile_model = SNSProfile
+
+
+class ActivateAccountView(View):
+    async def get(self, request, uidb64, token):
+        result = await aactivate_account(uidb64, token)
+        if result == ACTIVATED:
+            return JsonResponse({"detail": "アカウントが有効化されました。"}, status=200)
+        elif result == ALREADY_ACTIVE:
+            return JsonResponse({"detail": "アカウントは既に有効化されています。"}, status=200)
+        else:
+            return JsonResponse({"detail": "リンクが無効または期限切れです。"}, status=400)
+
+
+async def _aauthenticate(email, password):
+    """
+    ModelBackend と同じ手順でメールアドレスとパスワードを照合する。
+    （django.contrib.auth.aauthenticate はハッシュ計算をイベントループ上で行うため使わない）
+    """
+    try:
+        user = await User.objects.aget_by_natural_key(email)
+    except User.DoesNotExist:
+        # ユーザーの有無で応答時間に差が出ないよう、存在しない場合もハッシュ計算を行う
+        await get_hash_executor().amake_password(password)
+        return None
+    if await user.acheck_password(password) and user.is_active:
+        return user
+    return None
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class LoginView(View):
+    """
+    ユーザー名 / メールアドレス + パスワードで認証してトークンを返す
+    """
+
+    async def post(self, request):
+        data = _parse_body(request)
+        if data is None:
+            return _bad_request()
+        email, password = data.get("username"), data.get("password")
+        if not email or not password:
+            return JsonResponse(
+                {"non_field_errors": ["「ユーザー名」と「パスワード」を含めてください。"]}, status=400
+            )
+
+        user = await _aauthenticate(email, password)
+        if user is None:
+            return JsonResponse(
+                {"non_field_errors": ["提供された認証情報でログインできません。"]}, status=400
+            )
+
+        if get_token_mode() == "signed":
+            return JsonResponse({
+                "token": issue_access_token(user),
+                "token_type": "Bearer",
+                "expires_in": get_max_age(),
+                "user_id": user.id,
+                "email": user.email,
+            })
+
+        token = await aobtain_token(user)
+        return JsonResponse({
+            "token": token.key,
+            "token_type": "Token",
+            "user_id": user.id,
+            "email": user.email,
+        })
+
+
+async def _aauthenticate_token(request):
+    """Authorization ヘッダー（Token / Bearer）からユーザーを取得する。認証できなければ None"""
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    key = key.strip()
+    if not key:
+        return None
+
+    if keyword == "Token":
+        token = None
+        # シャーディング有効時はトークンのシャードが分からないので順に引く
+        for database in user_databases():
+            token = await Token.objects.using(database).select_related("user").filter(key=key).afirst()
+            if token is not None:
+                break
+        if token is None:
+            return None
+        if is_token_expired(token):
+            await token.adelete()
+            return None
+        await arefresh_token_expiry(token)
+        user = token.user
+    elif keyword == "Bearer":
+        try:
+            user_id = await averify_access_token(key)
+        except signing.BadSignature:
+            return None
+        user = await User.objects.using(await adb_for_user_id(user_id)).filter(pk=user_id).afirst()
+    else:
+        return None
+    if user is None or not user.is_active:
+        return None
+    bind_user(user)
+    return user
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class LogoutView(View):
+    """
+    認証済みユーザーのトークンを削除してログアウト
+    署名付きトークンはユーザー単位で失効させる
+    """
+
+    async def post(self, request):
+        user = await _aauthenticate_token(request)
+        if user is None:
+            return JsonResponse({"detail": "認証情報が含まれていません。"}, status=401)
+
+        await Token.objects.filter(user=user).adelete()  # Tokenを削除
+        await arevoke_access_tokens(user.pk)  # 署名付きトークンを失効
+        if hasattr(request, "session"):  # API 専用プロファイルにはセッションがない
+            await alogout(request)  # Sessionも削除（必要であれば）
+        return JsonResponse({"detail": "ログアウトしました。"}, status=200)
+
+
+class UserExportView(View):
+    """
+    ユーザーとプロフィールの全件エクスポート（管理者のみ）。
+    ASGI では同期のイテレータを StreamingHttpResponse に渡すと全体がメモリに読み込まれてから
+    送られるため、非同期 ORM（aiterator）で読み出す aiter_export() を渡す。
+    """
+
+    async def get(self, request):
+        user = await _aauthenticate_token(request)
+        if user is None:
+            return JsonResponse({"detail": "認証情報が含まれていません。"}, status=401)
+        if not user.is_staff:
+            return JsonResponse({"detail": "このアクションを実行する権限がありません。"}, status=403)
+
+        params = UserExportQuerySerializer(data=request.GET)
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=400)
+        output = params.validated_data["output"]
+        response = StreamingHttpResponse(aiter_export(output), content_type=content_type(output))
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(output)}"'
+        return response
@@ -0,0 +1,202 @@
+"""
+accounts.api.pagination モジュール
+
+キーセット（シーク）方式のページネーション。
+
+OFFSET は読み飛ばす行をすべて走査するため、深いページほど遅くなる。
+ここでは前ページ最後の行の並び順キーをカーソルに入れ、次ページを
+「キーがそれより後ろの行」として取得する（インデックスの範囲走査で済むので、どのページも同じ速さ）。
+
+含まれる主なクラス:
+- KeysetPagination: ?ordering= / ?cursor= / ?limit= を受け付ける前方向のみのページネーション
+- EmployeeDirectoryPagination / CustomerDirectoryPagination: 従業員名簿・顧客一覧の並び順
+"""
+
+import base64
+import binascii
+import json
+from functools import cmp_to_key
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from ..sharding import user_databases
+
+
+class KeysetPagination(BasePagination):
+    """
+    サブクラスの orderings（?ordering= の名前 → フィールド名のタプル、先頭 "-" で降順）の並び順で
+    キーセットページネーションを行う。各並び順の最後のフィールドは一意でなければならない。
+    並び順ごとに、絞り込み条件 + 並び順のフィールドの複合インデックスを用意しておくこと。
+
+    NULL を許すフィールドは昇順・降順とも NULL を先頭に並べる（データベースによらず同じ順序で、
+    カーソル以降の条件がインデックスの範囲検索になる）。
+    シャーディング有効時は各シャードから 1 ページ分ずつ取得してマージする。
+
+    レスポンス: {"next": 次ページの URL（最後のページは null）, "results": [...]}
+    """
+
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    limit_query_param = "limit"
+    orderings = {}
+    default_ordering = None
+    invalid_cursor_message = "カーソルが正しくありません。"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering_name = self._get_ordering_name(request)
+        self.ordering = [self._parse_field(queryset.model, name) for name in self.orderings[self.ordering_name]]
+        limit = self._get_limit(request)
+        after = self._decode_cursor(request)
+
+        queryset = queryset.order_by(*self._order_by())
+        if after is not None:
+            queryset = queryset.filter(self._after(after))
+
+        databases = user_databases()
+        rows = []
+        for database in databases:
+            rows += list(queryset.using(database)[: limit + 1])
+        if len(databases) > 1:
+            rows.sort(key=cmp_to_key(self._compare))
+
+        page = rows[:limit]
+        self.next_key = self._key(page[-1]) if len(rows) > limit else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(self.next_key))
+
+    # --- 並び順 -------------------------------------------------------------
+
+    def _get_ordering_name(self, request):
+        name = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if name not in self.orderings:
+            raise ValidationError(
+                {self.ordering_query_param: [f"{', '.join(self.orderings)} のいずれかを指定してください。"]}
+            )
+        return name
+
+    def _get_limit(self, request):
+        page_size = getattr(settings, "DIRECTORY_PAGE_SIZE", 50)
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(max(limit, 1), getattr(settings, "DIRECTORY_MAX_PAGE_SIZE", 200))
+
+    @staticmethod
+    def _parse_field(model, name):
+        """"-hire_date" → (属性名, モデルのフィールド, 降順か)"""
+        descending = name.startswith("-")
+        field = model._meta.get_field(name.lstrip("-"))
+        return field.attname, field, descending
+
+    def _order_by(self):
+        expressions = []
+        for attname, field, descending in self.ordering:
+            nulls_first = True if field.null else None
+            expression = F(attname)
+            expressions.append(
+                expression.desc(nulls_first=nulls_first) if descending else expression.asc(nulls_first=nulls_first)
+            )
+        return expressions
+
+    def _after(self, values):
+        """キーが values より後ろの行の条件（(a, b, c) > (x, y, z) を展開したもの）"""
+        condition = None
+        for (attname, field, descending), value in reversed(list(zip(self.ordering, values))):
+            equal = Q(**{f"{attname}__isnull": True}) if value is None else Q(**{attname: value})
+            if value is None:
+                # NULL は先頭なので、NULL の後ろは NULL 以外すべて
+                greater = Q(**{f"{attname}__isnull": False})
+            else:
+                greater = Q(**{f"{attname}__lt" if descending else f"{attname}__gt": value})
+            condition = greater if condition is None else greater | (equal & condition)
+
+        # OR に展開した条件のままではインデックスの範囲検索にならないので、
+        # 先頭のフィールドの下限（降順なら上限）を冗長に加えてシーク位置を決める
+        attname, _, descending = self.ordering[0]
+        if values[0] is not None:
+            condition &= Q(**{f"{attname}__lte" if descending else f"{attname}__gte": values[0]})
+        return condition
+
+    def _key(self, obj):
+        return [getattr(obj, attname) for attname, _, _ in self.ordering]
+
+    def _compare(self, a, b):
+        """シャードをまたいだマージ用の比較（_order_by と同じ順序）"""
+        for (attname, _, descending), x, y in zip(self.ordering, self._key(a), self._key(b)):
+            if x == y:
+                continue
+            if x is None or y is None:
+                return -1 if x is None else 1  # NULL は常に先頭
+            result = -1 if x < y else 1
+            return -result if descending else result
+        return 0
+
+    # --- カーソル -----------------------------------------------------------
+
+    def _encode_cursor(self, key):
+        values = [None if value is None else str(value) for value in key]
+        payload = json.dumps([self.ordering_name, *values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+            name, *values = payload
+            if name != self.ordering_name or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for (_, field, _), value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class EmployeeDirectoryPagination(KeysetPagination):
+    """従業員名簿の並び順（インデックスは EmployeeProfile.Meta.indexes）"""
+
+    orderings = {
+        "name": ("lastname", "firstname", "user"),
+        "hire_date": ("hire_date", "user"),
+        "-hire_date": ("-hire_date", "-user"),
+    }
+    default_ordering = "name"
+
+
+class CustomerDirectoryPagination(KeysetPagination):
+    """顧客一覧の並び順（インデックスは CustomerProfile.Meta.indexes）"""
+
+    orderings = {
+        "name": ("lastname", "firstname", "user"),
+        "user_id": ("user",),
+    }
+    default_ordering = "name"
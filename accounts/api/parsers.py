@@ -0,0 +1,37 @@
+"""
+accounts.api.parsers
+---------------------------
+API で受け付ける追加のリクエスト形式を定義するモジュール。
+
+- NDJSONParser: 1 行 1 JSON オブジェクトの NDJSON (application/x-ndjson)
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    NDJSON をオブジェクトのリストとして読み込むパーサー。
+    リクエストボディを 1 行ずつ読むため、JSON 配列全体を文字列として保持しない。
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        rows = []
+        for lineno, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON の {lineno} 行目を解析できません: {exc}")
+        return rows
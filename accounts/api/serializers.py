@@ -7,6 +7,15 @@ accounts.api.serializers
 - CustomerSignupSerializer: 顧客用（現状は email, password のみ）
 - EmployeeSignupSerializer: 従業員用（部署・役職・入社日・資格情報を追加）
 - SNSSignupSerializer: SNSユーザー用（ニックネーム・自己紹介を追加）
+- EmployeeBulkSignupSerializer: 従業員一括登録用（1 行分の検証）
+- CustomerImportSerializer / EmployeeImportSerializer / SNSImportSerializer: 移行データの取り込み用（1 行分の検証）
+- EmployeeDirectorySerializer / CustomerDirectorySerializer: 従業員名簿・顧客一覧 API 用（?fields= で項目を絞り込み）
+- EmployeeDirectoryFilterSerializer / CustomerDirectoryFilterSerializer: 一覧 API の絞り込み条件
+- AvatarField: アバター画像（元画像と縮小版）の URL
+- SNSProfileSerializer: SNS プロフィール（検索・アバター API 用）
+- AvatarUploadSerializer: アバター画像のアップロード
+- ProfileSearchQuerySerializer: 検索 API のクエリパラメータ
+- UserExportQuerySerializer: エクスポート API のクエリパラメータ
 
 今後、用途に応じたサインアップ処理を拡張する際の基盤となる。
 """
@@ -14,9 +23,18 @@ accounts.api.serializers
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.db import IntegrityError
+
+from ..models import CustomerProfile, EmployeeProfile, SNSProfile
+from ..export_service import FORMATS
+from ..search import SEARCH_INDEXES
+from ..signup_service import is_duplicate_email, signup_account
 
 User = get_user_model()
 
+DUPLICATE_EMAIL_MESSAGE = "このメールアドレスは既に登録されています。"
+
 
 class BaseSignupSerializer(serializers.ModelSerializer):
     """
@@ -31,13 +49,26 @@ class BaseSignupSerializer(serializers.ModelSerializer):
         model = User
         # email + password を基本とする
         fields = ("email", "password")
+        # モデルの UniqueValidator（email = ? の完全一致、default データベースのみ）は使わない
+        extra_kwargs = {"email": {"validators": []}}
+
+    # サインアップで作成するプロフィールのモデル
+    profile_model = None
 
     def create(self, validated_data):
         """
-        UserManager の create_user() を使ってユーザーを作成する。
-        （パスワードのハッシュ化も自動で処理される）
+        signup_service.signup_account() でユーザーとプロフィール（と有効化メール）を
+        1 トランザクションで作成する。
+        メールアドレスの重複は事前に確認せず、INSERT 時の一意制約（LOWER(email)）の違反で検出する
+        （シャーディング有効時も、大文字・小文字だけが違うメールアドレスは同じシャードに入る）。
         """
-        return User.objects.create_user(**validated_data)
+        try:
+            return signup_account(self.context.get("request"), validated_data, self.profile_model)
+        except IntegrityError as exc:
+            # メールアドレス以外の制約違反はバグなので 400 にせずそのまま送出する
+            if not is_duplicate_email(exc):
+                raise
+            raise serializers.ValidationError({"email": [DUPLICATE_EMAIL_MESSAGE]})
 
 
 class CustomerSignupSerializer(BaseSignupSerializer):
@@ -46,6 +77,8 @@ class CustomerSignupSerializer(BaseSignupSerializer):
     現時点では email と password 以外の項目は追加しない。
     """
 
+    profile_model = CustomerProfile
+
     class Meta(BaseSignupSerializer.Meta):
         # email, password に加えて email を明示（重複だが将来の拡張を想定）
         fields = BaseSignupSerializer.Meta.fields + ("email",)
@@ -57,6 +90,8 @@ class EmployeeSignupSerializer(BaseSignupSerializer):
     部署・役職・入社日・資格情報などを追加で受け付ける。
     """
 
+    profile_model = EmployeeProfile
+
     department = serializers.CharField(required=False, allow_blank=True)
     position = serializers.CharField(required=False, allow_blank=True)
     hire_date = serializers.DateField(required=False, allow_null=True)
@@ -78,6 +113,8 @@ class SNSSignupSerializer(BaseSignupSerializer):
     ニックネームと自己紹介文を追加で受け付ける。
     """
 
+    profile_model = SNSProfile
+
     nickname = serializers.CharField(required=False, allow_blank=True)
     bio = serializers.CharField(required=False, allow_blank=True)
 
@@ -86,3 +123,232 @@ class SNSSignupSerializer(BaseSignupSerializer):
         fields = BaseSignupSerializer.Meta.fields + ("nickname", "bio")
 
 
+class EmployeeBulkSignupSerializer(EmployeeSignupSerializer):
+    """
+    従業員一括登録用のシリアライザ（1 行分）。
+    email の重複チェックは行ごとにクエリを発行しないよう、
+    サービス層（signup_service.bulk_signup_employees）でまとめて行う。
+    """
+
+
+class AccountImportSerializer(serializers.Serializer):
+    """
+    移行データの取り込み（import_accounts コマンド）用の共通処理。各サインアップシリアライザと組み合わせて使う。
+
+    - パスワードは平文の password か、ハッシュ済みの password_hash（PASSWORD_HASHERS の形式）のどちらか
+    - email の重複チェックはサービス層（signup_service.import_accounts）でチャンクごとにまとめて行う
+    """
+
+    password = serializers.CharField(write_only=True, required=False)
+    password_hash = serializers.CharField(write_only=True, required=False)
+
+    def validate_password_hash(self, value):
+        try:
+            identify_hasher(value)
+        except ValueError:
+            raise serializers.ValidationError("対応していない形式のパスワードハッシュです。")
+        return value
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if ("password" in attrs) == ("password_hash" in attrs):
+            raise serializers.ValidationError("password か password_hash のどちらか一方を指定してください。")
+        return attrs
+
+
+class CustomerImportSerializer(AccountImportSerializer, CustomerSignupSerializer):
+    """顧客の移行データ（1 行分）。サインアップでは受け付けない氏名・連絡先も取り込む"""
+
+    firstname = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    lastname = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    postcode = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    address = serializers.CharField(required=False, allow_blank=True)
+    phone_number = serializers.CharField(max_length=20, required=False, allow_blank=True)
+
+    class Meta(CustomerSignupSerializer.Meta):
+        fields = ("email", "password", "password_hash", "firstname", "lastname", "postcode", "address", "phone_number")
+        extra_kwargs = {"email": {"validators": []}}
+
+
+class EmployeeImportSerializer(AccountImportSerializer, EmployeeSignupSerializer):
+    """従業員の移行データ（1 行分）。サインアップでは受け付けない氏名も取り込む"""
+
+    firstname = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    lastname = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+    class Meta(EmployeeSignupSerializer.Meta):
+        fields = EmployeeSignupSerializer.Meta.fields + ("password_hash", "firstname", "lastname")
+        extra_kwargs = {"email": {"validators": []}}
+
+
+class SNSImportSerializer(AccountImportSerializer, SNSSignupSerializer):
+    """SNS ユーザーの移行データ（1 行分）"""
+
+    class Meta(SNSSignupSerializer.Meta):
+        fields = SNSSignupSerializer.Meta.fields + ("password_hash",)
+        extra_kwargs = {"email": {"validators": []}}
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=a,b,c で返す項目を絞り込む（スパースフィールドセット）。
+    指定が無ければすべての項目を返す。知らない項目名は無視する。
+    """
+
+    fields_query_param = "fields"
+
+    @classmethod
+    def requested_fields(cls, request):
+        """リクエストで指定された項目名（Meta.fields の並び順、指定なしは None）"""
+        value = request.query_params.get(cls.fields_query_param) if request is not None else None
+        if not value:
+            return None
+        names = {name.strip() for name in value.split(",")}
+        return [name for name in cls.Meta.fields if name in names]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.requested_fields(self.context.get("request"))
+        if requested is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested}
+
+
+class EmployeeDirectorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    従業員名簿（一覧 API）の 1 件分。
+    """
+
+    user_id = serializers.IntegerField(read_only=True)
+    email = serializers.EmailField(source="user.email", read_only=True)
+
+    class Meta:
+        model = EmployeeProfile
+        fields = (
+            "user_id",
+            "email",
+            "lastname",
+            "firstname",
+            "department",
+            "position",
+            "hire_date",
+            "qualifications",
+        )
+        read_only_fields = fields
+
+
+class CustomerDirectorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    顧客一覧 API の 1 件分。
+    """
+
+    user_id = serializers.IntegerField(read_only=True)
+    email = serializers.EmailField(source="user.email", read_only=True)
+
+    class Meta:
+        model = CustomerProfile
+        fields = (
+            "user_id",
+            "email",
+            "lastname",
+            "firstname",
+            "postcode",
+            "address",
+            "phone_number",
+        )
+        read_only_fields = fields
+
+
+class EmployeeDirectoryFilterSerializer(serializers.Serializer):
+    """
+    従業員名簿の絞り込み条件（クエリパラメータ）。入社日は両端を含む。
+    """
+
+    department = serializers.CharField(required=False)
+    position = serializers.CharField(required=False)
+    hired_from = serializers.DateField(required=False)
+    hired_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if "hired_from" in attrs and "hired_to" in attrs and attrs["hired_from"] > attrs["hired_to"]:
+            raise serializers.ValidationError({"hired_to": "hired_from 以降の日付を指定してください。"})
+        return attrs
+
+
+class CustomerDirectoryFilterSerializer(serializers.Serializer):
+    """
+    顧客一覧の絞り込み条件（クエリパラメータ）。
+    """
+
+    lastname = serializers.CharField(required=False)
+
+
+class AvatarField(serializers.Field):
+    """
+    SNS プロフィールのアバター画像の URL（読み取り専用、プロフィール全体を source にする）。
+
+    {"original": 元画像, "variants": {"64": 縮小版, "256": ...}}
+    縮小版がまだ生成されていなければ variants は空。アバターが無ければ null。
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, profile):
+        if not profile.avatar:
+            return None
+        storage = profile.avatar.storage
+        return {
+            "original": self._absolute(profile.avatar.url),
+            "variants": {size: self._absolute(storage.url(name)) for size, name in profile.avatar_variants.items()},
+        }
+
+    def _absolute(self, url):
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class SNSProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    SNS プロフィール（検索・アバター API）の 1 件分。
+    """
+
+    user_id = serializers.IntegerField(read_only=True)
+    email = serializers.EmailField(source="user.email", read_only=True)
+    avatar = AvatarField()
+
+    class Meta:
+        model = SNSProfile
+        fields = ("user_id", "email", "nickname", "bio", "avatar")
+        read_only_fields = fields
+
+
+class AvatarUploadSerializer(serializers.Serializer):
+    """
+    アバター画像のアップロード（multipart/form-data の avatar）。
+    画像としての検証は accounts.avatar_service.store_avatar で行う。
+    """
+
+    avatar = serializers.FileField()
+
+
+class ProfileSearchQuerySerializer(serializers.Serializer):
+    """
+    プロフィール検索 API のクエリパラメータ。
+    """
+
+    q = serializers.CharField(max_length=200)
+    type = serializers.ChoiceField(choices=list(SEARCH_INDEXES), default="employee")
+    limit = serializers.IntegerField(min_value=1, required=False)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+
+class UserExportQuerySerializer(serializers.Serializer):
+    """
+    ユーザーのエクスポート API のクエリパラメータ。
+    （?format= は DRF のレンダラー指定に使われるため ?output= で形式を指定する）
+    """
+
+    output = serializers.ChoiceField(choices=FORMATS, default="csv")
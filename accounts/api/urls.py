@@ -2,16 +2,28 @@ from django.urls import path
 from .views import (
     CustomerSignupView,
     EmployeeSignupView,
+    EmployeeBulkSignupView,
     SNSSignupView,
     ActivateAccountView,
     LoginView,
     LogoutView,
+    MeView,
+    TokenCacheStatsView,
+    AdmissionStatsView,
+    EmployeeDirectoryView,
+    CustomerDirectoryView,
+    ProfileSearchView,
+    AvatarView,
+    UserExportView,
 )
 
+app_name = "accounts"
+
 urlpatterns = [
     # サインアップ (API)
     path("signup/customer/", CustomerSignupView.as_view(), name="signup_customer"),
     path("signup/employee/", EmployeeSignupView.as_view(), name="signup_employee"),
+    path("signup/employee/bulk/", EmployeeBulkSignupView.as_view(), name="signup_employee_bulk"),
     path("signup/sns/", SNSSignupView.as_view(), name="signup_sns"),
 
     # メール認証 (API)
@@ -20,4 +32,18 @@ urlpatterns = [
     # ログイン / ログアウト (API)
     path("login/", LoginView.as_view(), name="login_api"),
     path("logout/", LogoutView.as_view(), name="logout_api"),
-]
\ No newline at end of file
+    path("me/", MeView.as_view(), name="me"),
+    path("me/avatar/", AvatarView.as_view(), name="avatar"),
+
+    # 統計 (API, 管理者のみ)
+    path("stats/token-cache/", TokenCacheStatsView.as_view(), name="token_cache_stats"),
+    path("stats/admission/", AdmissionStatsView.as_view(), name="admission_stats"),
+
+    # 一覧 (API, 管理者のみ)
+    path("employees/", EmployeeDirectoryView.as_view(), name="employee_directory"),
+    path("customers/", CustomerDirectoryView.as_view(), name="customer_directory"),
+    path("search/", ProfileSearchView.as_view(), name="profile_search"),
+
+    # エクスポート (API, 管理者のみ)
+    path("export/users/", UserExportView.as_view(), name="user_export"),
+]
@@ -6,143 +6,141 @@ accounts.api.views モジュール
 含まれる主なクラス:
 - CustomerSignupView:  新規ユーザー登録 API ECなど一般ユーザー向け
 - EmployeeSignupView:  新規ユーザー登録 API 基幹システムユーザー向け
+- EmployeeBulkSignupView: 従業員一括登録 API（JSON 配列 / NDJSON）
 - SNSSignupView:       新規ユーザー登録 API SNSなど一般ユーザー向け
 - ActivateAccountView: 認証
 - LoginView: ログイン
 - LogoutView: ログアウト
+- MeView: 認証済みユーザー自身の情報
+- TokenCacheStatsView: トークン認証キャッシュの統計（管理者のみ）
+- AdmissionStatsView: ログイン・サインアップの同時実行数の制限の統計（管理者のみ）
+- EmployeeDirectoryView: 従業員名簿（管理者のみ、キーセットページネーション）
+- CustomerDirectoryView: 顧客一覧（管理者のみ、キーセットページネーション）
+- ProfileSearchView: プロフィールの全文検索（管理者のみ）
+- AvatarView: 自分の SNS プロフィールのアバター画像のアップロード・解除
+- UserExportView: ユーザーとプロフィールの全件エクスポート（管理者のみ、CSV / NDJSON のストリーミング）
 """
 
 from django.contrib.auth import get_user_model
-from django.utils.http import urlsafe_base64_decode
-from django.shortcuts import get_object_or_404
-from django.contrib.auth.tokens import default_token_generator
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import StreamingHttpResponse
 
-from rest_framework import generics
+from rest_framework import generics, serializers, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from django.contrib.auth import logout
 
+from .pagination import CustomerDirectoryPagination, EmployeeDirectoryPagination
+from .parsers import NDJSONParser
 from .serializers import (
+    CustomerDirectoryFilterSerializer,
+    CustomerDirectorySerializer,
     CustomerSignupSerializer,
+    EmployeeBulkSignupSerializer,
+    EmployeeDirectoryFilterSerializer,
+    AvatarUploadSerializer,
+    EmployeeDirectorySerializer,
     EmployeeSignupSerializer,
+    ProfileSearchQuerySerializer,
+    SNSProfileSerializer,
     SNSSignupSerializer,
+    UserExportQuerySerializer,
 )
-from ..models import CustomerProfile, EmployeeProfile, SNSProfile
-from ..email_service import send_activation_email
+from ..models import SNSProfile
+from ..avatar_service import HashingFileUploadHandler, clear_avatar, set_avatar
+from ..activation_service import ACTIVATED, ALREADY_ACTIVE, activate_account
+from ..admission import get_admission_stats
+from ..authentication import SignedTokenAuthentication, get_token_cache_stats
+from ..export_service import content_type, export_filename, iter_export
+from ..search import search_profiles
+from ..signup_service import bulk_signup_employees
+from ..token_service import obtain_token
+from ..tokens import get_max_age, get_token_mode, issue_access_token, revoke_access_tokens
 
 User = get_user_model()
 
 
 class CustomerSignupView(generics.CreateAPIView):
+    """
+    サインアップの挙動は USE_EMAIL_VERIFICATION で切り替える:
+      - True: メール認証フロー（is_active=False + 認証メールをアウトボックスへ登録）
+      - False: 即ログインフロー（is_active=True）
+    ユーザー・プロフィール・認証メールは serializer.save()（signup_service.signup_account）が
+    1 トランザクションで作成する。
+    """
     serializer_class = CustomerSignupSerializer
     permission_classes = [AllowAny]
 
-    def perform_create(self, serializer):
-        """.env.USE_EMAIL_VERIFICATIONを使用してメール認証を強制するか切替可能とする"""
 
-        if getattr(settings, "USE_EMAIL_VERIFICATION", False):
-            # メール認証フロー
-            # ① 非アクティブで保存
-            user = serializer.save(is_active=False)
-            CustomerProfile.objects.create(user=user)
+class EmployeeSignupView(CustomerSignupView):
+    serializer_class = EmployeeSignupSerializer
 
-            # ② メール送信（サービス層へ委譲）
-            send_activation_email(self.request, user)
 
-        else:
-            # 即ログインフロー
-            user = serializer.save(is_active=True)
-            CustomerProfile.objects.create(user=user)
+class EmployeeBulkSignupView(APIView):
+    """
+    従業員をまとめて登録する（管理者のみ）。
 
+    リクエストボディは EmployeeSignupSerializer 形式の JSON 配列、
+    または 1 行 1 件の NDJSON (Content-Type: application/x-ndjson)。
+    エラーのある行はスキップし、行ごとのエラーとしてレスポンスに含める。
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, NDJSONParser]
 
-class EmployeeSignupView(generics.CreateAPIView):
-    serializer_class = EmployeeSignupSerializer
-    permission_classes = [AllowAny]
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({"detail": "配列を指定してください。"}, status=400)
 
-    def perform_create(self, serializer):
-        """
-        サインアップ時の挙動を切り替える:
-          - USE_EMAIL_VERIFICATION=True: メール認証フロー（is_active=False + 認証メール送信）
-          - USE_EMAIL_VERIFICATION=False: 即ログインフロー（is_active=True）
-        """
-        if getattr(settings, "USE_EMAIL_VERIFICATION", False):
-            # メール認証フロー
-            user = serializer.save(is_active=False)
-            EmployeeProfile.objects.create(
-                user=user,
-                department=serializer.validated_data.get("department", ""),
-                position=serializer.validated_data.get("position", ""),
-                hire_date=serializer.validated_data.get("hire_date"),
-                qualifications=serializer.validated_data.get("qualifications", ""),
-            )
-            send_activation_email(user, self.request)
-        else:
-            # 即ログインフロー
-            user = serializer.save(is_active=True)
-            EmployeeProfile.objects.create(
-                user=user,
-                department=serializer.validated_data.get("department", ""),
-                position=serializer.validated_data.get("position", ""),
-                hire_date=serializer.validated_data.get("hire_date"),
-                qualifications=serializer.validated_data.get("qualifications", ""),
-            )
+        max_rows = getattr(settings, "BULK_SIGNUP_MAX_ROWS", 10000)
+        if len(rows) > max_rows:
+            return Response({"detail": f"一度に登録できるのは {max_rows} 件までです。"}, status=400)
 
+        result = bulk_signup_employees(request, rows, EmployeeBulkSignupSerializer)
+        return Response(
+            {
+                "created_count": len(result.created),
+                "error_count": len(result.errors),
+                "created": result.created,
+                "errors": result.errors,
+            },
+            # 一部の行だけ失敗した場合は 207 Multi-Status
+            status=status.HTTP_207_MULTI_STATUS if result.errors else status.HTTP_201_CREATED,
+        )
 
-class SNSSignupView(generics.CreateAPIView):
-    serializer_class = SNSSignupSerializer
-    permission_classes = [AllowAny]
 
-    def perform_create(self, serializer):
-        """
-        サインアップ時の挙動を切り替える:
-          - USE_EMAIL_VERIFICATION=True: メール認証フロー（is_active=False + 認証メール送信）
-          - USE_EMAIL_VERIFICATION=False: 即ログインフロー（is_active=True）
-        """
-        if getattr(settings, "USE_EMAIL_VERIFICATION", False):
-            # メール認証フロー
-            user = serializer.save(is_active=False)
-            SNSProfile.objects.create(
-                user=user,
-                nickname=serializer.validated_data.get("nickname", ""),
-                bio=serializer.validated_data.get("bio", ""),
-            )
-            send_activation_email(user, self.request)
-        else:
-            # 即ログインフロー
-            user = serializer.save(is_active=True)
-            SNSProfile.objects.create(
-                user=user,
-                nickname=serializer.validated_data.get("nickname", ""),
-                bio=serializer.validated_data.get("bio", ""),
-            )
+class SNSSignupView(CustomerSignupView):
+    serializer_class = SNSSignupSerializer
 
 
 class ActivateAccountView(APIView):
+    """
+    メール認証リンクからアカウントを有効化する
+    （検証用の列の SELECT と条件付き UPDATE の 2 クエリ。全カラムの保存は行わない）
+    """
     permission_classes = [AllowAny]
 
     def get(self, request, uidb64, token):
-        try:
-            uid = urlsafe_base64_decode(uidb64).decode()
-            user = get_object_or_404(User, pk=uid)
-        except Exception:
-            return Response({"detail": "無効なリンクです。"}, status=400)
-
-        if default_token_generator.check_token(user, token):
-            user.is_active = True
-            user.save()
+        result = activate_account(uidb64, token)
+        if result == ACTIVATED:
             return Response({"detail": "アカウントが有効化されました。"}, status=200)
+        elif result == ALREADY_ACTIVE:
+            return Response({"detail": "アカウントは既に有効化されています。"}, status=200)
         else:
             return Response({"detail": "リンクが無効または期限切れです。"}, status=400)
-        
+
 
 class LoginView(ObtainAuthToken):
     """
     ユーザー名 / メールアドレス + パスワードで認証してトークンを返す
+    AUTH_TOKEN_MODE="signed" のときは DB に書き込まない署名付きトークンを返す
     """
     def post(self, request, *args, **kwargs):
         # ObtainAuthTokenの処理でuserを取得
@@ -150,11 +148,22 @@ class LoginView(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
 
-        # トークンを取得または作成
-        token = Token.objects.get_or_create(user=user)[0]
+        if get_token_mode() == "signed":
+            # 署名付きトークンを発行（DB アクセスなし）
+            return Response({
+                "token": issue_access_token(user),
+                "token_type": SignedTokenAuthentication.keyword,
+                "expires_in": get_max_age(),
+                "user_id": user.id,
+                "email": user.email,
+            })
+
+        # トークンを取得または作成（失効済みなら作り直す）
+        token = obtain_token(user)
 
         return Response({
             "token": token.key,
+            "token_type": "Token",
             "user_id": user.id,
             "email": user.email,
         })
@@ -163,10 +172,186 @@ class LoginView(ObtainAuthToken):
 class LogoutView(APIView):
     """
     認証済みユーザーのトークンを削除してログアウト
+    署名付きトークンはユーザー単位で失効させる
     """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        request.user.auth_token.delete()  # Tokenを削除
-        logout(request)  # Sessionも削除（必要であれば）
-        return Response({"detail": "ログアウトしました。"}, status=200)
\ No newline at end of file
+        Token.objects.filter(user=request.user).delete()  # Tokenを削除
+        revoke_access_tokens(request.user.pk)  # 署名付きトークンを失効
+        if hasattr(request, "session"):  # API 専用プロファイルにはセッションがない
+            logout(request)  # Sessionも削除（必要であれば）
+        return Response({"detail": "ログアウトしました。"}, status=200)
+
+
+class MeView(APIView):
+    """
+    認証済みユーザー自身の情報を返す
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"user_id": request.user.id, "email": request.user.email})
+
+
+class TokenCacheStatsView(APIView):
+    """
+    トークン認証キャッシュ（CachedTokenAuthentication）のヒット・ミス数を返す。
+    値はこのリクエストを処理したプロセスのもの。
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_token_cache_stats())
+
+
+class AdmissionStatsView(APIView):
+    """
+    同時実行数の制限（AdmissionControlMiddleware）の実行中・待機中の件数と受け付け・拒否の回数を返す。
+    値はこのリクエストを処理したプロセスのもの。
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_admission_stats())
+
+
+class DirectoryView(generics.ListAPIView):
+    """
+    プロフィールの一覧 API の共通処理。
+
+    - filter_serializer_class で検証したクエリパラメータを filter_lookups の条件で絞り込む
+    - 並び順とページ送りは pagination_class（キーセット方式）で行う
+    - ?fields= で指定された項目（と並び順のキー）の列だけを読み込む
+    """
+    permission_classes = [IsAdminUser]
+    filter_serializer_class = None
+    filter_lookups = {}
+
+    def get_queryset(self):
+        filters = self.filter_serializer_class(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        queryset = self.serializer_class.Meta.model.objects.filter(
+            **{self.filter_lookups[name]: value for name, value in filters.validated_data.items()}
+        )
+
+        # 返す項目と並び順のキーの列だけを読み込む（email はユーザーを JOIN して取得）
+        fields = self.serializer_class.requested_fields(self.request) or self.serializer_class.Meta.fields
+        columns = {"user", *(name for name in fields if name not in ("user_id", "email"))}
+        for ordering in self.pagination_class.orderings.values():
+            columns.update(name.lstrip("-") for name in ordering)
+        if "email" in fields:
+            return queryset.select_related("user").only(*columns, "user__email")
+        return queryset.only(*columns)
+
+
+class EmployeeDirectoryView(DirectoryView):
+    """
+    従業員名簿。?department= / ?position= / ?hired_from= / ?hired_to= で絞り込み、
+    ?ordering=name|hire_date|-hire_date で並べる。
+    """
+    serializer_class = EmployeeDirectorySerializer
+    pagination_class = EmployeeDirectoryPagination
+    filter_serializer_class = EmployeeDirectoryFilterSerializer
+    filter_lookups = {
+        "department": "department",
+        "position": "position",
+        "hired_from": "hire_date__gte",
+        "hired_to": "hire_date__lte",
+    }
+
+
+class CustomerDirectoryView(DirectoryView):
+    """
+    顧客一覧。?lastname= で絞り込み、?ordering=name|user_id で並べる。
+    """
+    serializer_class = CustomerDirectorySerializer
+    pagination_class = CustomerDirectoryPagination
+    filter_serializer_class = CustomerDirectoryFilterSerializer
+    filter_lookups = {"lastname": "lastname"}
+
+
+class ProfileSearchView(APIView):
+    """
+    プロフィールの全文検索（accounts.search）。
+    ?q=（空白区切りで AND）&type=employee|sns の結果を関連度順に返す。
+    ページ送りは ?limit= / ?offset=（offset + limit は SEARCH_MAX_RESULTS まで）。
+    """
+    permission_classes = [IsAdminUser]
+    serializer_classes = {"employee": EmployeeDirectorySerializer, "sns": SNSProfileSerializer}
+
+    def get(self, request):
+        params = ProfileSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        kind = params.validated_data["type"]
+        offset = params.validated_data["offset"]
+        limit = min(
+            params.validated_data.get("limit", getattr(settings, "SEARCH_PAGE_SIZE", 20)),
+            getattr(settings, "DIRECTORY_MAX_PAGE_SIZE", 200),
+        )
+        max_results = getattr(settings, "SEARCH_MAX_RESULTS", 1000)
+        limit = max(0, min(limit, max_results - offset))
+
+        # 1 件多く取得して次のページの有無を判定する
+        profiles = search_profiles(kind, params.validated_data["q"], limit + 1, offset) if limit else []
+        next_url = None
+        if len(profiles) > limit and offset + limit < max_results:
+            next_url = replace_query_param(request.build_absolute_uri(), "offset", offset + limit)
+        serializer = self.serializer_classes[kind](profiles[:limit], many=True, context={"request": request})
+        return Response({"next": next_url, "results": serializer.data})
+
+
+class AvatarView(APIView):
+    """
+    自分の SNS プロフィールのアバター画像。
+    PUT（multipart/form-data の avatar）で設定し、DELETE で外す。
+    アップロードは HashingFileUploadHandler で一時ファイルへ書き出し、メモリには読み込まない。
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def initialize_request(self, request, *args, **kwargs):
+        # アップロードハンドラは本文の読み込み（CSRF 検証を含む）より前に差し替える
+        self.upload_handler = HashingFileUploadHandler(request)
+        request.upload_handlers = [self.upload_handler]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_profile(self, request):
+        try:
+            return request.user.sns_profile
+        except SNSProfile.DoesNotExist:
+            raise serializers.ValidationError({"avatar": ["SNS プロフィールがありません。"]})
+
+    def put(self, request):
+        profile = self.get_profile(request)
+        serializer = AvatarUploadSerializer(data=request.data)  # ここで本文を一時ファイルへ書き出す
+        if self.upload_handler.too_large:
+            return Response(
+                {"avatar": ["ファイルサイズが大きすぎます。"]}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        serializer.is_valid(raise_exception=True)
+        try:
+            set_avatar(profile, serializer.validated_data["avatar"])
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({"avatar": exc.messages})
+        return Response(SNSProfileSerializer(profile, context={"request": request}).data)
+
+    def delete(self, request):
+        clear_avatar(self.get_profile(request))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserExportView(APIView):
+    """
+    ユーザーとプロフィールの全件エクスポート（accounts.export_service）。
+    ?output=csv|ndjson の本文を StreamingHttpResponse で少しずつ返すので、件数によらずメモリを使わない。
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = UserExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        output = params.validated_data["output"]
+        response = StreamingHttpResponse(iter_export(output), content_type=content_type(output))
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(output)}"'
+        return response
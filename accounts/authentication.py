@@ -0,0 +1,245 @@
+# accounts/authentication.py
+
+"""
+accounts.authentication モジュール
+
+DRF の認証クラス。
+
+含まれる主なクラス・関数:
+- CachedTokenAuthentication: トークン → ユーザーの解決結果をキャッシュする TokenAuthentication
+- SignedTokenAuthentication: 署名付きアクセストークン（accounts.tokens）による認証
+- invalidate_token / invalidate_user_tokens: キャッシュの無効化（signals から呼ばれる）
+- invalidate_users: 一括更新（QuerySet.update()）のあとの無効化
+- get_token_cache_stats: ヒット・ミス数などの統計
+"""
+
+import copy
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .lru_cache import LRUTTLCache
+from .sharding import bind_user, db_for_user_id, get_shards, sharding_enabled
+from .token_service import is_token_expired, refresh_token_expiry
+from .tokens import TokenRevoked, verify_access_token
+
+SHARED_KEY_PREFIX = "accounts:token:"
+SHARED_USER_KEY_PREFIX = "accounts:token-user:"
+
+_local_cache = None
+_local_users = None  # user_id → トークンキー（ユーザー単位の無効化用）
+_signed_users = None  # user_id → ユーザー（署名付きトークン用）
+_lock = threading.Lock()
+_stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _get_local_cache():
+    global _local_cache, _local_users, _signed_users
+    if _local_cache is None:
+        with _lock:
+            if _local_cache is None:
+                maxsize = getattr(settings, "TOKEN_AUTH_CACHE_MAXSIZE", 10000)
+                ttl = getattr(settings, "TOKEN_AUTH_CACHE_TTL", 30)
+                _local_users = LRUTTLCache(maxsize=maxsize, ttl=ttl)
+                _signed_users = LRUTTLCache(maxsize=maxsize, ttl=ttl)
+                _local_cache = LRUTTLCache(maxsize=maxsize, ttl=ttl)
+    return _local_cache
+
+
+def _get_shared_cache():
+    """共有キャッシュ（TOKEN_AUTH_SHARED_CACHE で指定したキャッシュエイリアス）。未設定なら None"""
+    alias = getattr(settings, "TOKEN_AUTH_SHARED_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def get_token_cache_stats():
+    """キャッシュの統計（ヒット・ミス・無効化の回数とローカルキャッシュの件数）を返す"""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["local_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+    stats["local_size"] = len(_get_local_cache())
+    return stats
+
+
+def reset_token_cache():
+    """ローカルキャッシュと統計をリセットする（テスト・ベンチマーク用）"""
+    global _local_cache, _local_users, _signed_users
+    with _lock:
+        _local_cache = _local_users = _signed_users = None
+        for name in _stats:
+            _stats[name] = 0
+
+
+def invalidate_token(key, user_id=None):
+    """トークンキー 1 件分のキャッシュを無効化する"""
+    _get_local_cache().pop(key)
+    if user_id is not None and _local_users.get(user_id) == key:
+        _local_users.pop(user_id)
+    shared = _get_shared_cache()
+    if shared is not None:
+        shared.delete(SHARED_KEY_PREFIX + key)
+    _count("invalidations")
+
+
+def invalidate_user_tokens(user_id):
+    """
+    ユーザーのトークンのキャッシュを無効化する（無効化・権限変更時など）。
+    DRF の Token はユーザーと 1 対 1 なので、キーは 1 つだけ追跡すればよい。
+    """
+    local = _get_local_cache()
+    _signed_users.pop(user_id)
+    key = _local_users.pop(user_id)
+    if key is not None:
+        local.pop(key)
+
+    shared = _get_shared_cache()
+    if shared is not None:
+        shared_key = shared.get(SHARED_USER_KEY_PREFIX + str(user_id))
+        if shared_key is not None:
+            shared.delete_many([SHARED_KEY_PREFIX + shared_key, SHARED_USER_KEY_PREFIX + str(user_id)])
+            key = key or shared_key
+    if key is not None:
+        _count("invalidations")
+
+
+def invalidate_users(user_ids):
+    """
+    複数ユーザーのキャッシュを無効化する。QuerySet.update() は post_save を送らないので、
+    is_active などを一括更新したサービス（accounts.activation_service など）が明示的に呼ぶ。
+    """
+    for user_id in user_ids:
+        invalidate_user_tokens(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    トークン → ユーザーの解決結果をキャッシュする TokenAuthentication。
+
+    1. プロセス内の LRU + TTL キャッシュ（TOKEN_AUTH_CACHE_MAXSIZE / TOKEN_AUTH_CACHE_TTL）
+    2. 共有キャッシュ（TOKEN_AUTH_SHARED_CACHE を指定した場合のみ）
+    3. どちらにも無ければ従来どおり authtoken_token を DB から引く
+
+    トークンの有効期限（AUTH_TOKEN_TTL、accounts.token_service）はキャッシュの有無によらず確認する。
+    LogoutView でのトークン削除・ユーザーの無効化時は signals から無効化される。
+    他プロセスのローカルキャッシュには届かないため、プロセス間の反映遅延は最大で
+    TOKEN_AUTH_CACHE_TTL 秒となる（共有キャッシュは即時に無効化される）。
+    QuerySet.update() などシグナルを発火しない更新では、更新した側が invalidate_users() を呼ぶ。
+    """
+
+    def authenticate_credentials(self, key):
+        user, token = self._resolve(key)
+        if is_token_expired(token):
+            # キャッシュ上の作成日時は古い場合がある（sliding 方式で他のプロセスが延長済みなど）ので DB で確かめる
+            invalidate_token(key, user.pk)
+            user, token = self._resolve(key)
+            if is_token_expired(token):
+                token.delete()
+                raise exceptions.AuthenticationFailed("トークンの有効期限が切れています。")
+        refresh_token_expiry(token)
+        return user, token
+
+    def _resolve(self, key):
+        local = _get_local_cache()
+        cached = local.get(key)
+        if cached is not None:
+            _count("local_hits")
+            return self._copy(cached)
+
+        shared = _get_shared_cache()
+        if shared is not None:
+            cached = shared.get(SHARED_KEY_PREFIX + key)
+            if cached is not None:
+                _count("shared_hits")
+                self._remember_local(key, cached)
+                return self._copy(cached)
+
+        _count("misses")
+        # 無効なトークン・非アクティブユーザーは従来どおり AuthenticationFailed
+        user, token = self._authenticate_from_db(key)
+        cached = (user, token)
+        self._remember_local(key, cached)
+        if shared is not None:
+            ttl = getattr(settings, "TOKEN_AUTH_SHARED_CACHE_TTL", 300)
+            shared.set_many(
+                {SHARED_KEY_PREFIX + key: cached, SHARED_USER_KEY_PREFIX + str(user.pk): key},
+                timeout=ttl,
+            )
+        return self._copy(cached)
+
+    def _authenticate_from_db(self, key):
+        if not sharding_enabled():
+            return super().authenticate_credentials(key)
+
+        # トークンキーからはシャードが分からないので、各シャードを順に引く（結果はキャッシュされる）
+        model = self.get_model()
+        for shard in get_shards():
+            token = model.objects.using(shard).select_related("user").filter(key=key).first()
+            if token is not None:
+                break
+        else:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return token.user, token
+
+    @staticmethod
+    def _remember_local(key, cached):
+        _get_local_cache().set(key, cached)
+        _local_users.set(cached[0].pk, key)
+
+    @staticmethod
+    def _copy(cached):
+        """リクエストごとにユーザーを複製し、キャッシュ上のインスタンスを書き換えられないようにする"""
+        user, token = cached
+        bind_user(user)  # 以降のクエリをユーザーのシャードへ
+        return copy.copy(user), token
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    署名付きアクセストークン（Authorization: Bearer <token>）による認証。
+
+    トークンの署名・有効期限・失効の確認に DB は使わない（accounts.tokens 参照）。
+    トークンに含まれるユーザー ID からのユーザー取得は CachedTokenAuthentication と
+    同じプロセス内キャッシュを通し、ユーザー更新時は signals から無効化される。
+    """
+
+    keyword = "Bearer"
+
+    def authenticate_credentials(self, key):
+        try:
+            user_id = verify_access_token(key)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed("トークンの有効期限が切れています。")
+        except TokenRevoked:
+            raise exceptions.AuthenticationFailed("トークンは失効しています。")
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed("無効なトークンです。")
+
+        _get_local_cache()
+        user = _signed_users.get(user_id)
+        if user is None:
+            _count("misses")
+            user = get_user_model().objects.using(db_for_user_id(user_id)).filter(pk=user_id).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed("無効なトークンです。")
+            _signed_users.set(user_id, user)
+        else:
+            _count("local_hits")
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed("ユーザーが無効化されています。")
+        bind_user(user)
+        return copy.copy(user), key
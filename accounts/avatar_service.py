@@ -0,0 +1,293 @@
+# accounts/avatar_service.py
+
+"""
+accounts.avatar_service モジュール
+
+SNS プロフィールのアバター画像の処理。
+
+1. アップロード: HashingFileUploadHandler がリクエスト本文を一時ファイルへ書き出しながら
+   SHA-256 を計算する（メモリに全体を読み込まない）。
+2. 保存: 内容のハッシュから決まる名前（avatars/ab/abcdef....png）で保存する。
+   同じ内容の画像は AvatarImage の 1 行・1 ファイルを共有し、2 回目以降は保存しない。
+3. 縮小版: process_avatars コマンド（ワーカー）が process_avatar_batch() を繰り返し呼び出し、
+   AVATAR_VARIANT_SIZES の正方形の WebP を生成して SNSProfile.avatar_variants に反映する。
+
+含まれる主なクラス・関数:
+- HashingFileUploadHandler: 一時ファイルへ書き出しながらハッシュとサイズ上限を確認するアップロードハンドラ
+- set_avatar / clear_avatar: プロフィールのアバターの設定・解除
+- process_avatar_batch: 生成待ちの画像を 1 バッチ分取り出して縮小版を生成
+"""
+
+import hashlib
+import io
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .instrumentation import timed
+from .models import AvatarImage, SNSProfile
+from .sharding import user_databases
+
+logger = logging.getLogger(__name__)
+
+# Pillow の形式名 → 保存するファイルの拡張子
+ALLOWED_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+
+def get_variant_sizes():
+    return tuple(getattr(settings, "AVATAR_VARIANT_SIZES", (64, 256)))
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    アップロードされたファイルを（サイズによらず）一時ファイルへ書き出しつつ SHA-256 を計算する。
+    AVATAR_MAX_UPLOAD_SIZE を超えたファイルは読み飛ばし、too_large を立てる。
+    完成したファイルには sha256 属性（16 進文字列）が付く。
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = getattr(settings, "AVATAR_MAX_UPLOAD_SIZE", 5 * 1024 * 1024)
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.too_large = True
+            self.file.close()
+            raise SkipFile()
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+def _inspect(uploaded_file):
+    """画像として開けるかを確認し、(形式, 幅, 高さ) を返す。ヘッダーだけを読む"""
+    # Pillow の読み込みは重いので、API サーバーの起動時ではなく最初のアップロードで行う
+    from PIL import Image, UnidentifiedImageError
+
+    max_pixels = getattr(settings, "AVATAR_MAX_PIXELS", 4096 * 4096)
+    try:
+        with Image.open(uploaded_file) as image:
+            image_format, (width, height) = image.format, image.size
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError("画像ファイルとして読み込めません。")
+    finally:
+        uploaded_file.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(f"{', '.join(ALLOWED_FORMATS)} 形式の画像を指定してください。")
+    if width * height > max_pixels:
+        raise ValidationError("画像の解像度が大きすぎます。")
+    return image_format, width, height
+
+
+def _digest(uploaded_file):
+    """ハンドラが計算済みならそれを使い、無ければ（テストなど）ファイルを読んで計算する"""
+    if getattr(uploaded_file, "sha256", None):
+        return uploaded_file.sha256
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+@timed("avatar")
+def store_avatar(uploaded_file):
+    """
+    画像を内容のハッシュから決まる名前で保存し、AvatarImage を返す。
+    同じ内容の画像が保存済みなら、ファイルは保存せずに既存の行を返す。
+
+    Raises:
+        ValidationError: 画像として読み込めない・形式や解像度が不正な場合
+    """
+    image_format, width, height = _inspect(uploaded_file)
+    sha256 = _digest(uploaded_file)
+    name = f"avatars/{sha256[:2]}/{sha256}.{ALLOWED_FORMATS[image_format]}"
+
+    try:
+        with transaction.atomic(using="default"):
+            image, created = AvatarImage.objects.using("default").get_or_create(
+                sha256=sha256,
+                defaults={"original": name, "width": width, "height": height, "size": uploaded_file.size},
+            )
+    except IntegrityError:
+        # 同じ画像の同時アップロード
+        image, created = AvatarImage.objects.using("default").get(sha256=sha256), False
+
+    if created or not default_storage.exists(image.original):
+        # 一時ファイルのアップロードは FileSystemStorage ではコピーせずに移動される
+        saved = default_storage.save(image.original, uploaded_file)
+        if saved != image.original:
+            # 同時アップロードで先に保存されていた
+            default_storage.delete(saved)
+    return image
+
+
+def set_avatar(profile, uploaded_file):
+    """プロフィールのアバターをアップロードされた画像にする"""
+    image = store_avatar(uploaded_file)
+    profile.avatar.name = image.original
+    profile.avatar_variants = image.variants if image.status == AvatarImage.STATUS_READY else {}
+    profile.save(update_fields=["avatar", "avatar_variants"])
+
+    if not profile.avatar_variants:
+        # 保存の直前にワーカーが生成を終えていた場合は、ワーカーからの反映に間に合っていない
+        image.refresh_from_db(fields=["status", "variants"])
+        if image.status == AvatarImage.STATUS_READY:
+            profile.avatar_variants = image.variants
+            profile.save(update_fields=["avatar_variants"])
+    return image
+
+
+def clear_avatar(profile):
+    """
+    プロフィールのアバターを外す。
+    画像ファイルは他のプロフィールと共有している可能性があるので削除しない。
+    """
+    profile.avatar.name = None
+    profile.avatar_variants = {}
+    profile.save(update_fields=["avatar", "avatar_variants"])
+
+
+def variant_name(image, size):
+    return f"avatars/{image.sha256[:2]}/{image.sha256}/{size}.webp"
+
+
+def generate_variants(image):
+    """
+    元画像から AVATAR_VARIANT_SIZES の正方形（中央を切り抜き）の WebP を生成して保存する。
+
+    Returns:
+        dict: {"辺の長さ": ファイル名}
+    """
+    from PIL import Image, ImageOps
+
+    quality = getattr(settings, "AVATAR_WEBP_QUALITY", 80)
+    variants = {}
+    with default_storage.open(image.original, "rb") as file, Image.open(file) as source:
+        source = ImageOps.exif_transpose(source)
+        source = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+        for size in get_variant_sizes():
+            name = variant_name(image, size)
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                # 元画像より大きくはしない
+                edge = min(size, source.width, source.height)
+                ImageOps.fit(source, (edge, edge), Image.Resampling.LANCZOS).save(
+                    buffer, "WEBP", quality=quality
+                )
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants[str(size)] = name
+    return variants
+
+
+@dataclass
+class AvatarProcessingResult:
+    """process_avatar_batch() 1 回分の処理結果"""
+
+    claimed: int = 0
+    ready: int = 0
+    retried: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+
+def _claim_batch(batch_size):
+    """
+    生成待ちの画像を batch_size 件まで取得し、他のワーカーに取られないようロックする。
+    （email_service._claim_batch と同じく条件付き UPDATE で claim_token を書き込む）
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, "AVATAR_LEASE_SECONDS", 300))
+    claimable = Q(status=AvatarImage.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=AvatarImage.STATUS_PROCESSING, locked_until__lt=now
+    )
+    images = AvatarImage.objects.using("default")
+    ids = list(
+        images.filter(claimable).order_by("next_attempt_at", "pk").values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    images.filter(claimable, pk__in=ids).update(
+        status=AvatarImage.STATUS_PROCESSING, claim_token=token, locked_until=now + lease
+    )
+    return list(images.filter(claim_token=token, status=AvatarImage.STATUS_PROCESSING))
+
+
+def process_avatar_batch(batch_size=20, max_attempts=None):
+    """
+    生成待ちの画像を 1 バッチ分取り出して縮小版を生成し、その画像を使うプロフィールに反映する。
+    失敗した画像は指数バックオフで再試行し、max_attempts を超えたら「生成失敗」として残す
+    （その場合、プロフィールは元画像を返し続ける）。
+
+    Returns:
+        AvatarProcessingResult: 処理件数と所要時間
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, "AVATAR_MAX_ATTEMPTS", 3)
+
+    started = time.monotonic()
+    result = AvatarProcessingResult()
+    images = _claim_batch(batch_size)
+    result.claimed = len(images)
+    for image in images:
+        try:
+            variants = generate_variants(image)
+        except Exception as exc:
+            _schedule_retry(image, exc, max_attempts, result)
+            continue
+        image.variants = variants
+        image.status = AvatarImage.STATUS_READY
+        image.locked_until = None
+        image.last_error = ""
+        image.save(using="default", update_fields=["variants", "status", "locked_until", "last_error"])
+        for database in user_databases():
+            SNSProfile.objects.using(database).filter(avatar=image.original).update(avatar_variants=variants)
+        result.ready += 1
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def _schedule_retry(image, exc, max_attempts, result):
+    """生成に失敗した画像を再試行予約、または生成失敗として確定する"""
+    base = getattr(settings, "AVATAR_BACKOFF_SECONDS", 30)
+    image.attempts += 1
+    image.last_error = f"{type(exc).__name__}: {exc}"
+    image.locked_until = None
+    if image.attempts >= max_attempts:
+        image.status = AvatarImage.STATUS_FAILED
+        result.failed += 1
+        logger.error("アバター縮小版の生成失敗（再試行打ち切り）: %s %s", image.original, image.last_error)
+    else:
+        image.status = AvatarImage.STATUS_PENDING
+        image.next_attempt_at = timezone.now() + timedelta(seconds=base * 2 ** (image.attempts - 1))
+        result.retried += 1
+        logger.warning("アバター縮小版の生成失敗（再試行予約）: %s %s", image.original, image.last_error)
+    image.save(
+        using="default",
+        update_fields=["attempts", "last_error", "locked_until", "status", "next_attempt_at"],
+    )
@@ -0,0 +1,32 @@
+# accounts/backends.py
+
+"""
+accounts.backends モジュール
+
+含まれる主なクラス:
+- ShardedModelBackend: シャーディング（accounts.sharding）対応の ModelBackend
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .sharding import bind_user, db_for_user_id
+
+
+class ShardedModelBackend(ModelBackend):
+    """
+    セッションのユーザー ID からユーザーを取得するときに、UserDirectory でシャードを引く。
+    ログイン（authenticate）は CustomUserManager.get_by_natural_key がシャードを選ぶので変更しない。
+    USER_SHARDS 指定時に AUTHENTICATION_BACKENDS で使う。
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.db_manager(db_for_user_id(user_id)).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+        bind_user(user)
+        return user
@@ -0,0 +1,222 @@
+# accounts/benchmarks.py
+
+"""
+accounts.benchmarks モジュール
+
+bench_* 管理コマンドで共通に使うベンチマーク用ヘルパー。
+
+ベンチマークは開発用 DB を汚さないよう、テストランナーと同じ方法で
+一時的なテスト用データベースを作成して実行する。
+
+含まれる主な関数:
+- benchmark_database: テスト用 DB を作成・破棄するコンテキストマネージャ
+- run_concurrently: 指定スレッド数で処理を繰り返し実行し、1 回ごとの所要時間を返す
+- summarize: 所要時間のリストからスループットとパーセンタイルを計算
+- QueryCounter: 実行された SQL の数を数えるコンテキストマネージャ
+- live_server: テスト用 DB に接続したローカル HTTP サーバーを起動するコンテキストマネージャ
+- result_metadata: 結果 JSON に記録する実行環境の情報
+- compare_results: 前回の結果（ベースライン）と比べて悪化した項目を返す
+"""
+
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.db import connection, connections
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+# --fast-hasher 用。ハッシュ計算以外のオーバーヘッドを計測したいときに使う
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    テスト用データベースを作成し、終了時に破棄する。
+
+    SQLite の場合はメモリ上の共有キャッシュ DB ではなく一時ファイルを使う。
+    （共有キャッシュはテーブル単位でロックされ、複数スレッドからの書き込みで
+    「database table is locked」になるうえ、実運用のファイル DB とも挙動が異なるため）
+    """
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    tmpdir = None
+    if connection.vendor == "sqlite" and not old_test_name:
+        tmpdir = tempfile.TemporaryDirectory(prefix="accounts-bench-")
+        test_settings["NAME"] = os.path.join(tmpdir.name, "bench.sqlite3")
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+        test_settings["NAME"] = old_test_name
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+class QueryCounter:
+    """
+    with ブロック内で（このスレッドの）DB 接続が実行した SQL の数を数える。
+
+    CaptureQueriesContext はリクエスト開始時の reset_queries で記録が消えるため、
+    テストクライアント経由のリクエストでは execute_wrapper で数える。
+    """
+
+    def __init__(self, using="default"):
+        self.connection = connections[using]
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+
+def run_concurrently(func, total, threads=1):
+    """
+    func(i) を合計 total 回、threads 本のスレッドで分担して実行する。
+    いずれかのスレッドで例外が発生した場合は、全スレッドの終了後に送出する。
+
+    Returns:
+        tuple[list[float], float]: 1 回ごとの所要時間（秒）のリストと全体の経過時間（秒）
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        local = []
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    break
+                started = time.perf_counter()
+                func(i)
+                local.append(time.perf_counter() - started)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            with lock:
+                latencies.extend(local)
+            # スレッドごとに開いた DB 接続を閉じる
+            connections.close_all()
+
+    started = time.perf_counter()
+    if threads <= 1:
+        worker()
+    else:
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return latencies, elapsed
+
+
+def percentile(values, pct):
+    """最近傍法によるパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """
+    所要時間のリストを集計する。
+
+    Returns:
+        dict: count, throughput（回/秒）, mean / p50 / p95 / p99（ミリ秒）
+    """
+    return {
+        "count": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+@contextmanager
+def live_server(host="127.0.0.1"):
+    """
+    テスト用 DB に接続した HTTP サーバー（LiveServerTestCase と同じもの）を別スレッドで起動する。
+    benchmark_database() の中で使う。
+
+    Yields:
+        str: サーバーのベース URL（例: http://127.0.0.1:54321）
+    """
+    server = LiveServerThread(host, lambda handler: handler)
+    server.daemon = True
+    with override_settings(ALLOWED_HOSTS=[host]):
+        server.start()
+        server.is_ready.wait()
+        if server.error:
+            raise server.error
+        try:
+            yield f"http://{host}:{server.port}"
+        finally:
+            server.terminate()
+
+
+def result_metadata(**options):
+    """結果 JSON に記録する実行環境の情報（比較時に条件が揃っているかの確認用）"""
+    return {
+        "created_at": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "cpu_count": os.cpu_count(),
+        "options": options,
+    }
+
+
+def compare_results(baseline, current, tolerance=0.2, metrics=("p95_ms",)):
+    """
+    操作ごとの集計（{"操作名": summarize() の結果 + "queries"}）をベースラインと比較する。
+
+    レイテンシ（metrics）は tolerance の割合を超えて遅くなったもの、
+    クエリ数は 1 件でも増えたものを悪化とみなす。
+
+    Returns:
+        list[str]: 悪化した項目の説明（悪化がなければ空）
+    """
+    regressions = []
+    for name, summary in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in metrics:
+            if before.get(metric) and summary[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}.{metric}: {before[metric]:.2f} → {summary[metric]:.2f}"
+                )
+        if before.get("queries") is not None and summary.get("queries") is not None:
+            if summary["queries"] > before["queries"]:
+                regressions.append(f"{name}.queries: {before['queries']} → {summary['queries']}")
+    return regressions
@@ -1,30 +1,250 @@
 # accounts/email_service.py
 
+"""
+accounts.email_service モジュール
+
+メール送信のサービス層。
+
+リクエスト処理中は SMTP に接続せず、EmailOutbox へ 1 行書き込むだけにする。
+（呼び出し側のトランザクション内で実行すれば、ユーザー作成と同時にコミットされる）
+実際の送信は send_outbox_emails コマンドが deliver_outbox_batch() を繰り返し呼び出して行う。
+
+含まれる主な関数:
+- send_activation_email: アカウント有効化メールをアウトボックスへ登録
+- send_activation_emails: 複数ユーザー分の有効化メールを一括登録
+- enqueue_email: 任意のメールをアウトボックスへ登録
+- deliver_outbox_batch: アウトボックスから 1 バッチ分を取り出して送信
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
 from django.conf import settings
-from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from .instrumentation import timed
+from .models import EmailOutbox
+from .tokens import make_activation_token
+
+logger = logging.getLogger(__name__)
+
 
+@timed("email")
 def send_activation_email(request, user):
     """
-    ユーザーにアカウント有効化用メールを送信する。
+    ユーザーにアカウント有効化用メールを送信する（アウトボックスへ登録）。
+    """
+    message = build_activation_email(request, user)
+    message.save()
+    return message
+
+
+@timed("email")
+def send_activation_emails(request, users):
+    """
+    複数ユーザーの有効化メールを 1 回の INSERT でアウトボックスへ登録する。
+    """
+    return EmailOutbox.objects.bulk_create(
+        [build_activation_email(request, user) for user in users]
+    )
+
+
+def build_activation_email(request, user):
+    """
+    アカウント有効化メールのアウトボックス行を（保存せずに）組み立てる。
     """
 
     # ① 認証URL生成
     uid = urlsafe_base64_encode(force_bytes(user.pk))
-    token = default_token_generator.make_token(user)
+    token = make_activation_token(user)
     domain = get_current_site(request).domain
     link = reverse("accounts:activate", kwargs={"uidb64": uid, "token": token})
     activate_url = f"http://{domain}{link}"
 
-    # ② メール送信
-    send_mail(
-        "アカウント有効化",
-        f"以下のリンクをクリックして有効化してください: {activate_url}",
-        getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@example.com"),
-        [user.email],
+    # ② アウトボックス行（送信はワーカーが行う）
+    return EmailOutbox(
+        subject="アカウント有効化",
+        body=f"以下のリンクをクリックして有効化してください: {activate_url}",
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@example.com"),
+        recipient=user.email,
+    )
+
+
+@timed("email")
+def enqueue_email(subject, body, recipient, from_email=None):
+    """
+    メールをアウトボックスへ登録する。
+
+    Args:
+        subject (str): 件名
+        body (str): 本文
+        recipient (str): 宛先メールアドレス
+        from_email (str, optional): 送信元（省略時は DEFAULT_FROM_EMAIL）
+
+    Returns:
+        EmailOutbox: 登録されたアウトボックス行
+    """
+    if from_email is None:
+        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@example.com")
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        recipient=recipient,
+    )
+
+
+@dataclass
+class OutboxDeliveryResult:
+    """deliver_outbox_batch() 1 回分の処理結果"""
+
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        """送信成功数 / 秒"""
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """試行回数に応じた指数バックオフ（上限あり）を返す"""
+    base = getattr(settings, "EMAIL_OUTBOX_BACKOFF_SECONDS", 30)
+    cap = getattr(settings, "EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+def _claim_batch(batch_size: int) -> list[EmailOutbox]:
+    """
+    送信対象を batch_size 件まで取得し、他のワーカーに取られないようロックする。
+
+    SQLite では SELECT ... FOR UPDATE SKIP LOCKED が使えないため、
+    条件付き UPDATE で claim_token を書き込み、書き込めた行だけを自分の担当とする。
+    ロック期限切れの「送信中」行（ワーカー異常終了など）も再取得の対象とする。
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, "EMAIL_OUTBOX_LEASE_SECONDS", 300))
+    claimable = Q(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=EmailOutbox.STATUS_SENDING, locked_until__lt=now
+    )
+
+    ids = list(
+        EmailOutbox.objects.filter(claimable)
+        .order_by("next_attempt_at", "pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    EmailOutbox.objects.filter(claimable, pk__in=ids).update(
+        status=EmailOutbox.STATUS_SENDING,
+        claim_token=token,
+        locked_until=now + lease,
+    )
+    return list(EmailOutbox.objects.filter(claim_token=token, status=EmailOutbox.STATUS_SENDING))
+
+
+def deliver_outbox_batch(batch_size=100, max_attempts=None, connection=None):
+    """
+    アウトボックスから 1 バッチ分を取り出し、1 本の SMTP 接続を使い回して送信する。
+
+    送信に失敗した行は指数バックオフで再送予約し、max_attempts を超えたら
+    「送信失敗」として残す。
+
+    Args:
+        batch_size (int): 1 回に取り出す最大件数
+        max_attempts (int, optional): 最大試行回数（省略時は EMAIL_OUTBOX_MAX_ATTEMPTS）
+        connection (optional): 使用するメール接続（省略時は EMAIL_BACKEND から生成）
+
+    Returns:
+        OutboxDeliveryResult: 処理件数と所要時間
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+
+    started = time.monotonic()
+    result = OutboxDeliveryResult()
+    rows = _claim_batch(batch_size)
+    result.claimed = len(rows)
+    if not rows:
+        result.elapsed = time.monotonic() - started
+        return result
+
+    connection = connection or get_connection()
+    sent_ids = []
+    try:
+        # ① 1 本の接続を開いたままバッチ全体を送る
+        connection.open()
+        for row in rows:
+            message = EmailMessage(
+                row.subject, row.body, row.from_email, [row.recipient], connection=connection
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                _schedule_retry(row, exc, max_attempts, result)
+            else:
+                sent_ids.append(row.pk)
+    except Exception as exc:
+        # 接続自体に失敗した場合は未送信の行をまとめて再送予約
+        for row in rows:
+            if row.pk not in sent_ids and row.status == EmailOutbox.STATUS_SENDING:
+                _schedule_retry(row, exc, max_attempts, result)
+    finally:
+        connection.close()
+
+    # ② 送信済みはまとめて 1 回の UPDATE で確定
+    #    ロック期限が切れて他のワーカーが取り直した行は、そちらの状態を上書きしないよう claim_token で絞る
+    if sent_ids:
+        EmailOutbox.objects.filter(pk__in=sent_ids, claim_token=rows[0].claim_token).update(
+            status=EmailOutbox.STATUS_SENT,
+            sent_at=timezone.now(),
+            locked_until=None,
+            last_error="",
+        )
+    result.sent = len(sent_ids)
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def _schedule_retry(row, exc, max_attempts, result):
+    """送信に失敗した行を再送予約、または送信失敗として確定する"""
+    row.attempts += 1
+    row.last_error = f"{type(exc).__name__}: {exc}"
+    row.locked_until = None
+    give_up = row.attempts >= max_attempts
+    if give_up:
+        row.status = EmailOutbox.STATUS_FAILED
+    else:
+        row.status = EmailOutbox.STATUS_PENDING
+        row.next_attempt_at = timezone.now() + _retry_delay(row.attempts)
+
+    # ロック期限が切れて他のワーカーが取り直した行（claim_token が変わった行）は更新しない
+    updated = EmailOutbox.objects.filter(pk=row.pk, claim_token=row.claim_token).update(
+        attempts=row.attempts,
+        last_error=row.last_error,
+        locked_until=None,
+        status=row.status,
+        next_attempt_at=row.next_attempt_at,
     )
+    if not updated:
+        logger.warning("メール送信失敗（他のワーカーが取得済みのため記録しない）: outbox=%s %s", row.pk, row.last_error)
+    elif give_up:
+        result.failed += 1
+        logger.error("メール送信失敗（再送打ち切り）: outbox=%s %s", row.pk, row.last_error)
+    else:
+        result.retried += 1
+        logger.warning("メール送信失敗（再送予約）: outbox=%s %s", row.pk, row.last_error)
@@ -0,0 +1,161 @@
+# accounts/export_service.py
+
+"""
+accounts.export_service モジュール
+
+ユーザーとプロフィール（顧客・従業員・SNS）の全件エクスポート（CSV / NDJSON）。
+
+CustomUser に 3 種類のプロフィールを LEFT OUTER JOIN した 1 クエリを values_list で
+チャンク（EXPORT_CHUNK_SIZE 件）ずつ読み出し、そのまま 1 行ずつ文字列にして返す。
+モデルのインスタンスも全件のリストも作らないので、件数によらずメモリ使用量は一定。
+読み出しは読み取りレプリカ（設定時）から行い、シャーディング有効時はシャードを順に読む
+（行はシャードごとに ID 順）。
+
+含まれる主な関数:
+- iter_export / aiter_export: エクスポートの本文を少しずつ返す（同期・非同期）
+- content_type / export_filename: レスポンス・ファイルの形式
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.utils import timezone
+
+from .sharding import user_databases
+
+User = get_user_model()
+
+# (出力の列名, CustomUser からのルックアップ)
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("email", "email"),
+    ("display_name", "display_name"),
+    ("is_active", "is_active"),
+    ("is_staff", "is_staff"),
+    ("date_joined", "date_joined"),
+    ("customer_firstname", "customer_profile__firstname"),
+    ("customer_lastname", "customer_profile__lastname"),
+    ("customer_postcode", "customer_profile__postcode"),
+    ("customer_address", "customer_profile__address"),
+    ("customer_phone_number", "customer_profile__phone_number"),
+    ("employee_firstname", "employee_profile__firstname"),
+    ("employee_lastname", "employee_profile__lastname"),
+    ("employee_department", "employee_profile__department"),
+    ("employee_position", "employee_profile__position"),
+    ("employee_hire_date", "employee_profile__hire_date"),
+    ("employee_qualifications", "employee_profile__qualifications"),
+    ("sns_nickname", "sns_profile__nickname"),
+    ("sns_bio", "sns_profile__bio"),
+)
+
+FORMATS = ("csv", "ndjson")
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+def get_chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def content_type(output):
+    return CONTENT_TYPES[output]
+
+
+def export_filename(output):
+    return f"users-{timezone.localdate():%Y%m%d}.{output}"
+
+
+def _querysets():
+    """データベース（シャード）ごとの、プロフィールを結合した values_list のクエリセット"""
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    for database in user_databases():
+        alias = database or router.db_for_read(User)
+        yield User.objects.using(alias).order_by("pk").values_list(*lookups)
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    """プロフィールが無い列（None）は空欄、真偽値は NDJSON に合わせて true / false"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return _value(value)
+
+
+class _CSVEncoder:
+    """1 行分の値を CSV の 1 行（改行付き）にする"""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def _line(self, values):
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerow(values)
+        return self.buffer.getvalue()
+
+    def header(self):
+        return self._line([column for column, _ in EXPORT_COLUMNS])
+
+    def encode(self, row):
+        return self._line([_csv_value(value) for value in row])
+
+
+class _NDJSONEncoder:
+    """1 行分の値を列名をキーにした JSON の 1 行（改行付き）にする"""
+
+    names = [column for column, _ in EXPORT_COLUMNS]
+
+    def header(self):
+        return ""
+
+    def encode(self, row):
+        return json.dumps(dict(zip(self.names, map(_value, row))), ensure_ascii=False) + "\n"
+
+
+ENCODERS = {"csv": _CSVEncoder, "ndjson": _NDJSONEncoder}
+
+
+def iter_export(output, chunk_size=None):
+    """
+    全ユーザーのエクスポートを output（"csv" / "ndjson"）形式で、chunk_size 行ずつの文字列で返す。
+    StreamingHttpResponse やファイルへの書き込みにそのまま渡せる。
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    encoder = ENCODERS[output]()
+    lines = [encoder.header()]
+    for queryset in _querysets():
+        for row in queryset.iterator(chunk_size=chunk_size):
+            lines.append(encoder.encode(row))
+            if len(lines) >= chunk_size:
+                yield "".join(lines)
+                lines = []
+    if lines:
+        yield "".join(lines)
+
+
+async def aiter_export(output, chunk_size=None):
+    """
+    iter_export() の非同期版（ASGI の StreamingHttpResponse 用）。
+    QuerySet.aiterator() は values_list では最初のクエリをイベントループ上で実行してしまうため、
+    iter_export() の 1 チャンク分ずつを sync_to_async のスレッドで進める。
+    """
+    chunks = iter_export(output, chunk_size)
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
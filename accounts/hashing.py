@@ -0,0 +1,201 @@
+# accounts/hashing.py
+
+"""
+accounts.hashing モジュール
+
+パスワードのハッシュ化・照合を実行する「ハッシュエグゼキュータ」。
+
+PBKDF2 などのハッシュ化は CPU を占有し GIL も解放しないため、
+リクエストスレッド上で実行すると 1 ワーカーあたりのログイン数が頭打ちになる。
+PASSWORD_HASH_EXECUTOR にプロセスプール版を指定すると、ハッシュ計算を子プロセスへ逃がし、
+待機中は GIL を解放するので、スレッドワーカー（gthread など）でも複数コアを使える。
+
+ハッシュ値は Django の make_password() / check_password() で生成・照合するので、
+PASSWORD_HASHERS の設定や既存のハッシュ値との互換性はそのまま保たれる。
+
+各エグゼキュータには ASGI（非同期ビュー）向けに amake_password / acheck_password があり、
+ハッシュ計算をイベントループの外で実行して await できる。
+ハッシュ化・照合の所要時間はリクエスト計測（accounts.instrumentation）の "hash" 区間に記録される。
+
+含まれる主なクラス・関数:
+- InlineHashExecutor: 呼び出し元スレッドでそのまま実行（従来どおりの挙動）
+- ProcessPoolHashExecutor: プロセスプールで実行
+- get_hash_executor: 設定に従ったエグゼキュータを返す
+- hash_passwords: 複数のパスワードをまとめてハッシュ化
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .instrumentation import timed
+
+DEFAULT_HASH_EXECUTOR = "accounts.hashing.InlineHashExecutor"
+
+
+class InlineHashExecutor:
+    """呼び出し元スレッドでハッシュ化・照合を行うエグゼキュータ"""
+
+    @timed("hash")
+    def make_password(self, password):
+        return make_password(password)
+
+    @timed("hash")
+    def check_password(self, password, encoded, setter=None):
+        return check_password(password, encoded, setter)
+
+    @timed("hash")
+    def make_passwords(self, passwords):
+        return [make_password(password) for password in passwords]
+
+    @timed("hash")
+    async def _arun(self, func, *args):
+        """func をイベントループの外（スレッドプール）で実行して結果を待つ"""
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+
+    async def amake_password(self, password):
+        return await self._arun(make_password, password)
+
+    async def acheck_password(self, password, encoded, setter=None):
+        """check_password() の非同期版。setter は await 可能な関数を渡す"""
+        is_correct = await self._arun(_verify, password, encoded)
+        if setter and is_correct and _must_update(encoded):
+            await setter(password)
+        return is_correct
+
+    def shutdown(self):
+        pass
+
+
+def _init_worker(settings_module):
+    """子プロセスで Django を初期化する（spawn 起動時のみ必要）"""
+    if not settings.configured:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+        django.setup()
+
+
+def _verify(password, encoded):
+    """子プロセスで実行する照合処理（setter はプロセスを越えられないので渡さない）"""
+    return check_password(password, encoded)
+
+
+def _must_update(encoded):
+    """照合に成功したハッシュ値を、現在の推奨ハッシャーで作り直すべきか"""
+    preferred = get_hasher("default")
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+class ProcessPoolHashExecutor(InlineHashExecutor):
+    """
+    プロセスプールでハッシュ化・照合を行うエグゼキュータ。
+
+    プールは初回利用時に生成する。件数が threshold 未満の一括ハッシュ化は
+    プロセス間通信のコストの方が大きいので、プールに渡さずその場で実行する。
+    """
+
+    def __init__(self, max_workers=None, threshold=8):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", ""),),
+                )
+            return self._pool
+
+    @timed("hash")
+    def make_password(self, password):
+        return self.pool.submit(make_password, password).result()
+
+    @timed("hash")
+    def check_password(self, password, encoded, setter=None):
+        is_correct = self.pool.submit(_verify, password, encoded).result()
+        # ハッシャーの変更・反復回数の増加に追従した再ハッシュは従来どおり setter に任せる
+        if setter and is_correct and _must_update(encoded):
+            setter(password)
+        return is_correct
+
+    @timed("hash")
+    async def _arun(self, func, *args):
+        # プロセスプールの Future をそのまま await する（スレッドを経由しない）
+        return await asyncio.wrap_future(self.pool.submit(func, *args))
+
+    @timed("hash")
+    def make_passwords(self, passwords):
+        passwords = list(passwords)
+        if len(passwords) < self.threshold:
+            return super().make_passwords(passwords)
+        chunksize = max(1, len(passwords) // (self.max_workers * 4))
+        return list(self.pool.map(make_password, passwords, chunksize=chunksize))
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor():
+    """
+    PASSWORD_HASH_EXECUTOR（ドット区切りのクラスパス）に従ったエグゼキュータを返す。
+    インスタンスはプロセス内で 1 つだけ生成して使い回す。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            executor_class = import_string(
+                getattr(settings, "PASSWORD_HASH_EXECUTOR", DEFAULT_HASH_EXECUTOR)
+            )
+            if issubclass(executor_class, ProcessPoolHashExecutor):
+                _executor = executor_class(max_workers=getattr(settings, "PASSWORD_HASH_WORKERS", None))
+            else:
+                _executor = executor_class()
+        return _executor
+
+
+@receiver(setting_changed)
+def _reset_hash_executor(*, setting, **kwargs):
+    """テストなどで設定が変わったらエグゼキュータを作り直す"""
+    global _executor
+    if setting in ("PASSWORD_HASH_EXECUTOR", "PASSWORD_HASH_WORKERS", "PASSWORD_HASHERS"):
+        with _executor_lock:
+            if _executor is not None:
+                _executor.shutdown()
+            _executor = None
+
+
+def hash_passwords(passwords):
+    """
+    パスワードのリストをハッシュ化する。
+
+    Args:
+        passwords (list[str | None]): 平文パスワードのリスト（None は使用不可パスワード）
+
+    Returns:
+        list[str]: 入力と同じ順序のハッシュ値のリスト
+    """
+    return get_hash_executor().make_passwords(passwords)
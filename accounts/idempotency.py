@@ -0,0 +1,219 @@
+# accounts/idempotency.py
+
+"""
+accounts.idempotency モジュール
+
+Idempotency-Key ヘッダー付きの POST（サインアップなど）の応答を保存し、
+同じキーの再送には保存した応答を返す（accounts.middleware.IdempotencyMiddleware が使う）。
+ログイン（IDEMPOTENCY_EXCLUDED_PATHS）は対象外。応答のトークンを IDEMPOTENCY_KEY_TTL の間キャッシュに残さないため
+（再送はそのまま実行すればよく、ログアウトで失効したトークンを返すこともない）。
+
+保存先はキャッシュ（IDEMPOTENCY_CACHE のエイリアス）。1 つのキーにつき 1 項目で、状態は 2 つ。
+- 実行中: 最初のリクエストが cache.add() で置く印（IDEMPOTENCY_LOCK_SECONDS で失効）。
+  同じキーのリクエストはビューを実行しない。同期版はすぐに 409（Retry-After 付き）を返し（待つ間ワーカーの
+  スレッドを塞がないため）、非同期版は完了を待って同じ応答を返す（同時の再送をまとめる）
+- 完了: ステータス・ヘッダー・本文（IDEMPOTENCY_KEY_TTL 秒保存）
+キーは「パス + Idempotency-Key」ごとで、リクエストの内容（メソッド・パス・クエリ・Authorization・本文）の
+ハッシュも保存する。同じキーで内容の違うリクエストは実行せずに 422 を返す
+（パスワードを含む本文が一致しない限り、保存したトークンは返さない）。
+5xx の応答・ストリーミング応答・例外は保存せず、印を消して再実行できるようにする。
+
+含まれる主な関数:
+- get_idempotency_key: リクエストの Idempotency-Key（対象外なら None）
+- begin / abegin: 実行を始める・保存済みの応答を取得する（abegin は他のリクエストの完了を待つ）
+- finish / afinish: 応答を保存する（保存できない応答なら印を消す）
+"""
+
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+RUNNING = "running"
+DONE = "done"
+
+# 完了待ちの間隔（秒）
+POLL_INTERVAL = 0.05
+
+KEY_REUSED_ERROR = {"detail": f"{HEADER} は内容の異なる別のリクエストで使われています。"}
+IN_PROGRESS_ERROR = {"detail": f"同じ {HEADER} のリクエストを処理中です。しばらくしてから再送してください。"}
+
+
+def get_cache():
+    return caches[getattr(settings, "IDEMPOTENCY_CACHE", "default")]
+
+
+def get_ttl():
+    return getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24)
+
+
+def get_lock_seconds():
+    return getattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 30)
+
+
+def get_wait_seconds():
+    return getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 10)
+
+
+def get_retry_after():
+    return getattr(settings, "IDEMPOTENCY_RETRY_AFTER", 1)
+
+
+def get_idempotency_key(request):
+    """
+    対象のリクエストなら Idempotency-Key の値を返す（対象外は None）。
+    対象: IDEMPOTENCY_PATHS で始まり、IDEMPOTENCY_EXCLUDED_PATHS（トークンを返すログイン）で始まらないパスへの POST。
+    本文が DATA_UPLOAD_MAX_MEMORY_SIZE を超えるもの（一括登録など）は本文のハッシュを取れないので対象外。
+    """
+    if request.method != "POST":
+        return None
+    key = request.headers.get(HEADER)
+    if not key:
+        return None
+    if not request.path.startswith(tuple(getattr(settings, "IDEMPOTENCY_PATHS", ["/api/accounts/"]))):
+        return None
+    if request.path.startswith(tuple(getattr(settings, "IDEMPOTENCY_EXCLUDED_PATHS", ["/api/accounts/login/"]))):
+        return None
+    max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if max_size is not None and int(request.META.get("CONTENT_LENGTH") or 0) > max_size:
+        return None
+    return key
+
+
+def invalid_key_response(key):
+    """キーの形式が不正なら 400 の応答（正しければ None）"""
+    if len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        return JsonResponse({"detail": f"{HEADER} は {MAX_KEY_LENGTH} 文字以内で指定してください。"}, status=400)
+    return None
+
+
+def _cache_key(request, key):
+    digest = hashlib.sha256(f"{request.path}\0{key}".encode()).hexdigest()
+    return f"accounts:idempotency:{digest}"
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path(), request.headers.get("Authorization", "")):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(entry):
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for name, value in entry["headers"]:
+        response[name] = value
+    response[REPLAY_HEADER] = "true"
+    return response
+
+
+def _storable(response):
+    return not response.streaming and response.status_code < 500
+
+
+def _entry(fingerprint, response):
+    return {
+        "state": DONE,
+        "fingerprint": fingerprint,
+        "status": response.status_code,
+        "headers": list(response.items()),
+        "content": response.content,
+    }
+
+
+class Execution:
+    """begin() の結果。response が None ならビューを実行し、finish() を呼ぶ"""
+
+    def __init__(self, cache_key, fingerprint, response=None):
+        self.cache_key = cache_key
+        self.fingerprint = fingerprint
+        self.response = response
+
+
+def _in_progress_response():
+    response = JsonResponse(IN_PROGRESS_ERROR, status=409)
+    response["Retry-After"] = str(get_retry_after())
+    return response
+
+
+def _resolve(entry, fingerprint):
+    """既存の項目に対する応答（待つ必要があれば None）"""
+    if entry["fingerprint"] != fingerprint:
+        return JsonResponse(KEY_REUSED_ERROR, status=422)
+    if entry["state"] == DONE:
+        return _replay(entry)
+    return None
+
+
+def begin(request, key):
+    """
+    Idempotency-Key のリクエストを始める。
+
+    - 初めてのキー: 実行中の印を置き、response が None の Execution を返す（呼び出し元がビューを実行する）
+    - 完了済みのキー: 保存した応答を返す
+    - 実行中のキー: 待たずに 409（Retry-After 付き）を返す。同期のワーカーではスレッドを塞いで待つと、
+      その間ほかのリクエストを処理できないため。印が消えていた（実行が失敗した）ら、代わりに実行を引き受ける
+    """
+    cache = get_cache()
+    cache_key = _cache_key(request, key)
+    fingerprint = _fingerprint(request)
+    # add() と get() の間に印が消えた（実行が終わった）場合に備えて 2 回まで試す
+    for _ in range(2):
+        if cache.add(cache_key, {"state": RUNNING, "fingerprint": fingerprint}, get_lock_seconds()):
+            return Execution(cache_key, fingerprint)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return Execution(cache_key, fingerprint, _resolve(entry, fingerprint) or _in_progress_response())
+    return Execution(cache_key, fingerprint, _in_progress_response())
+
+
+async def abegin(request, key):
+    """
+    begin() の非同期版。実行中のキーは、イベントループを止めずに完了（最長 IDEMPOTENCY_WAIT_SECONDS 秒）を待って
+    保存した応答を返す。待っている間に印が消えた（実行が失敗した）ら、代わりに実行を引き受ける。時間切れなら 409
+    """
+    cache = get_cache()
+    cache_key = _cache_key(request, key)
+    fingerprint = _fingerprint(request)
+    deadline = time.monotonic() + get_wait_seconds()
+    while True:
+        if await cache.aadd(cache_key, {"state": RUNNING, "fingerprint": fingerprint}, get_lock_seconds()):
+            return Execution(cache_key, fingerprint)
+        entry = await cache.aget(cache_key)
+        if entry is not None:
+            response = _resolve(entry, fingerprint)
+            if response is not None:
+                return Execution(cache_key, fingerprint, response)
+        if time.monotonic() >= deadline:
+            return Execution(cache_key, fingerprint, _in_progress_response())
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def finish(execution, response):
+    """
+    実行した応答を保存する。保存しない応答（5xx・ストリーミング）や例外（response が None）なら
+    印を消して、再送で実行し直せるようにする。
+    """
+    cache = get_cache()
+    if response is not None and _storable(response):
+        cache.set(execution.cache_key, _entry(execution.fingerprint, response), get_ttl())
+    else:
+        cache.delete(execution.cache_key)
+
+
+async def afinish(execution, response):
+    """finish() の非同期版"""
+    cache = get_cache()
+    if response is not None and _storable(response):
+        await cache.aset(execution.cache_key, _entry(execution.fingerprint, response), get_ttl())
+    else:
+        await cache.adelete(execution.cache_key)
@@ -0,0 +1,146 @@
+# accounts/instrumentation.py
+
+"""
+accounts.instrumentation モジュール
+
+リクエスト単位の計測（SQL の件数・DB 時間・名前付き区間の時間）。
+RequestTimingMiddleware（accounts/middleware.py）が計測対象のリクエストで start_request() を呼び、
+処理中の SQL と span() / timed() で囲んだ区間の時間を RequestMetrics に集計する。
+
+計測中のリクエストは ContextVar で保持するので、スレッド（sync_to_async）や
+非同期タスクをまたいでも同じリクエストに集計される。計測対象外のリクエストや
+リクエスト外（管理コマンドなど）では、span() / timed() は何もしない。
+
+含まれる主なクラス・関数:
+- RequestMetrics: 1 リクエスト分の計測結果
+- start_request / finish_request: 計測の開始・終了
+- span: 名前付き区間を計測するコンテキストマネージャ
+- timed: 関数（同期・非同期）全体を span で囲むデコレータ
+"""
+
+import functools
+import inspect
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_current = ContextVar("accounts_request_metrics", default=None)
+_active_spans = ContextVar("accounts_active_spans", default=frozenset())
+
+
+class RequestMetrics:
+    """1 リクエスト分の計測結果（時間はすべて秒）"""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = defaultdict(float)
+        self.span_counts = defaultdict(int)
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total * 1000, 2),
+            "db_ms": round(self.db_time * 1000, 2),
+            "queries": self.queries,
+            "spans": {name: round(value * 1000, 2) for name, value in self.spans.items()},
+        }
+
+    def server_timing(self):
+        """Server-Timing ヘッダーの値"""
+        entries = [
+            f"total;dur={self.total * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        entries += [
+            f'{name};dur={value * 1000:.1f};desc="{self.span_counts[name]}x"'
+            for name, value in self.spans.items()
+        ]
+        return ", ".join(entries)
+
+
+def _record_query(execute, sql, params, many, context):
+    """DB 接続の execute_wrapper。計測中のリクエストがあれば件数と時間を加算する"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += perf_counter() - started
+        metrics.queries += 1
+
+
+def install_query_recorder(connection):
+    """接続に _record_query を（まだなければ）登録する"""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def _on_connection_created(sender, connection, **kwargs):
+    # 非同期ビューの ORM が使うスレッドの接続も含め、新しい接続すべてに登録する
+    install_query_recorder(connection)
+
+
+def start_request():
+    """計測を開始し、(RequestMetrics, 終了用トークン) を返す"""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(metrics, token):
+    """計測を終了して RequestMetrics を確定する"""
+    metrics.total = perf_counter() - metrics.started
+    _current.reset(token)
+    return metrics
+
+
+@contextmanager
+def span(name):
+    """
+    with ブロックの所要時間を計測中のリクエストの name に加算する。
+    同じ名前の span の入れ子は外側だけを数える（二重計上しない）。
+    """
+    metrics = _current.get()
+    active = _active_spans.get()
+    if metrics is None or name in active:
+        yield
+        return
+    token = _active_spans.set(active | {name})
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.spans[name] += perf_counter() - started
+        metrics.span_counts[name] += 1
+        _active_spans.reset(token)
+
+
+def timed(name):
+    """関数の呼び出し全体を span(name) で囲むデコレータ（async 関数にも使える）"""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
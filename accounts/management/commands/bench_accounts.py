@@ -0,0 +1,220 @@
+# accounts/management/commands/bench_accounts.py
+
+"""
+accounts API の負荷・レイテンシを計測するベンチマークスイート。
+
+使い方:
+    python manage.py bench_accounts                                  # テストクライアントで計測
+    python manage.py bench_accounts --transport http                 # ローカル HTTP サーバー経由
+    python manage.py bench_accounts --users 200 --threads 8 --output bench/2.1.0.json
+    python manage.py bench_accounts --baseline bench/2.0.0.json      # 前回の結果と比較
+
+1 ユーザーあたり以下の流れを実行する（実際の利用に近い比率）:
+    サインアップ → 有効化（アウトボックスのメールのリンク） → ログイン
+    → 認証付きリクエスト（me/）× --reads 回 → ログアウト
+
+操作ごとにスループット・p50/p95/p99 レイテンシ・1 リクエストあたりの SQL 数を集計する。
+SQL 数は同じプロセス・スレッドでビューを実行する --transport client のときだけ計測できる。
+
+--baseline を指定すると、p95 レイテンシが --tolerance の割合を超えて悪化した操作や
+SQL 数が増えた操作を表示し、終了コード 1 で終了する（CI でのリグレッション検出用）。
+"""
+
+import json
+import re
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.benchmarks import (
+    FAST_HASHERS,
+    QueryCounter,
+    benchmark_database,
+    compare_results,
+    live_server,
+    result_metadata,
+    run_concurrently,
+    summarize,
+)
+from accounts.models import EmailOutbox
+
+PASSWORD = "bench-password-123"
+ACTIVATION_LINK = re.compile(r"https?://[^/\s]+(/\S+)")
+
+
+class ClientTransport:
+    """テストクライアント（プロセス内でビューを直接呼び出す）"""
+
+    counts_queries = True
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None, headers=None):
+        response = self.client.generic(
+            method,
+            path,
+            json.dumps(data) if data is not None else "",
+            content_type="application/json",
+            headers=headers,
+        )
+        return response.status_code, response.content
+
+
+class HTTPTransport:
+    """ローカルで起動した HTTP サーバーへ urllib でリクエストする"""
+
+    counts_queries = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def request(self, method, path, data=None, headers=None):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(data).encode() if data is not None else None,
+            headers={"Content-Type": "application/json", **(headers or {})},
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+
+class Command(BaseCommand):
+    help = "accounts API のスループット・レイテンシ・SQL 数を計測し、結果を JSON で保存します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="実行するユーザー数")
+        parser.add_argument("--threads", type=int, default=4, help="同時実行スレッド数")
+        parser.add_argument("--reads", type=int, default=5, help="1 ユーザーあたりの me/ の回数")
+        parser.add_argument(
+            "--transport", choices=["client", "http"], default="client",
+            help="client: テストクライアント / http: ローカル HTTP サーバー",
+        )
+        parser.add_argument("--fast-hasher", action="store_true", help="MD5 ハッシャーで計測する")
+        parser.add_argument("--output", help="結果を保存する JSON ファイル")
+        parser.add_argument("--baseline", help="比較する前回の結果（JSON ファイル）")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2, help="許容する p95 の悪化の割合（0.2 = 20%%）"
+        )
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                baseline = json.loads(Path(options["baseline"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"ベースラインを読み込めません: {exc}")
+
+        overrides = {"USE_EMAIL_VERIFICATION": True}
+        if options["fast_hasher"]:
+            overrides["PASSWORD_HASHERS"] = FAST_HASHERS
+
+        with benchmark_database(), override_settings(**overrides):
+            if options["transport"] == "http":
+                with live_server() as base_url:
+                    result = self._bench(lambda: HTTPTransport(base_url), options)
+            else:
+                result = self._bench(ClientTransport, options)
+            result["meta"] = result_metadata(
+                **{key: options[key] for key in ("users", "threads", "reads", "transport", "fast_hasher")}
+            )
+
+        if options["output"]:
+            output = Path(options["output"])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            self._report(result)
+
+        if baseline is not None:
+            regressions = compare_results(
+                baseline.get("operations", {}), result["operations"], options["tolerance"]
+            )
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(f"悪化: {regression}")
+                raise CommandError(f"{len(regressions)} 件の悪化があります", returncode=1)
+            self.stdout.write(self.style.SUCCESS("ベースラインからの悪化はありません"))
+
+    def _report(self, result):
+        self.stdout.write(f"全体: {result['requests_per_second']:.1f} req/s")
+        for name, summary in result["operations"].items():
+            queries = "-" if summary["queries"] is None else f"{summary['queries']:.1f}"
+            self.stdout.write(
+                f"  {name:>8}: {summary['throughput']:7.1f} req/s, p50 {summary['p50_ms']:.1f}ms"
+                f" / p95 {summary['p95_ms']:.1f}ms / p99 {summary['p99_ms']:.1f}ms, {queries} クエリ/リクエスト"
+            )
+
+    def _bench(self, transport_factory, options):
+        latencies = defaultdict(list)
+        queries = defaultdict(list)
+        lock = threading.Lock()
+        local = threading.local()
+
+        def call(name, method, path, data=None, headers=None, expected=(200, 201)):
+            transport = local.transport
+            with QueryCounter() as counter:
+                started = perf_counter()
+                status, body = transport.request(method, path, data, headers)
+                elapsed = perf_counter() - started
+            if status not in expected:
+                raise RuntimeError(f"{name} に失敗しました: {status} {body[:200]!r}")
+            with lock:
+                latencies[name].append(elapsed)
+                if transport.counts_queries:
+                    queries[name].append(counter.count)
+            return json.loads(body) if body else {}
+
+        def flow(i):
+            if not hasattr(local, "transport"):
+                local.transport = transport_factory()
+            email = f"bench{i}@example.com"
+            call("signup", "POST", reverse("accounts:signup_customer"),
+                 {"email": email, "password": PASSWORD})
+            call("activate", "GET", self._activation_path(email))
+            body = call("login", "POST", reverse("accounts:login_api"),
+                        {"username": email, "password": PASSWORD})
+            auth = {"Authorization": f"{body.get('token_type', 'Token')} {body['token']}"}
+            for _ in range(options["reads"]):
+                call("me", "GET", reverse("accounts:me"), headers=auth)
+            call("logout", "POST", reverse("accounts:logout_api"), headers=auth)
+
+        _, elapsed = run_concurrently(flow, options["users"], options["threads"])
+
+        operations = {}
+        for name, values in latencies.items():
+            summary = summarize(values, elapsed)
+            summary["queries"] = (
+                round(sum(queries[name]) / len(queries[name]), 2) if queries[name] else None
+            )
+            operations[name] = summary
+        total = sum(len(values) for values in latencies.values())
+        return {
+            "requests_per_second": total / elapsed if elapsed > 0 else 0.0,
+            "operations": operations,
+        }
+
+    @staticmethod
+    def _activation_path(email):
+        """アウトボックスに登録された有効化メールからリンクのパスを取り出す（計測には含めない）"""
+        outbox = EmailOutbox.objects.filter(recipient=email).latest("pk")
+        match = ACTIVATION_LINK.search(outbox.body)
+        if match is None:
+            raise RuntimeError(f"有効化リンクが見つかりません: {email}")
+        return match.group(1)
@@ -0,0 +1,134 @@
+# accounts/management/commands/bench_asgi.py
+
+"""
+accounts API を WSGI（同期ビュー）と ASGI（非同期ビュー）で高い同時実行数のもとに比較する。
+
+使い方:
+    python manage.py bench_asgi                          # 同時 50, 200 ユーザー
+    python manage.py bench_asgi --concurrency 200 --users 1000 --fast-hasher --json
+
+1 ユーザーあたり「サインアップ → ログイン → ログアウト」を実行する。
+WSGI は Client を同時実行数ぶんのスレッドから、ASGI は AsyncClient を同時実行数ぶんの
+タスクから呼び出す（どちらもプロセス内でハンドラを直接呼び出し、ネットワークは経由しない）。
+--fast-hasher を付けると MD5 ハッシャーを使い、ハッシュ計算以外のオーバーヘッドを比較できる。
+"""
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from types import ModuleType
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import include, path
+
+from accounts.benchmarks import FAST_HASHERS, benchmark_database, run_concurrently, summarize
+
+PASSWORD = "bench-password-123"
+
+
+def _urlconf(module):
+    """accounts API だけを api/accounts/ に割り当てた URLconf（ROOT_URLCONF の差し替え用）"""
+    urlconf = ModuleType(f"bench_urls_{module.rsplit('.', 1)[-1]}")
+    urlconf.urlpatterns = [path("api/accounts/", include(module))]
+    return urlconf
+
+
+class Command(BaseCommand):
+    help = "accounts API を WSGI（同期ビュー）と ASGI（非同期ビュー）で比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200, help="実行するユーザー数")
+        parser.add_argument("--concurrency", type=int, default=50, help="同時実行数")
+        parser.add_argument("--fast-hasher", action="store_true", help="MD5 ハッシャーで計測する")
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        overrides = {"USE_EMAIL_VERIFICATION": False}
+        if options["fast_hasher"]:
+            overrides["PASSWORD_HASHERS"] = FAST_HASHERS
+
+        results = {}
+        with benchmark_database(), override_settings(**overrides):
+            with override_settings(ROOT_URLCONF=_urlconf("accounts.api.urls")):
+                results["wsgi"] = self._bench_wsgi(options)
+            with override_settings(ROOT_URLCONF=_urlconf("accounts.api.async_urls")):
+                results["asgi"] = asyncio.run(self._bench_asgi(options))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, result in results.items():
+            self.stdout.write(f"[{mode}] {result['requests_per_second']:.1f} req/s")
+            for operation, summary in result["operations"].items():
+                self.stdout.write(
+                    f"  {operation:>7}: p50 {summary['p50_ms']:.1f}ms / p95 {summary['p95_ms']:.1f}ms"
+                    f" / p99 {summary['p99_ms']:.1f}ms"
+                )
+
+    @staticmethod
+    def _result(latencies, elapsed):
+        total = sum(len(values) for values in latencies.values())
+        return {
+            "requests_per_second": total / elapsed if elapsed > 0 else 0.0,
+            "operations": {name: summarize(values, elapsed) for name, values in latencies.items()},
+        }
+
+    def _bench_wsgi(self, options):
+        latencies = defaultdict(list)
+
+        def flow(i):
+            auth = {}
+            for name, call in self._steps(Client(), f"wsgi{i}@example.com", auth):
+                started = time.perf_counter()
+                response = call()
+                latencies[name].append(time.perf_counter() - started)
+                self._check(name, response, auth)
+
+        _, elapsed = run_concurrently(flow, options["users"], options["concurrency"])
+        return self._result(latencies, elapsed)
+
+    async def _bench_asgi(self, options):
+        latencies = defaultdict(list)
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def flow(i):
+            async with semaphore:
+                auth = {}
+                for name, call in self._steps(AsyncClient(), f"asgi{i}@example.com", auth):
+                    started = time.perf_counter()
+                    response = await call()
+                    latencies[name].append(time.perf_counter() - started)
+                    self._check(name, response, auth)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(flow(i) for i in range(options["users"])))
+        return self._result(latencies, time.perf_counter() - started)
+
+    @staticmethod
+    def _steps(client, email, auth):
+        """
+        1 ユーザー分のリクエスト（名前, 呼び出し）。Client / AsyncClient のどちらでも使える。
+        auth にはログイン後に Authorization ヘッダーが入る（_check 参照）。
+        """
+        return [
+            ("signup", lambda: client.post(
+                "/api/accounts/signup/customer/", {"email": email, "password": PASSWORD},
+                content_type="application/json",
+            )),
+            ("login", lambda: client.post(
+                "/api/accounts/login/", {"username": email, "password": PASSWORD},
+                content_type="application/json",
+            )),
+            ("logout", lambda: client.post("/api/accounts/logout/", headers=auth)),
+        ]
+
+    @staticmethod
+    def _check(name, response, auth):
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"{name} に失敗しました: {response.status_code} {response.content!r}")
+        if name == "login":
+            body = response.json()
+            auth["Authorization"] = f"{body['token_type']} {body['token']}"
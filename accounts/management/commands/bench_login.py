@@ -0,0 +1,80 @@
+# accounts/management/commands/bench_login.py
+
+"""
+ログイン API（LoginView）のスループットを、ハッシュエグゼキュータごとに計測する。
+
+使い方:
+    python manage.py bench_login                       # inline / process を比較
+    python manage.py bench_login --threads 8 --requests 200
+    python manage.py bench_login --executor accounts.hashing.InlineHashExecutor
+
+1 プロセス内の複数スレッドからログインを実行するので、
+スレッドワーカー（gunicorn --threads など）1 個あたりのログイン数/秒に相当する。
+"""
+
+import json
+import threading
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.benchmarks import benchmark_database, run_concurrently, summarize
+from accounts.hashing import get_hash_executor
+from accounts.models import CustomUser
+
+EXECUTORS = [
+    "accounts.hashing.InlineHashExecutor",
+    "accounts.hashing.ProcessPoolHashExecutor",
+]
+
+
+class Command(BaseCommand):
+    help = "ログイン API のスループット（ログイン数/秒）をハッシュエグゼキュータごとに計測します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=40, help="計測するログイン回数")
+        parser.add_argument("--threads", type=int, default=4, help="同時実行スレッド数")
+        parser.add_argument(
+            "--executor", action="append", help="比較するエグゼキュータ（複数指定可）"
+        )
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        results = {}
+        with benchmark_database():
+            email, password = "bench@example.com", "bench-password"
+            user = CustomUser.objects.create_user(email, password)
+            CustomUser.objects.filter(pk=user.pk).update(is_active=True)
+
+            for executor in options["executor"] or EXECUTORS:
+                with override_settings(PASSWORD_HASH_EXECUTOR=executor):
+                    results[executor] = self._bench(email, password, options)
+                    get_hash_executor().shutdown()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for executor, summary in results.items():
+            self.stdout.write(
+                f"{executor}: {summary['throughput']:.2f} ログイン/秒 "
+                f"(p50 {summary['p50_ms']:.0f}ms, p99 {summary['p99_ms']:.0f}ms, "
+                f"{options['threads']} スレッド, {summary['count']} 回)"
+            )
+
+    def _bench(self, email, password, options):
+        url = reverse("accounts:login_api")
+        local = threading.local()
+
+        def login(_):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            response = local.client.post(url, {"username": email, "password": password})
+            if response.status_code != 200:
+                raise RuntimeError(f"ログインに失敗しました: {response.status_code} {response.content!r}")
+
+        # プロセスプールの起動やトークン作成は計測から除く
+        login(None)
+        latencies, elapsed = run_concurrently(login, options["requests"], options["threads"])
+        return summarize(latencies, elapsed)
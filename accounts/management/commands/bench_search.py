@@ -0,0 +1,105 @@
+# accounts/management/commands/bench_search.py
+
+"""
+プロフィール検索のレイテンシを、FTS5 の索引（accounts.search）と icontains の全件走査で比較する。
+
+使い方:
+    python manage.py bench_search
+    python manage.py bench_search --profiles 100000 --repeat 50 --json
+
+従業員プロフィールを --profiles 件作成し、よく一致する語・まれな語・複数語・2 文字の語で
+1 ページ分（--limit 件）を検索する。icontains は accounts.search の FTS5 非対応時の検索と同じもの。
+
+icontains は ID 順に先頭から走査して limit 件見つかった時点で終わるため、よく一致する語では速いが、
+まれな語ではテーブル全体を走査する。FTS5 は一致した行をすべて bm25 で順位付けするため、
+一致件数に比例した時間がかかる（関連度順に並べる代わりのコスト）。
+"""
+
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.benchmarks import benchmark_database, summarize
+from accounts.models import CustomUser, EmployeeProfile
+from accounts.search import SEARCH_INDEXES, _search_fts, _search_icontains, parse_query
+
+LASTNAMES = ["佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤"]
+FIRSTNAMES = ["太郎", "花子", "一郎", "美咲", "健太", "陽菜", "翔太", "結衣", "大輔", "さくら"]
+QUALIFICATIONS = [
+    "基本情報技術者", "応用情報技術者", "ネットワークスペシャリスト", "データベーススペシャリスト",
+    "TOEIC 800", "日商簿記2級", "中小企業診断士", "宅地建物取引士", "衛生管理者", "AWS Solutions Architect",
+]
+RARE_QUALIFICATION = "システム監査技術者"
+
+QUERIES = {
+    "common": "情報技術者",
+    "rare": RARE_QUALIFICATION,
+    "multi": "佐藤 日商簿記",
+    "short": "花子",
+}
+
+
+class Command(BaseCommand):
+    help = "プロフィール検索のレイテンシを FTS5 と icontains で比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=50000, help="作成する従業員プロフィール数")
+        parser.add_argument("--repeat", type=int, default=20, help="検索語・方式ごとの検索回数")
+        parser.add_argument("--limit", type=int, default=20, help="1 回の検索で取得する件数")
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("このコマンドは SQLite 専用です")
+
+        index = SEARCH_INDEXES["employee"]
+        results = {}
+        with benchmark_database():
+            self._populate(options["profiles"])
+            for name, query in QUERIES.items():
+                terms = parse_query(query)
+                for method, search in (("fts", _search_fts), ("icontains", _search_icontains)):
+                    latencies = []
+                    for _ in range(options["repeat"]):
+                        started = time.perf_counter()
+                        hits = search(index, connection.alias, terms, options["limit"])
+                        latencies.append(time.perf_counter() - started)
+                    summary = summarize(latencies, sum(latencies))
+                    summary["hits"] = len(hits)
+                    results.setdefault(name, {})[method] = summary
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, methods in results.items():
+            self.stdout.write(f"[{name}] {QUERIES[name]}")
+            for method, summary in methods.items():
+                self.stdout.write(
+                    f"  {method:>9}: p50 {summary['p50_ms']:.2f}ms / p95 {summary['p95_ms']:.2f}ms"
+                    f" ({summary['hits']} 件)"
+                )
+
+    def _populate(self, count, batch_size=5000):
+        """従業員プロフィールを作成する（索引はトリガーで登録される）"""
+        rng = random.Random(0)
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            users = CustomUser.objects.bulk_create([
+                CustomUser(email=f"search{start + i}@example.com", password="!", is_active=True)
+                for i in range(size)
+            ])
+            EmployeeProfile.objects.bulk_create([
+                EmployeeProfile(
+                    user=user,
+                    lastname=rng.choice(LASTNAMES),
+                    firstname=rng.choice(FIRSTNAMES),
+                    # 約 0.1% の従業員だけがまれな資格を持つ
+                    qualifications=", ".join(
+                        rng.sample(QUALIFICATIONS, 2) + ([RARE_QUALIFICATION] if rng.random() < 0.001 else [])
+                    ),
+                )
+                for user in users
+            ])
@@ -0,0 +1,130 @@
+# accounts/management/commands/bench_sessions.py
+
+"""
+セッションの保存先（SESSION_MODE / SESSION_CACHE_BACKEND）ごとに、1 リクエストあたりの
+セッションの読み書きのコストを計測する。
+
+使い方:
+    python manage.py bench_sessions
+    python manage.py bench_sessions --requests 5000 --json
+
+SessionMiddleware を通したリクエストを 2 種類計測する。
+    read:  ログイン済みのセッションを読むだけ（テンプレート画面の表示など）
+    write: セッションを変更して保存する（ログイン・メッセージの追加など）
+クエリ数は 2 回目以降（キャッシュが温まった状態）のリクエスト 1 回分。
+"""
+
+import json
+import tempfile
+
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from accounts.benchmarks import QueryCounter, benchmark_database, run_concurrently, summarize
+from accounts.session_service import DATABASE_ENGINES
+
+ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+# (SESSION_MODE, SESSION_CACHE_BACKEND)
+MODES = [
+    ("db", None),
+    ("cached_db", "locmem"),
+    ("cached_db", "file"),
+    ("cache", "locmem"),
+    ("cache", "file"),
+    ("signed_cookies", None),
+]
+
+# ログイン済みセッションの典型的な中身
+LOGGED_IN_SESSION = {
+    "_auth_user_id": "1",
+    "_auth_user_backend": "django.contrib.auth.backends.ModelBackend",
+    "_auth_user_hash": "0" * 64,
+}
+
+
+def _read_view(request):
+    request.session.get("_auth_user_id")
+    return HttpResponse()
+
+
+def _write_view(request):
+    request.session["counter"] = request.session.get("counter", 0) + 1
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = "セッションの保存先ごとに 1 リクエストあたりの読み書きのコストを計測します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="方式・操作ごとのリクエスト数")
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        results = {}
+        with benchmark_database(), tempfile.TemporaryDirectory(prefix="accounts-sessions-") as cache_dir:
+            for mode, cache_backend in MODES:
+                name = f"{mode}+{cache_backend}" if cache_backend else mode
+                with override_settings(SESSION_ENGINE=ENGINES[mode], CACHES=self._caches(cache_backend, cache_dir)):
+                    results[name] = {
+                        operation: self._bench(view, options["requests"])
+                        for operation, view in (("read", _read_view), ("write", _write_view))
+                    }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, operations in results.items():
+            for operation, summary in operations.items():
+                self.stdout.write(
+                    f"{name:>17} {operation:>5}: p50 {summary['p50_ms']:.3f}ms / p95 {summary['p95_ms']:.3f}ms, "
+                    f"{summary['throughput']:.0f} req/s, {summary['queries']} クエリ/リクエスト"
+                )
+
+    @staticmethod
+    def _caches(cache_backend, cache_dir):
+        sessions = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-sessions"}
+        if cache_backend == "file":
+            sessions = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir}
+        sessions["OPTIONS"] = {"MAX_ENTRIES": 100000}
+        return {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}, "sessions": sessions}
+
+    def _bench(self, view, total):
+        from django.conf import settings
+
+        middleware = SessionMiddleware(view)
+        factory = RequestFactory()
+        session = middleware.SessionStore()
+        session.update(LOGGED_IN_SESSION)
+        session.save()
+        # signed_cookies は保存のたびにキー（Cookie の値）が変わる
+        cookie = {settings.SESSION_COOKIE_NAME: session.session_key}
+
+        def request(_):
+            response = middleware(factory.get("/", **{"HTTP_COOKIE": _cookie_header(cookie)}))
+            morsel = response.cookies.get(settings.SESSION_COOKIE_NAME)
+            if morsel is not None:
+                cookie[settings.SESSION_COOKIE_NAME] = morsel.value
+
+        # 1 回目（キャッシュが空の状態）は計測から除き、定常状態のクエリ数を記録する
+        request(None)
+        with QueryCounter() as queries:
+            request(None)
+
+        latencies, elapsed = run_concurrently(request, total)
+        summary = summarize(latencies, elapsed)
+        summary["queries"] = queries.count
+        summary["database"] = settings.SESSION_ENGINE in DATABASE_ENGINES
+        return summary
+
+
+def _cookie_header(cookie):
+    return "; ".join(f"{name}={value}" for name, value in cookie.items())
@@ -0,0 +1,140 @@
+# accounts/management/commands/bench_sqlite.py
+
+"""
+SQLite の接続設定（素の設定 / チューニング済み）ごとに、同時サインアップ・ログインのスループットを計測する。
+
+使い方:
+    python manage.py bench_sqlite
+    python manage.py bench_sqlite --users 400 --threads 16 --fast-hasher --json
+
+モードごとに新しい一時ファイルの DB を作成する（journal_mode=WAL はファイルに記録されるため）。
+「database is locked」などで失敗したリクエストは中断せずに件数として数える。
+"""
+
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from accounts.benchmarks import FAST_HASHERS, benchmark_database, run_concurrently, summarize
+
+PASSWORD = "bench-password-123"
+
+# settings.py の SQLITE_TUNED=True 相当の設定と、Django の既定の設定
+MODES = {
+    "default": {
+        "pragmas": {},
+        "database": {"OPTIONS": {}, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+    },
+    "tuned": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": -20000,
+            "mmap_size": 134217728,
+            "temp_store": "MEMORY",
+        },
+        "database": {
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 5},
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+        },
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "SQLite の接続設定ごとに同時サインアップ・ログインのスループットを計測します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200, help="サインアップ・ログインするユーザー数")
+        parser.add_argument("--threads", type=int, default=8, help="同時実行スレッド数")
+        parser.add_argument("--mode", action="append", choices=list(MODES), help="計測するモード")
+        parser.add_argument("--fast-hasher", action="store_true", help="MD5 ハッシャーで計測する")
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("このコマンドは SQLite 専用です")
+
+        overrides = {"USE_EMAIL_VERIFICATION": False}
+        if options["fast_hasher"]:
+            overrides["PASSWORD_HASHERS"] = FAST_HASHERS
+
+        results = {}
+        for mode in options["mode"] or MODES:
+            config = MODES[mode]
+            with self._database_settings(config["database"]):
+                with override_settings(SQLITE_PRAGMAS=config["pragmas"], **overrides):
+                    with benchmark_database():
+                        results[mode] = self._bench(options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, result in results.items():
+            self.stdout.write(f"[{mode}]")
+            for operation, summary in result.items():
+                errors = ", ".join(f"{name} {count}" for name, count in summary["errors"].items())
+                self.stdout.write(
+                    f"  {operation:>6}: {summary['throughput']:.1f} req/s, p50 {summary['p50_ms']:.1f}ms"
+                    f" / p95 {summary['p95_ms']:.1f}ms / p99 {summary['p99_ms']:.1f}ms"
+                    f", 失敗 {sum(summary['errors'].values())} 件" + (f"（{errors}）" if errors else "")
+                )
+
+    @staticmethod
+    @contextmanager
+    def _database_settings(values):
+        """default データベースの設定を一時的に差し替える（既存の接続は閉じる）"""
+        settings_dict = connections.settings["default"]
+        saved = {key: settings_dict.get(key) for key in values}
+        connections.close_all()
+        settings_dict.update(values)
+        try:
+            yield
+        finally:
+            connections.close_all()
+            settings_dict.update(saved)
+
+    def _bench(self, options):
+        local = threading.local()
+        emails = [f"sqlite{i}@example.com" for i in range(options["users"])]
+
+        def phase(url, payload):
+            errors = Counter()
+            lock = threading.Lock()
+
+            def request(i):
+                if not hasattr(local, "client"):
+                    local.client = Client()
+                try:
+                    response = local.client.post(url, payload(emails[i]), content_type="application/json")
+                    failed = None if response.status_code in (200, 201) else f"HTTP {response.status_code}"
+                except Exception as exc:  # ロック待ちのタイムアウトなども数える
+                    failed = type(exc).__name__
+                if failed:
+                    with lock:
+                        errors[failed] += 1
+
+            latencies, elapsed = run_concurrently(request, len(emails), options["threads"])
+            summary = summarize(latencies, elapsed)
+            summary["errors"] = dict(errors)
+            return summary
+
+        return {
+            "signup": phase(
+                reverse("accounts:signup_customer"),
+                lambda email: {"email": email, "password": PASSWORD},
+            ),
+            "login": phase(
+                reverse("accounts:login_api"),
+                lambda email: {"username": email, "password": PASSWORD},
+            ),
+        }
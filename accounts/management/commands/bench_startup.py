@@ -0,0 +1,130 @@
+# accounts/management/commands/bench_startup.py
+
+"""
+設定プロファイル（通常 / API 専用 API_ONLY）ごとに、起動時間と 1 リクエストあたりのミドルウェアの処理時間を計測する。
+
+使い方:
+    python manage.py bench_startup
+    python manage.py bench_startup --runs 10 --requests 5000 --json
+
+計測項目（プロファイル・エントリーポイント（wsgi / asgi）ごとに、新しいプロセスで --runs 回計測した中央値）:
+    process:    プロセスの起動から最初のリクエストを処理できるまで（インタプリタの起動を含む）
+    load:       wsgi.py / asgi.py の読み込み（django.setup() とアプリケーションの作成）
+    urls:       URLconf とビューの読み込み（最初のリクエストで行われる）
+    modules:    読み込まれたモジュール数
+    middleware: 何もしないビューを MIDDLEWARE で包んだときの 1 リクエストあたりの増分（wsgi のみ）
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROFILES = {"full": "False", "api": "True"}
+ENTRY_POINTS = ("wsgi", "asgi")
+
+# 子プロセスで実行する計測スクリプト（引数: エントリーポイント, ミドルウェアの計測リクエスト数）
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+module = __import__(f"rest_template_backend.{sys.argv[1]}", fromlist=["application"])
+loaded = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+resolved = time.perf_counter()
+result = {
+    "ready_at": time.time(),
+    "load": loaded - started,
+    "urls": resolved - loaded,
+    "modules": len(sys.modules),
+    "middleware": None,
+}
+
+if sys.argv[1] == "wsgi" and int(sys.argv[2]):
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.utils.module_loading import import_string
+
+    def view(request):
+        return HttpResponse(b"{}", content_type="application/json")
+
+    handler = view
+    for path in reversed(settings.MIDDLEWARE):
+        handler = import_string(path)(handler)
+
+    factory = RequestFactory(SERVER_NAME="localhost")
+    def measure(func):
+        # 1 回目（遅延初期化）は除く
+        func(factory.get("/api/accounts/me/"))
+        began = time.perf_counter()
+        for _ in range(int(sys.argv[2])):
+            func(factory.get("/api/accounts/me/"))
+        return (time.perf_counter() - began) / int(sys.argv[2])
+
+    result["middleware"] = measure(handler) - measure(view)
+
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = "設定プロファイル（通常 / API 専用）ごとに起動時間とミドルウェアの処理時間を計測します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="プロファイル・エントリーポイントごとの起動回数")
+        parser.add_argument("--requests", type=int, default=2000, help="ミドルウェアの計測リクエスト数")
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        results = {}
+        for profile, api_only in PROFILES.items():
+            for entry_point in ENTRY_POINTS:
+                runs = [self._probe(api_only, entry_point, options["requests"]) for _ in range(options["runs"])]
+                results[f"{profile}/{entry_point}"] = self._summarize(runs)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, summary in results.items():
+            line = (
+                f"{name:>9}: process {summary['process_ms']:.1f}ms / load {summary['load_ms']:.1f}ms / "
+                f"urls {summary['urls_ms']:.1f}ms, {summary['modules']} モジュール"
+            )
+            if summary["middleware_us"] is not None:
+                line += f", ミドルウェア {summary['middleware_us']:.1f}µs/リクエスト"
+            self.stdout.write(line)
+
+    def _probe(self, api_only, entry_point, requests):
+        env = {
+            **os.environ,
+            "API_ONLY": api_only,
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "rest_template_backend.settings"),
+            # 計測するリクエストだけで比較する（Server-Timing の出力を除く）
+            "REQUEST_TIMING_SAMPLE_RATE": "0",
+        }
+        started = time.time()
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE, entry_point, str(requests)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(completed.stdout.splitlines()[-1])
+        result["process"] = result.pop("ready_at") - started
+        return result
+
+    @staticmethod
+    def _summarize(runs):
+        middleware = [run["middleware"] for run in runs if run["middleware"] is not None]
+        return {
+            "runs": len(runs),
+            "process_ms": statistics.median(run["process"] for run in runs) * 1000,
+            "load_ms": statistics.median(run["load"] for run in runs) * 1000,
+            "urls_ms": statistics.median(run["urls"] for run in runs) * 1000,
+            "modules": statistics.median(run["modules"] for run in runs),
+            "middleware_us": statistics.median(middleware) * 1e6 if middleware else None,
+        }
@@ -0,0 +1,89 @@
+# accounts/management/commands/bench_token_auth.py
+
+"""
+認証付きリクエスト（GET me/）のレイテンシをトークン方式ごとに計測する。
+
+使い方:
+    python manage.py bench_token_auth
+    python manage.py bench_token_auth --requests 2000 --threads 4 --json
+
+比較する方式:
+    db:     rest_framework.authentication.TokenAuthentication（毎回 authtoken_token を参照）
+    cached: accounts.authentication.CachedTokenAuthentication
+    signed: accounts.authentication.SignedTokenAuthentication（署名付きトークン）
+"""
+
+import json
+import threading
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from accounts.api.views import MeView
+from accounts.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+    reset_token_cache,
+)
+from accounts.benchmarks import QueryCounter, benchmark_database, run_concurrently, summarize
+from accounts.models import CustomUser
+from accounts.tokens import issue_access_token
+
+
+class Command(BaseCommand):
+    help = "認証付きリクエストのレイテンシをトークン方式（db / cached / signed）ごとに計測します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000, help="計測するリクエスト数")
+        parser.add_argument("--threads", type=int, default=1, help="同時実行スレッド数")
+        parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+
+    def handle(self, *args, **options):
+        results = {}
+        with benchmark_database():
+            user = CustomUser.objects.create_user("bench@example.com", None)
+            CustomUser.objects.filter(pk=user.pk).update(is_active=True)
+            modes = {
+                "db": (TokenAuthentication, f"Token {Token.objects.create(user=user).key}"),
+                "cached": (CachedTokenAuthentication, f"Token {Token.objects.get(user=user).key}"),
+                "signed": (SignedTokenAuthentication, f"Bearer {issue_access_token(user)}"),
+            }
+            for mode, (auth_class, header) in modes.items():
+                reset_token_cache()
+                with mock.patch.object(MeView, "authentication_classes", [auth_class]):
+                    results[mode] = self._bench(header, options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, summary in results.items():
+            self.stdout.write(
+                f"{mode:>6}: p50 {summary['p50_ms']:.3f}ms / p95 {summary['p95_ms']:.3f}ms / "
+                f"p99 {summary['p99_ms']:.3f}ms, {summary['throughput']:.0f} req/s, "
+                f"{summary['queries']} クエリ/リクエスト"
+            )
+
+    def _bench(self, header, options):
+        url = reverse("accounts:me")
+        local = threading.local()
+
+        def request(_):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            response = local.client.get(url, HTTP_AUTHORIZATION=header)
+            if response.status_code != 200:
+                raise RuntimeError(f"認証に失敗しました: {response.status_code}")
+
+        # 1 回目（キャッシュが空の状態）は計測から除き、定常状態のクエリ数を記録する
+        request(None)
+        with QueryCounter() as queries:
+            request(None)
+
+        latencies, elapsed = run_concurrently(request, options["requests"], options["threads"])
+        summary = summarize(latencies, elapsed)
+        summary["queries"] = queries.count
+        return summary
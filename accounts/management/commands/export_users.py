@@ -0,0 +1,40 @@
+# accounts/management/commands/export_users.py
+
+"""
+ユーザーとプロフィールを CSV / NDJSON で全件書き出す（accounts.export_service）。
+
+使い方:
+    python manage.py export_users --output users.csv
+    python manage.py export_users --format ndjson --chunk-size 5000 > users.ndjson
+
+API（GET /api/accounts/export/users/）と同じ内容を、チャンクごとに読み出しながら書き込むので
+件数によらずメモリ使用量は一定。
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from accounts.export_service import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "ユーザーとプロフィールを CSV / NDJSON で全件書き出します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, help="出力形式（省略時は --output の拡張子、無ければ csv）")
+        parser.add_argument("--output", help="出力ファイル（省略時は標準出力）")
+        parser.add_argument("--chunk-size", type=int, help="1 回に読み出す行数（既定: EXPORT_CHUNK_SIZE）")
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        output = options["format"] or ("ndjson" if path and path.endswith(".ndjson") else "csv")
+        file = open(path, "w", encoding="utf-8", newline="") if path else sys.stdout
+        try:
+            for chunk in iter_export(output, options["chunk_size"]):
+                file.write(chunk)
+        finally:
+            if path:
+                file.close()
+        if path:
+            self.stderr.write(self.style.SUCCESS(f"{path} に書き出しました"))
@@ -0,0 +1,160 @@
+# accounts/management/commands/import_accounts.py
+
+"""
+移行データ（CSV / NDJSON）からユーザーとプロフィールを一括登録する。
+
+使い方:
+    python manage.py import_accounts employees.csv --type employee
+    python manage.py import_accounts customers.ndjson --type customer --chunk-size 5000 --errors errors.ndjson
+    python manage.py import_accounts customers.ndjson --type customer --resume   # 中断したところから再開
+    cat users.ndjson | python manage.py import_accounts - --type sns --format ndjson
+
+入力の列（NDJSON のキー）は各サインアップ API と同じで、加えて以下を受け付ける
+（accounts.api.serializers の *ImportSerializer 参照）。
+    password_hash: ハッシュ済みのパスワード（password の代わりに指定。PASSWORD_HASHERS の形式）
+    firstname / lastname: 氏名（customer / employee）
+    postcode / address / phone_number: 連絡先（customer）
+CSV の空欄は「指定なし」として扱う。
+
+入力はチャンク（--chunk-size 行）ずつ読み込んで登録するので、ファイル全体をメモリに載せない。
+チャンクごとに「何行目まで処理したか」をチェックポイントファイル（既定: 入力ファイル名 + .checkpoint）に
+書き込み、--resume でその続きから再開する。中断したチャンクで登録済みになった行は、
+再開時に「既に登録されています」のエラーとして記録される。
+登録したユーザーには有効化メールを送らない（--inactive の場合も）。
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.api.serializers import CustomerImportSerializer, EmployeeImportSerializer, SNSImportSerializer
+from accounts.models import CustomerProfile, EmployeeProfile, SNSProfile
+from accounts.signup_service import import_accounts
+
+IMPORT_TYPES = {
+    "customer": (CustomerImportSerializer, CustomerProfile),
+    "employee": (EmployeeImportSerializer, EmployeeProfile),
+    "sns": (SNSImportSerializer, SNSProfile),
+}
+
+
+def read_csv(stream):
+    """CSV を (行番号, dict) で 1 行ずつ返す（行番号はヘッダーを除いて 1 から）"""
+    for number, row in enumerate(csv.DictReader(stream), start=1):
+        yield number, {key: value for key, value in row.items() if key and value not in (None, "")}
+
+
+def read_ndjson(stream):
+    """NDJSON を (行番号, dict) で 1 行ずつ返す（空行は数えない）。解析できない行は文字列のまま返す"""
+    number = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, f"JSON を解析できません: {exc}"
+
+
+class Command(BaseCommand):
+    help = "CSV / NDJSON の移行データからユーザーとプロフィールを一括登録します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="入力ファイル（- で標準入力）")
+        parser.add_argument("--type", choices=list(IMPORT_TYPES), required=True, help="登録するユーザーの種類")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="入力形式（省略時は拡張子から判断）")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="1 回に読み込んで登録する行数")
+        parser.add_argument("--inactive", action="store_true", help="ユーザーを無効（未認証）の状態で登録する")
+        parser.add_argument("--errors", help="エラーになった行を NDJSON で書き出すファイル")
+        parser.add_argument("--checkpoint", help="チェックポイントファイル（既定: 入力ファイル名 + .checkpoint）")
+        parser.add_argument("--resume", action="store_true", help="チェックポイントの続きから再開する")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        checkpoint_path = options["checkpoint"] or (None if path == "-" else f"{path}.checkpoint")
+        serializer_class, profile_model = IMPORT_TYPES[options["type"]]
+
+        state = {"path": os.path.abspath(path), "type": options["type"], "rows": 0, "created": 0, "errors": 0}
+        if options["resume"]:
+            state = self._load_checkpoint(checkpoint_path, state)
+            self.stdout.write(f"{state['rows']} 行目まで処理済み。続きから再開します")
+
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        errors_file = None
+        if options["errors"]:
+            errors_file = open(options["errors"], "a" if options["resume"] else "w", encoding="utf-8")
+        try:
+            rows = (read_csv if input_format == "csv" else read_ndjson)(stream)
+            # 処理済みの行は検証せずに読み飛ばす
+            rows = islice(rows, state["rows"], None)
+            started = time.monotonic()
+            imported = 0
+            while True:
+                chunk = list(islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+                parsed = [(number, row) for number, row in chunk if not isinstance(row, str)]
+                result = import_accounts(
+                    parsed, serializer_class, profile_model, is_active=not options["inactive"]
+                )
+                for number, row in chunk:
+                    if isinstance(row, str):
+                        result.add_error(number, {"non_field_errors": [row]})
+                if errors_file is not None:
+                    self._write_errors(errors_file, result.errors)
+
+                state["rows"] = chunk[-1][0]
+                state["created"] += len(result.created)
+                state["errors"] += len(result.errors)
+                if checkpoint_path:
+                    self._save_checkpoint(checkpoint_path, state)
+
+                imported += len(chunk)
+                elapsed = time.monotonic() - started
+                if options["verbosity"] >= 1:
+                    self.stdout.write(
+                        f"{state['rows']} 行: 作成 {state['created']} / エラー {state['errors']}"
+                        f"（{imported / elapsed if elapsed > 0 else 0:.0f} 行/秒）"
+                    )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if errors_file is not None:
+                errors_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"完了: {state['rows']} 行 / 作成 {state['created']} 件 / エラー {state['errors']} 件"
+        ))
+
+    @staticmethod
+    def _write_errors(errors_file, errors):
+        for error in sorted(errors, key=lambda error: error["index"]):
+            line = {"row": error["index"], "errors": error["errors"]}
+            errors_file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        errors_file.flush()
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path, state):
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            raise CommandError("チェックポイントファイルがありません")
+        with open(checkpoint_path, encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved.get("path") != state["path"] or saved.get("type") != state["type"]:
+            raise CommandError("チェックポイントの入力ファイル・種類が今回の指定と異なります")
+        return saved
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path, state):
+        """書き込み途中で中断しても壊れないよう、一時ファイルに書いてから置き換える"""
+        temporary = f"{checkpoint_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temporary, checkpoint_path)
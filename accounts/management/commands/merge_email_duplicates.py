@@ -0,0 +1,45 @@
+# accounts/management/commands/merge_email_duplicates.py
+
+"""
+大文字・小文字だけが違うメールアドレスのユーザーを 1 人にまとめる
+（マイグレーション 0010_email_case_insensitive と同じ処理）。
+
+使い方:
+    python manage.py merge_email_duplicates --dry-run   # 残すユーザー・削除するユーザーの ID を表示するだけ
+    python manage.py merge_email_duplicates             # まとめる（削除したユーザーは戻せない）
+
+0010 は制約の追加前に同じ処理を行い、削除するユーザーをログに出すだけなので、
+適用前に --dry-run で対象を確認する。シャーディング有効時はシャードごとに処理する。
+"""
+
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from accounts.sharding import user_databases
+
+email_merge = import_module("accounts.migrations.0010_email_case_insensitive")
+
+
+class Command(BaseCommand):
+    help = "大文字・小文字だけが違うメールアドレスのユーザーを 1 人にまとめます"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="対象を表示するだけで変更しない")
+
+    def handle(self, *args, **options):
+        def report(email, survivor_id, deleted_ids):
+            self.stdout.write(f"{email}: 残す {survivor_id} / 削除 {', '.join(map(str, deleted_ids))}")
+
+        count = 0
+        for database in user_databases():
+            count += email_merge.merge_duplicates(
+                apps, database or DEFAULT_DB_ALIAS, dry_run=options["dry_run"], report=report
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(f"対象: {count} グループ")
+            return
+        self.stdout.write(self.style.SUCCESS(f"まとめたグループ: {count}"))
@@ -0,0 +1,92 @@
+# accounts/management/commands/process_avatars.py
+
+"""
+アップロードされたアバター画像（AvatarImage）の縮小版（WebP）を生成するワーカー。
+
+使い方:
+    python manage.py process_avatars              # 常駐して生成し続ける
+    python manage.py process_avatars --once       # 溜まっている分だけ生成して終了
+    python manage.py process_avatars --workers 4  # 4 スレッドで並行生成
+
+画像の縮小・エンコードは Pillow が GIL を解放して実行するため、スレッドでも複数コアを使える。
+複数プロセス・複数スレッドで起動しても同じ画像を二重に処理しないよう、
+取り出し時に条件付き UPDATE でロックを取る（avatar_service._claim_batch 参照）。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from accounts.avatar_service import AvatarProcessingResult, process_avatar_batch
+
+
+class Command(BaseCommand):
+    help = "アバター画像の縮小版を生成します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20, help="1 バッチの最大件数")
+        parser.add_argument("--workers", type=int, default=1, help="並行して生成するワーカー数")
+        parser.add_argument(
+            "--interval", type=float, default=2.0, help="生成対象が無いときの待機秒数"
+        )
+        parser.add_argument("--max-attempts", type=int, default=None, help="最大試行回数")
+        parser.add_argument("--once", action="store_true", help="生成対象が無くなったら終了する")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        self._lock = threading.Lock()
+        self._total = AvatarProcessingResult()
+        self._stop = threading.Event()
+
+        workers = max(options["workers"], 1)
+        try:
+            if workers == 1:
+                self._run_worker(options)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for future in [pool.submit(self._run_worker, options) for _ in range(workers)]:
+                        future.result()
+        except KeyboardInterrupt:
+            self._stop.set()
+
+        total = self._total
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"生成 {total.ready} 件 / 再試行予約 {total.retried} 件 / 失敗 {total.failed} 件"
+            )
+        )
+
+    def _run_worker(self, options):
+        """1 ワーカー分の生成ループ"""
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                result = process_avatar_batch(
+                    batch_size=options["batch_size"], max_attempts=options["max_attempts"]
+                )
+                self._record(result)
+
+                if result.claimed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            # スレッドごとに開いた DB 接続を閉じる（プロフィールの更新でシャードにも接続する）
+            connections.close_all()
+
+    def _record(self, result):
+        with self._lock:
+            self._total.claimed += result.claimed
+            self._total.ready += result.ready
+            self._total.retried += result.retried
+            self._total.failed += result.failed
+            self._total.elapsed += result.elapsed
+        if result.claimed and self.verbosity >= 1:
+            self.stdout.write(
+                f"batch: 取得 {result.claimed} / 生成 {result.ready} / 再試行予約 {result.retried} "
+                f"/ 失敗 {result.failed}（{result.elapsed:.2f} 秒）"
+            )
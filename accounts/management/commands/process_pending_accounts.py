@@ -0,0 +1,77 @@
+# accounts/management/commands/process_pending_accounts.py
+
+"""
+未認証（メール認証待ち）アカウントを一括で有効化・期限切れ削除する。
+
+使い方:
+    python manage.py process_pending_accounts activate                        # すべて有効化
+    python manage.py process_pending_accounts activate --email a@example.com  # 指定アカウントのみ
+    python manage.py process_pending_accounts expire --older-than-days 7      # 7 日以上前の登録を削除
+    python manage.py process_pending_accounts expire --dry-run                # 件数の確認のみ
+
+チャンク（--chunk-size 件）ごとに短いトランザクションで処理するので、
+大量の未認証アカウントがあってもテーブルを長時間ロックしない。
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.activation_service import (
+    activate_pending_accounts,
+    expire_pending_accounts,
+    pending_accounts,
+)
+from accounts.sharding import use_shard, user_databases
+
+
+class Command(BaseCommand):
+    help = "未認証アカウントを一括で有効化（activate）または期限切れ削除（expire）します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["activate", "expire"], help="実行する処理")
+        parser.add_argument("--email", action="append", help="対象のメールアドレス（複数指定可）")
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=getattr(settings, "PENDING_ACCOUNT_EXPIRE_DAYS", 7),
+            help="expire: この日数より前に登録されたアカウントを対象にする",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000, help="1 トランザクションの件数")
+        parser.add_argument("--dry-run", action="store_true", help="対象件数を表示するだけで変更しない")
+
+    def handle(self, *args, **options):
+        joined_before = timezone.now() - timedelta(days=options["older_than_days"])
+        started = time.monotonic()
+        count = 0
+        # シャーディング有効時はシャードごとに処理する
+        for database in user_databases():
+            with use_shard(database):
+                count += self._process(options, joined_before)
+
+        if options["dry_run"]:
+            self.stdout.write(f"対象: {count} 件")
+            return
+
+        label = "有効化" if options["action"] == "activate" else "削除"
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(f"{label}: {count} 件（{elapsed:.2f} 秒, {rate:.0f} 件/秒）")
+        )
+
+    def _process(self, options, joined_before):
+        queryset = pending_accounts()
+        if options["email"]:
+            queryset = queryset.for_emails(options["email"])
+
+        if options["dry_run"]:
+            if options["action"] == "expire":
+                queryset = queryset.filter(date_joined__lt=joined_before)
+            return queryset.count()
+        if options["action"] == "activate":
+            return activate_pending_accounts(queryset, chunk_size=options["chunk_size"])
+        return expire_pending_accounts(joined_before, queryset, chunk_size=options["chunk_size"])
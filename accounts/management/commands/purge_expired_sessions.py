@@ -0,0 +1,55 @@
+# accounts/management/commands/purge_expired_sessions.py
+
+"""
+失効済みのセッションを削除する（accounts.session_service、標準の clearsessions の代わり）。
+
+使い方:
+    python manage.py purge_expired_sessions
+    python manage.py purge_expired_sessions --chunk-size 500 --pause 0.05
+
+SESSION_MODE が db / cached_db のときは django_session を expire_date の索引で --chunk-size 件ずつ削除し、
+セッション用キャッシュがファイル（SESSION_CACHE_BACKEND = "file"）のときは期限切れのファイルを削除する。
+cron などで定期的に実行する。
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.session_service import (
+    purge_expired_cache_files,
+    purge_expired_sessions,
+    uses_cache,
+    uses_database,
+)
+
+
+class Command(BaseCommand):
+    help = "失効済みのセッション（django_session の行・キャッシュファイル）を削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="1 回の DELETE で削除する件数")
+        parser.add_argument("--pause", type=float, default=0.0, help="チャンクの間に待つ秒数")
+
+    def handle(self, *args, **options):
+        mode = getattr(settings, "SESSION_MODE", "db")
+        if not uses_database() and not uses_cache():
+            self.stdout.write(f"SESSION_MODE={mode}: サーバー側に保存されたセッションはありません")
+            return
+
+        if uses_database():
+            started = time.monotonic()
+            progress = None
+            if options["verbosity"] > 1:
+                progress = lambda total: self.stdout.write(f"  django_session: {total} 件")
+            count = purge_expired_sessions(options["chunk_size"], options["pause"], progress=progress)
+            elapsed = time.monotonic() - started
+            rate = count / elapsed if elapsed > 0 else 0.0
+            self.stdout.write(self.style.SUCCESS(
+                f"django_session: {count} 件を削除（{elapsed:.2f} 秒, {rate:.0f} 件/秒）"
+            ))
+
+        if uses_cache():
+            removed = purge_expired_cache_files()
+            self.stdout.write(self.style.SUCCESS(f"キャッシュファイル: {removed} 件を削除"))
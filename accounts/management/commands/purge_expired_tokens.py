@@ -0,0 +1,59 @@
+# accounts/management/commands/purge_expired_tokens.py
+
+"""
+有効期限（AUTH_TOKEN_TTL）の切れた DRF の Token を削除する（accounts.token_service）。
+
+使い方:
+    python manage.py purge_expired_tokens
+    python manage.py purge_expired_tokens --chunk-size 500 --pause 0.05   # 他の書き込みを優先させる
+    python manage.py purge_expired_tokens --dry-run                       # 件数の確認のみ
+
+created の索引で古い順に --chunk-size 件ずつ選んで削除するので、
+大量の期限切れトークンがあってもテーブルを長時間ロックしない。cron などで定期的に実行する。
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+from rest_framework.authtoken.models import Token
+
+from accounts.sharding import user_databases
+from accounts.token_service import expiry_cutoff, purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "有効期限の切れたトークンをチャンクごとに削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="1 回の DELETE で削除する件数")
+        parser.add_argument("--pause", type=float, default=0.0, help="チャンクの間に待つ秒数")
+        parser.add_argument("--dry-run", action="store_true", help="対象件数を表示するだけで削除しない")
+
+    def handle(self, *args, **options):
+        cutoff = expiry_cutoff()
+        if cutoff is None:
+            raise CommandError("AUTH_TOKEN_TTL が None（無期限）のため、削除するトークンはありません")
+
+        started = time.monotonic()
+        count = 0
+        # シャーディング有効時はシャードごとに処理する
+        for database in user_databases():
+            using = database or router.db_for_write(Token)
+            if options["dry_run"]:
+                count += Token.objects.using(using).filter(created__lt=cutoff).count()
+                continue
+            progress = None
+            if options["verbosity"] > 1:
+                progress = lambda total: self.stdout.write(f"  {using}: {total} 件")
+            count += purge_expired_tokens(
+                using, chunk_size=options["chunk_size"], pause=options["pause"], progress=progress
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(f"対象: {count} 件")
+            return
+
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(f"削除: {count} 件（{elapsed:.2f} 秒, {rate:.0f} 件/秒）"))
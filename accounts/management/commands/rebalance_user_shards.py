@@ -0,0 +1,135 @@
+# accounts/management/commands/rebalance_user_shards.py
+
+"""
+ユーザーを、メールアドレスから決まるシャード（accounts.sharding.shard_for_email）へ移動する。
+
+使い方:
+    python manage.py rebalance_user_shards --dry-run        # 移動が必要な件数の確認のみ
+    python manage.py rebalance_user_shards                  # USER_SHARDS の各シャードを再配置
+    python manage.py rebalance_user_shards --from-default   # シャーディング導入時: default のユーザーを移す
+
+シャードを追加・削除したあと（USER_SHARDS の変更後）に実行する。削除するシャードは --source で指定する。
+ユーザーとプロフィール・トークン・グループ / 権限の割り当てを移動先へコピーし、
+移動元から削除してから UserDirectory を更新する。途中で中断しても再実行すれば続きから処理できる。
+
+--from-default は、シャーディングを有効にしてユーザー登録を受け付ける前に実行すること
+（既存ユーザーの ID を UserDirectory に登録し、新しい ID がそれと重ならないようにするため）。
+移動中のユーザーの更新は失われる可能性があるので、アクセスの少ない時間帯に実行する。
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+
+from accounts.authentication import invalidate_user_tokens
+from accounts.models import UserDirectory
+from accounts.models.models import CustomUserQuerySet
+from accounts.sharding import get_shards, shard_for_email
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "ユーザーをメールアドレスのハッシュで決まるシャードへ移動します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from-default", action="store_true", help="default データベースのユーザーも移動する"
+        )
+        parser.add_argument(
+            "--source", action="append", default=[],
+            help="移動元に加えるデータベース（USER_SHARDS から外したシャードなど、複数指定可）",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="1 回に読み込むユーザー数")
+        parser.add_argument("--dry-run", action="store_true", help="移動が必要な件数を表示するだけで変更しない")
+
+    def handle(self, *args, **options):
+        shards = get_shards()
+        if not shards:
+            raise CommandError("USER_SHARDS が設定されていません")
+
+        sources = list(shards) + options["source"]
+        if options["from_default"]:
+            sources.insert(0, "default")
+
+        moved = registered = failed = 0
+        for source in dict.fromkeys(sources):
+            for users in self._chunks(source, options["chunk_size"]):
+                stay = [user for user in users if shard_for_email(user.email) == source]
+                move = [user for user in users if shard_for_email(user.email) != source]
+                if options["dry_run"]:
+                    moved += len(move)
+                    continue
+                registered += self._register(stay, source)
+                for user in move:
+                    try:
+                        self._move(user, source, shard_for_email(user.email))
+                    except IntegrityError as exc:
+                        failed += 1
+                        self.stderr.write(f"移動できませんでした: id={user.pk} {user.email} ({exc})")
+                    else:
+                        moved += 1
+
+        if options["dry_run"]:
+            self.stdout.write(f"移動対象: {moved} 件")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"移動: {moved} 件 / ディレクトリ登録: {registered} 件 / 失敗: {failed} 件")
+        )
+
+    @staticmethod
+    def _chunks(database, chunk_size):
+        """database のユーザーを主キー順に chunk_size 件ずつ（プロフィール込みで）読み込む"""
+        last_pk = 0
+        while True:
+            users = list(
+                User.objects.using(database).with_profiles()
+                .filter(pk__gt=last_pk).order_by("pk")[:chunk_size]
+            )
+            if not users:
+                return
+            last_pk = users[-1].pk
+            yield users
+
+    @staticmethod
+    def _register(users, shard):
+        """移動しないユーザーの UserDirectory を（無ければ）登録する"""
+        if shard == "default" or not users:
+            return 0
+        UserDirectory.objects.using("default").bulk_create(
+            [UserDirectory(pk=user.pk, shard=shard) for user in users],
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=["shard"],
+        )
+        return len(users)
+
+    @staticmethod
+    def _move(user, source, target):
+        """ユーザー 1 人分の行を source から target へ移す"""
+        related = [
+            getattr(user, relation)
+            for relation in CustomUserQuerySet.PROFILE_RELATIONS
+            if getattr(user, relation, None) is not None
+        ]
+        related += list(Token.objects.using(source).filter(user_id=user.pk))
+        for field in (User.groups.field, User.user_permissions.field):
+            through = field.remote_field.through
+            related += list(through.objects.using(source).filter(**{field.m2m_field_name(): user.pk}))
+
+        # ① 移動先へコピー（再実行時はコピー済みならスキップ）
+        with transaction.atomic(using=target):
+            if not User.objects.using(target).filter(pk=user.pk).exists():
+                # raw=True で保存し、display_name の再計算などのシグナル処理を行わない
+                for obj in [user, *related]:
+                    if obj is not user and obj._meta.pk.auto_created:
+                        # プロフィールなどの自動採番 ID はシャードごとに独立しているので振り直す
+                        obj.pk = None
+                    obj.save_base(raw=True, force_insert=True, using=target)
+
+        # ② 移動元から削除（プロフィール・トークンなどは連鎖削除）→ ③ ディレクトリを更新
+        with transaction.atomic(using=source):
+            User.objects.using(source).filter(pk=user.pk).delete()
+        UserDirectory.objects.using("default").update_or_create(pk=user.pk, defaults={"shard": target})
+        invalidate_user_tokens(user.pk)
@@ -0,0 +1,46 @@
+# accounts/management/commands/rebuild_search_index.py
+
+"""
+プロフィール検索（accounts.search）の FTS5 索引を作り直す。
+
+使い方:
+    python manage.py rebuild_search_index                    # すべての索引
+    python manage.py rebuild_search_index --type employee --chunk-size 5000
+    python manage.py rebuild_search_index --database shard1
+
+索引はトリガーで自動更新されるので、通常は不要。トリガーを通らずにデータを投入・復元した場合や、
+索引が壊れた場合（検索結果が元データと合わない場合）に実行する。
+チャンクごとにコミットするため、実行中の検索結果は不完全になる。
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+from accounts.search import SEARCH_INDEXES, rebuild_index
+from accounts.sharding import user_databases
+
+
+class Command(BaseCommand):
+    help = "プロフィール検索の FTS5 索引をチャンクごとに作り直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--type", choices=list(SEARCH_INDEXES), action="append", help="作り直す索引")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="1 トランザクションで登録する件数")
+        parser.add_argument(
+            "--database", action="append", help="対象のデータベース（既定: プロフィールを保持するすべてのデータベース）"
+        )
+
+    def handle(self, *args, **options):
+        for kind in options["type"] or SEARCH_INDEXES:
+            model = SEARCH_INDEXES[kind].model
+            databases = options["database"] or [
+                database or router.db_for_write(model) for database in user_databases()
+            ]
+            for database in databases:
+                if connections[database].vendor != "sqlite":
+                    raise CommandError(f"{database}: FTS5 の索引は SQLite でのみ使えます")
+                progress = None
+                if options["verbosity"] > 1:
+                    progress = lambda count: self.stdout.write(f"  {kind} ({database}): {count} 件")
+                total = rebuild_index(kind, database, options["chunk_size"], progress=progress)
+                self.stdout.write(self.style.SUCCESS(f"{kind} ({database}): {total} 件を登録しました"))
@@ -0,0 +1,97 @@
+# accounts/management/commands/send_outbox_emails.py
+
+"""
+アウトボックス（EmailOutbox）に溜まったメールを送信するワーカー。
+
+使い方:
+    python manage.py send_outbox_emails              # 常駐して送信し続ける
+    python manage.py send_outbox_emails --once       # 溜まっている分だけ送信して終了
+    python manage.py send_outbox_emails --workers 4  # 4 スレッドで並行送信
+
+各ワーカーはバッチごとに SMTP 接続を 1 本だけ開き、バッチ内で使い回す。
+複数プロセス・複数スレッドで起動しても同じ行を二重送信しないよう、
+取り出し時に条件付き UPDATE でロックを取る（email_service._claim_batch 参照）。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from accounts.email_service import OutboxDeliveryResult, deliver_outbox_batch
+
+
+class Command(BaseCommand):
+    help = "アウトボックスのメールをバッチ送信します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="1 バッチの最大件数")
+        parser.add_argument("--workers", type=int, default=1, help="並行して送信するワーカー数")
+        parser.add_argument(
+            "--interval", type=float, default=2.0, help="送信対象が無いときの待機秒数"
+        )
+        parser.add_argument("--max-attempts", type=int, default=None, help="最大試行回数")
+        parser.add_argument("--once", action="store_true", help="送信対象が無くなったら終了する")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        self._lock = threading.Lock()
+        self._total = OutboxDeliveryResult()
+        self._stop = threading.Event()
+        started = time.monotonic()
+
+        workers = max(options["workers"], 1)
+        try:
+            if workers == 1:
+                self._run_worker(options)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for future in [pool.submit(self._run_worker, options) for _ in range(workers)]:
+                        future.result()
+        except KeyboardInterrupt:
+            self._stop.set()
+
+        elapsed = time.monotonic() - started
+        total = self._total
+        rate = total.sent / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"送信 {total.sent} 件 / 再送予約 {total.retried} 件 / 失敗 {total.failed} 件 "
+                f"（{elapsed:.2f} 秒, {rate:.1f} 通/秒）"
+            )
+        )
+
+    def _run_worker(self, options):
+        """1 ワーカー分の送信ループ"""
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                result = deliver_outbox_batch(
+                    batch_size=options["batch_size"], max_attempts=options["max_attempts"]
+                )
+                self._record(result)
+
+                if result.claimed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            # スレッドごとに開いた DB 接続を閉じる
+            connection.close()
+
+    def _record(self, result):
+        """バッチ結果を集計し、送信があればスループットを出力する"""
+        with self._lock:
+            self._total.claimed += result.claimed
+            self._total.sent += result.sent
+            self._total.retried += result.retried
+            self._total.failed += result.failed
+            self._total.elapsed += result.elapsed
+        if result.claimed and self.verbosity >= 1:
+            self.stdout.write(
+                f"batch: 取得 {result.claimed} / 送信 {result.sent} / 再送予約 {result.retried} "
+                f"/ 失敗 {result.failed}（{result.per_second:.1f} 通/秒）"
+            )
@@ -0,0 +1,276 @@
+# accounts/middleware.py
+
+"""
+accounts.middleware モジュール
+
+含まれる主なクラス:
+- RequestTimingMiddleware: リクエストごとの SQL 件数・DB 時間・ハッシュ化 / メール登録の時間を
+  Server-Timing ヘッダーと構造化ログ（JSON）で出力する
+- ReplicaPinningMiddleware: 書き込みのあったクライアントの読み取りを一定時間プライマリ DB に固定する
+- ShardContextMiddleware: リクエストごとに「現在のシャード」（accounts.sharding）をリセットする
+- IdempotencyMiddleware: Idempotency-Key 付きの POST の再送に保存済みの応答を返す（accounts.idempotency）
+- AdmissionControlMiddleware: ログイン・サインアップの同時実行数を制限し、超過分に 503 を返す（accounts.admission）
+"""
+
+import hashlib
+import json
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+from . import admission, idempotency
+from .instrumentation import finish_request, start_request
+from .routers import get_pin_seconds, get_replicas, pin_to_primary, primary_pin_scope, primary_pinned_until
+from .sharding import shard_scope
+
+logger = logging.getLogger("accounts.timing")
+
+
+class RequestTimingMiddleware:
+    """
+    REQUEST_TIMING_SAMPLE_RATE の割合のリクエストだけを計測する。
+    計測しないリクエストでは乱数を 1 回引くだけなので、本番でも常時有効にできる。
+
+    設定:
+        REQUEST_TIMING_SAMPLE_RATE: 計測するリクエストの割合（0.0〜1.0）
+        REQUEST_TIMING_HEADER: Server-Timing ヘッダーを付けるか
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "REQUEST_TIMING_SAMPLE_RATE", 1.0)
+        self.add_header = getattr(settings, "REQUEST_TIMING_HEADER", True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(metrics, token)
+        self._emit(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(metrics, token)
+        self._emit(request, response, metrics)
+        return response
+
+    def _emit(self, request, response, metrics):
+        if self.add_header:
+            response["Server-Timing"] = metrics.server_timing()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **metrics.as_dict(),
+            }))
+
+
+class ReplicaPinningMiddleware:
+    """
+    accounts.routers.PrimaryReplicaRouter の「書き込み後はプライマリから読む」をリクエスト間で引き継ぐ。
+
+    リクエスト中に対象モデルへの書き込みがあれば、応答に REPLICA_PIN_SECONDS 秒の Cookie を付ける。
+    Cookie を持つリクエストは最初からプライマリで読み取る（サインアップ直後のログインなど）。
+    Cookie を保存しない API クライアント向けに、レプリカがあり REPLICA_PIN_CACHE（プロセス間で共有するキャッシュ）が
+    指定されているときは、同じ秒数だけ Authorization ヘッダー（のハッシュ）ごとの印も残し、同じ資格情報の
+    リクエストをプライマリで読み取る。接続元 IP は使わない（プロキシ・NAT の内側では全クライアントで同じになるため）。
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = "accounts_primary_pin"
+    cache_prefix = "accounts:primary_pin:"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with primary_pin_scope():
+            cache, keys = self._client_cache(request)
+            pinned = request.COOKIES.get(self.cookie_name) or (cache is not None and cache.get_many(keys))
+            started = self._start(pinned)
+            response = self.get_response(request)
+            if self._finish(response, started) and cache is not None:
+                cache.set_many(dict.fromkeys(keys, 1), get_pin_seconds())
+            return response
+
+    async def __acall__(self, request):
+        with primary_pin_scope():
+            cache, keys = self._client_cache(request)
+            pinned = request.COOKIES.get(self.cookie_name) or (cache is not None and await cache.aget_many(keys))
+            started = self._start(pinned)
+            response = await self.get_response(request)
+            if self._finish(response, started) and cache is not None:
+                await cache.aset_many(dict.fromkeys(keys, 1), get_pin_seconds())
+            return response
+
+    def _client_cache(self, request):
+        """Cookie 以外で固定を引き継ぐキャッシュとキー（対象外なら (None, [])）"""
+        alias = getattr(settings, "REPLICA_PIN_CACHE", None)
+        authorization = request.headers.get("Authorization")
+        if alias is None or not authorization or not get_replicas():
+            return None, []
+        return caches[alias], [self.cache_prefix + "auth:" + hashlib.sha256(authorization.encode()).hexdigest()]
+
+    def _start(self, pinned):
+        if pinned:
+            pin_to_primary()
+        return primary_pinned_until()
+
+    def _finish(self, response, started):
+        """このリクエストで書き込みがあった（固定が延びた）ときだけ Cookie を付け直し、True を返す"""
+        if primary_pinned_until() <= started:
+            return False
+        response.set_cookie(
+            self.cookie_name, "1", max_age=get_pin_seconds(), httponly=True, samesite="Lax"
+        )
+        return True
+
+
+class ShardContextMiddleware:
+    """
+    リクエストを「現在のシャードなし」の状態で処理し、前のリクエスト（同じスレッド）の
+    シャードが引き継がれないようにする。シャードはログイン・認証時に設定される。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with shard_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with shard_scope():
+            return await self.get_response(request)
+
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key ヘッダー付きの POST（IDEMPOTENCY_PATHS 配下）の応答を保存し、
+    同じキーの再送（タイムアウト後のリトライなど）にはビューを実行せずに保存した応答を返す。
+    同じキーのリクエストが同時に届いた場合は、最初の 1 件だけを実行する。残りには同期版ではすぐに 409
+    （Retry-After 付き）を返し、非同期版ではその完了を待って同じ応答を返す。
+    再送に返した応答には Idempotent-Replayed: true を付ける。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = idempotency.get_idempotency_key(request)
+        if key is None:
+            return self.get_response(request)
+        invalid = idempotency.invalid_key_response(key)
+        if invalid is not None:
+            return invalid
+
+        execution = idempotency.begin(request, key)
+        if execution.response is not None:
+            return execution.response
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            idempotency.finish(execution, response)
+        return response
+
+    async def __acall__(self, request):
+        key = idempotency.get_idempotency_key(request)
+        if key is None:
+            return await self.get_response(request)
+        invalid = idempotency.invalid_key_response(key)
+        if invalid is not None:
+            return invalid
+
+        execution = await idempotency.abegin(request, key)
+        if execution.response is not None:
+            return execution.response
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            await idempotency.afinish(execution, response)
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    パスワードのハッシュ化を伴う POST（ADMISSION_PATHS 配下）の同時実行数を制限する。
+    上限を超えたリクエストは待ち行列で待ち、待ち行列が満杯か待ち時間切れなら
+    ビューを実行せずに 503（Retry-After 付き）を返す。対象外のリクエストは素通しする。
+    IdempotencyMiddleware より内側に置き、保存済みの応答の再送は制限しない。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not admission.is_limited(request):
+            return self.get_response(request)
+        limiter = admission.get_limiter()
+        if not limiter.acquire():
+            return admission.overloaded_response()
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release()
+
+    async def __acall__(self, request):
+        if not admission.is_limited(request):
+            return await self.get_response(request)
+        limiter = admission.get_limiter()
+        if not await limiter.aacquire():
+            return admission.overloaded_response()
+        try:
+            return await self.get_response(request)
+        finally:
+            limiter.release()
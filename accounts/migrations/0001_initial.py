@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('is_active', models.BooleanField(default=False)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firstname', models.CharField(max_length=50, verbose_name='名')),
+                ('lastname', models.CharField(max_length=50, verbose_name='姓')),
+                ('postcode', models.CharField(blank=True, max_length=20, null=True, verbose_name='郵便番号')),
+                ('address', models.TextField(blank=True, null=True, verbose_name='住所')),
+                ('phone_number', models.CharField(blank=True, max_length=20, null=True, verbose_name='電話番号')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='customer_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '顧客プロフィール',
+                'verbose_name_plural': '顧客プロフィール',
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firstname', models.CharField(max_length=50, verbose_name='名')),
+                ('lastname', models.CharField(max_length=50, verbose_name='姓')),
+                ('department', models.CharField(blank=True, max_length=100, null=True, verbose_name='部署')),
+                ('position', models.CharField(blank=True, max_length=100, null=True, verbose_name='役職')),
+                ('hire_date', models.DateField(blank=True, null=True, verbose_name='入社日')),
+                ('qualifications', models.TextField(blank=True, help_text='保有している資格をカンマ区切りなどで入力', null=True, verbose_name='保有資格')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='employee_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '従業員プロフィール',
+                'verbose_name_plural': '従業員プロフィール',
+            },
+        ),
+        migrations.CreateModel(
+            name='SNSProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nickname', models.CharField(blank=True, max_length=50, null=True, verbose_name='ニックネーム')),
+                ('bio', models.TextField(blank=True, null=True, verbose_name='自己紹介')),
+                ('avatar', models.ImageField(blank=True, null=True, upload_to='avatars/', verbose_name='アバター画像')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sns_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'SNSプロフィール',
+                'verbose_name_plural': 'SNSプロフィール',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='件名')),
+                ('body', models.TextField(verbose_name='本文')),
+                ('from_email', models.CharField(max_length=254, verbose_name='送信元')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='宛先')),
+                ('status', models.CharField(choices=[('pending', '送信待ち'), ('sending', '送信中'), ('sent', '送信済み'), ('failed', '送信失敗')], default='pending', max_length=10, verbose_name='状態')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='試行回数')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='次回送信日時')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='ロック期限')),
+                ('claim_token', models.CharField(blank=True, default='', max_length=32, verbose_name='取得トークン')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='直近のエラー')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='送信日時')),
+            ],
+            options={
+                'verbose_name': 'メールアウトボックス',
+                'verbose_name_plural': 'メールアウトボックス',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx')],
+            },
+        ),
+    ]
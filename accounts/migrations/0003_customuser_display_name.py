@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_display_name(apps, schema_editor):
+    """既存ユーザーの display_name をプロフィールから埋める（1000 件ずつ）"""
+    CustomUser = apps.get_model("accounts", "CustomUser")
+    db_alias = schema_editor.connection.alias  # ルーター（読み取りレプリカ）を経由しない
+    users = CustomUser.objects.using(db_alias).select_related(
+        "sns_profile", "employee_profile", "customer_profile"
+    ).order_by("pk")
+
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        changed = []
+        for user in batch:
+            # CustomUser.compute_display_name() と同じ優先順位
+            display_name = ""
+            sns = getattr(user, "sns_profile", None)
+            if sns is not None and sns.nickname:
+                display_name = sns.nickname
+            else:
+                for relation in ("employee_profile", "customer_profile"):
+                    profile = getattr(user, relation, None)
+                    if profile is not None and (profile.firstname or profile.lastname):
+                        display_name = f"{profile.firstname} {profile.lastname}".strip()
+                        break
+            if display_name != user.display_name:
+                user.display_name = display_name
+                changed.append(user)
+        CustomUser.objects.using(db_alias).bulk_update(changed, ["display_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='display_name',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='表示名'),
+        ),
+        migrations.RunPython(backfill_display_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_date_joined'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.CharField(max_length=64, verbose_name='シャード')),
+            ],
+            options={
+                'verbose_name': 'ユーザーディレクトリ',
+                'verbose_name_plural': 'ユーザーディレクトリ',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_directory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerprofile',
+            index=models.Index(fields=['lastname', 'firstname', 'user'], name='customer_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['lastname', 'firstname', 'user'], name='employee_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['department', 'lastname', 'firstname', 'user'], name='employee_dept_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['position', 'lastname', 'firstname', 'user'], name='employee_position_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['hire_date', 'user'], name='employee_hire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['department', 'hire_date', 'user'], name='employee_dept_hire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['position', 'hire_date', 'user'], name='employee_pos_hire_date_idx'),
+        ),
+    ]
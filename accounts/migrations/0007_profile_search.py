@@ -0,0 +1,61 @@
+# プロフィール検索用の FTS5 仮想テーブル（accounts.search）とトリガーを作成する。
+# SQLite 以外のデータベースでは何もしない（accounts.search は icontains で検索する）。
+
+from django.db import migrations
+
+# (仮想テーブル, 元のテーブル, 検索対象の列)
+SEARCH_TABLES = [
+    ("accounts_employeeprofile_search", "accounts_employeeprofile", ("lastname", "firstname", "qualifications")),
+    ("accounts_snsprofile_search", "accounts_snsprofile", ("nickname", "bio")),
+]
+
+
+def create_statements(table, content, columns):
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+    return [
+        # 外部コンテンツテーブル: 本文は元のテーブルにだけ持ち、FTS5 には索引だけを持つ。
+        # trigram は日本語のように単語の区切りが無い文章でも部分一致（icontains 相当）で検索できる。
+        f"CREATE VIRTUAL TABLE {table} USING fts5("
+        f"{column_list}, content='{content}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {table}_ai AFTER INSERT ON {content} BEGIN "
+        f"INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {table}_ad AFTER DELETE ON {content} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        # 検索対象の列が変わったときだけ索引を更新する
+        f"CREATE TRIGGER {table}_au AFTER UPDATE ON {content} WHEN {changed} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        # 既存の行を索引に登録する
+        f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+    ]
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, content, columns in SEARCH_TABLES:
+        for statement in create_statements(table, content, columns):
+            schema_editor.execute(statement)
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, _, _ in SEARCH_TABLES:
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:42
+
+from importlib import import_module
+
+import django.utils.timezone
+from django.db import migrations, models
+
+profile_search = import_module("accounts.migrations.0007_profile_search")
+
+
+def restore_sns_search_triggers(apps, schema_editor):
+    """
+    SQLite では accounts_snsprofile への列の追加・削除でテーブルが作り直され、
+    検索索引（0007）のトリガーが消えるので作り直し、索引も作り直す。SQLite 以外では何もしない。
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    table, content, columns = profile_search.SEARCH_TABLES[1]
+    for suffix in ("ai", "ad", "au"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+    for statement in profile_search.create_statements(table, content, columns):
+        if statement.startswith("CREATE TRIGGER"):
+            schema_editor.execute(statement)
+    schema_editor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_profile_search'),
+    ]
+
+    operations = [
+        # 逆方向（avatar_variants の削除）の最後にもトリガーを作り直す
+        migrations.RunPython(migrations.RunPython.noop, restore_sns_search_triggers),
+        migrations.AddField(
+            model_name='snsprofile',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='アバター縮小版'),
+        ),
+        migrations.CreateModel(
+            name='AvatarImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('original', models.CharField(max_length=255, verbose_name='元画像のファイル名')),
+                ('width', models.PositiveIntegerField(verbose_name='幅')),
+                ('height', models.PositiveIntegerField(verbose_name='高さ')),
+                ('size', models.PositiveBigIntegerField(verbose_name='ファイルサイズ')),
+                ('variants', models.JSONField(blank=True, default=dict, verbose_name='縮小版')),
+                ('status', models.CharField(choices=[('pending', '生成待ち'), ('processing', '生成中'), ('ready', '生成済み'), ('failed', '生成失敗')], default='pending', max_length=10, verbose_name='状態')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='試行回数')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='次回生成日時')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='ロック期限')),
+                ('claim_token', models.CharField(blank=True, default='', max_length=32, verbose_name='取得トークン')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='直近のエラー')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+            ],
+            options={
+                'verbose_name': 'アバター画像',
+                'verbose_name_plural': 'アバター画像',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='avatar_status_next_idx')],
+            },
+        ),
+        migrations.RunPython(restore_sns_search_triggers, migrations.RunPython.noop),
+    ]
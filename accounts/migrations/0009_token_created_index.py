@@ -0,0 +1,20 @@
+# DRF の Token（authtoken_token）の created に索引を作る。
+# 有効期限切れのトークンを purge_expired_tokens コマンドが created の範囲検索で削除するため
+# （accounts.token_service）。Token は他のアプリのモデルなので SQL で作成する。
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_avatar_pipeline'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS authtoken_token_created_idx ON authtoken_token (created)",
+            "DROP INDEX IF EXISTS authtoken_token_created_idx",
+        ),
+    ]
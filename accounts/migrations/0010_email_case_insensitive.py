@@ -0,0 +1,152 @@
+# メールアドレスを大文字・小文字を区別せずに一意にする（LOWER(email) の一意インデックス）。
+# 制約を追加する前に、大文字・小文字だけが違うメールアドレスのユーザーを 1 人にまとめる。
+#
+# - 重複の検出: LOWER(email) 順に 1 回だけ全件を読み、同じ値が続くグループを集める
+# - まとめ方: 管理者 → 有効 → 最後にログインした → 先に登録した ユーザーを残し、
+#   残すユーザーに無いプロフィール・トークン・グループ・権限を移してから他のユーザーを削除する
+# - 管理者を優先するのは、is_staff / is_superuser を他のユーザーに移すと、そのユーザーのパスワード
+#   （管理者本人のものとは限らない）で管理画面に入れるようになるため。管理者を残せば権限は増えず、
+#   他のユーザーのプロフィール・トークンは移すので失われない
+# - 削除は元に戻せない（逆方向のマイグレーションでは何もしない）。グループごとに、残すユーザーと
+#   削除するユーザーの ID を削除の前にログ（accounts.email_merge、WARNING）に出す。
+#   適用前に python manage.py merge_email_duplicates --dry-run で対象を確認できる
+# - BATCH_SIZE グループごとにトランザクションを分ける（途中で失敗しても、再実行すれば続きから処理する）
+# シャーディング有効時はデータベース（migrate --database shardN）ごとに実行される。
+# 大文字・小文字だけが違うメールアドレスは同じシャードに置かれる（accounts.sharding）。
+
+import logging
+from itertools import groupby
+from operator import itemgetter
+
+import django.db.models.functions.text
+from django.db import migrations, models, transaction
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 500  # 1 トランザクションでまとめるグループ数
+PROFILE_MODELS = ("CustomerProfile", "EmployeeProfile", "SNSProfile")
+
+logger = logging.getLogger("accounts.email_merge")
+
+
+def _duplicate_groups(users):
+    """大文字・小文字だけが違うメールアドレスのグループ（小文字のメールアドレス, ユーザー ID のリスト）"""
+    # 全件をメモリに載せないよう、読みながら重複したグループだけを残す
+    rows = (
+        users.annotate(email_lower=Lower("email"))
+        .order_by("email_lower", "pk")
+        .values_list("email_lower", "pk")
+        .iterator(chunk_size=5000)
+    )
+    groups = []
+    for email, group in groupby(rows, key=itemgetter(0)):
+        ids = [pk for _, pk in group]
+        if len(ids) > 1:
+            groups.append((email, ids))
+    return groups
+
+
+def _survivor_key(user):
+    return (
+        user.is_superuser,
+        user.is_staff,
+        user.is_active,
+        user.last_login is not None,
+        user.last_login or user.date_joined,
+        -user.pk,
+    )
+
+
+def _merge_group(apps, database, email, ids, dry_run=False):
+    """
+    1 グループを 1 人にまとめる。dry_run なら何も変更しない。
+
+    Returns:
+        tuple[int, list[int]]: 残すユーザーの ID と、削除する（した）ユーザーの ID
+    """
+    User = apps.get_model("accounts", "CustomUser")
+    Token = apps.get_model("authtoken", "Token")
+
+    users = list(User.objects.using(database).filter(pk__in=ids))
+    survivor = max(users, key=_survivor_key)
+    others = [user for user in users if user.pk != survivor.pk]
+    other_ids = sorted(user.pk for user in others)
+    if dry_run:
+        return survivor.pk, other_ids
+    logger.warning(
+        "大文字・小文字だけが違うメールアドレスのユーザーをまとめます: %s（%s）残す=%s 削除=%s",
+        email, database, survivor.pk, other_ids,
+    )
+
+    # プロフィール・トークンは 1 ユーザー 1 件なので、残すユーザーに無い場合だけ移す（新しいものを優先）
+    related = [apps.get_model("accounts", name).objects.using(database) for name in PROFILE_MODELS]
+    related.append(Token.objects.using(database))
+    for queryset in related:
+        if queryset.filter(user_id=survivor.pk).exists():
+            continue
+        moved = queryset.filter(user_id__in=other_ids).order_by("-pk").values_list("pk", flat=True).first()
+        if moved is not None:
+            queryset.filter(pk=moved).update(user_id=survivor.pk)
+
+    for other in others:
+        survivor.groups.add(*other.groups.all())
+        survivor.user_permissions.add(*other.user_permissions.all())
+
+    survivor.is_active = any(user.is_active for user in users)
+    survivor.last_login = max((user.last_login for user in users if user.last_login), default=None)
+    survivor.date_joined = min(user.date_joined for user in users)
+    survivor.display_name = survivor.display_name or next(
+        (user.display_name for user in others if user.display_name), ""
+    )
+    survivor.save(update_fields=["is_active", "last_login", "date_joined", "display_name"])
+
+    # 移さなかったプロフィール・トークンなどは連鎖削除される
+    User.objects.using(database).filter(pk__in=other_ids).delete()
+    return survivor.pk, other_ids
+
+
+def merge_duplicates(apps, database, dry_run=False, report=None):
+    """
+    データベース database の、大文字・小文字だけが違うメールアドレスのユーザーをまとめる
+    （merge_email_duplicates コマンドからも使う）。
+
+    Args:
+        apps: モデルを取得するアプリのレジストリ（マイグレーションでは履歴のモデル）
+        dry_run (bool): True なら対象を調べるだけで変更しない
+        report (Callable | None): グループごとに report(email, survivor_id, deleted_ids) を呼ぶ
+
+    Returns:
+        int: まとめた（dry_run ならまとめる）グループ数
+    """
+    User = apps.get_model("accounts", "CustomUser")
+    groups = _duplicate_groups(User.objects.using(database))
+    for start in range(0, len(groups), BATCH_SIZE):
+        with transaction.atomic(using=database):
+            for email, ids in groups[start:start + BATCH_SIZE]:
+                survivor_id, deleted_ids = _merge_group(apps, database, email, ids, dry_run=dry_run)
+                if report is not None:
+                    report(email, survivor_id, deleted_ids)
+    return len(groups)
+
+
+def merge_case_duplicates(apps, schema_editor):
+    merge_duplicates(apps, schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    # バッチごとにコミットする
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0009_token_created_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        # 削除したユーザーは戻せないので、逆方向では何もしない
+        migrations.RunPython(merge_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_lower_uniq', violation_error_message='このメールアドレスは既に登録されています。'),
+        ),
+    ]
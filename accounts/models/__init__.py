@@ -1,8 +1,11 @@
 # accounts/models/__init__.py
-from . import CustomUser, CustomUserManager
+from .models import CustomUser, CustomUserManager
 from .employee_profile import EmployeeProfile
 from .customer_profile import CustomerProfile
 from .sns_profile import SNSProfile
+from .email_outbox import EmailOutbox
+from .user_directory import UserDirectory
+from .avatar_image import AvatarImage
 
 __all__ = [
     "CustomUser",
@@ -10,4 +13,7 @@ __all__ = [
     "EmployeeProfile",
     "CustomerProfile",
     "SNSProfile",
+    "EmailOutbox",
+    "UserDirectory",
+    "AvatarImage",
 ]
@@ -0,0 +1,54 @@
+# rest_template_backend/accounts/models/avatar_image.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class AvatarImage(models.Model):
+    """
+    アップロードされたアバター画像（内容の SHA-256 ごとに 1 行、default データベースに置く）
+    同じ画像が何度アップロードされても、ファイルは original の 1 つだけを保存する。
+
+    縮小版（WebP）は process_avatars コマンド（ワーカー）が生成し、variants に
+    {"辺の長さ": ストレージ上のファイル名} を記録して、その画像を使う SNSProfile にも反映する。
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_READY = "ready"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "生成待ち"),
+        (STATUS_PROCESSING, "生成中"),
+        (STATUS_READY, "生成済み"),
+        (STATUS_FAILED, "生成失敗"),
+    ]
+
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    original = models.CharField("元画像のファイル名", max_length=255)
+    width = models.PositiveIntegerField("幅")
+    height = models.PositiveIntegerField("高さ")
+    size = models.PositiveBigIntegerField("ファイルサイズ")
+    variants = models.JSONField("縮小版", default=dict, blank=True)
+    status = models.CharField(
+        "状態", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField("試行回数", default=0)
+    next_attempt_at = models.DateTimeField("次回生成日時", default=timezone.now)
+    locked_until = models.DateTimeField("ロック期限", blank=True, null=True)
+    claim_token = models.CharField("取得トークン", max_length=32, blank=True, default="")
+    last_error = models.TextField("直近のエラー", blank=True, default="")
+    created_at = models.DateTimeField("作成日時", auto_now_add=True)
+
+
+    class Meta:
+        verbose_name = "アバター画像"
+        verbose_name_plural = "アバター画像"
+        indexes = [
+            # ワーカーが生成対象を取り出すときの検索用
+            models.Index(fields=["status", "next_attempt_at"], name="avatar_status_next_idx"),
+        ]
+
+
+    def __str__(self):
+        return f"{self.original}（{self.get_status_display()}）"
@@ -24,6 +24,10 @@ class CustomerProfile(models.Model):
     class Meta:
         verbose_name = "顧客プロフィール"
         verbose_name_plural = "顧客プロフィール"
+        # 顧客一覧 API（accounts.api.pagination.CustomerDirectoryPagination）の並び順用
+        indexes = [
+            models.Index(fields=["lastname", "firstname", "user"], name="customer_name_idx"),
+        ]
 
 
     def __str__(self):
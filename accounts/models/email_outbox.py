@@ -0,0 +1,51 @@
+# rest_template_backend/accounts/models/email_outbox.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class EmailOutbox(models.Model):
+    """
+    送信待ちメールのアウトボックス
+    サインアップ時はユーザー作成と同じトランザクションでここへ書き込み、
+    実際の SMTP 送信は send_outbox_emails コマンド（ワーカー）が行う。
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "送信待ち"),
+        (STATUS_SENDING, "送信中"),
+        (STATUS_SENT, "送信済み"),
+        (STATUS_FAILED, "送信失敗"),
+    ]
+
+    subject = models.CharField("件名", max_length=255)
+    body = models.TextField("本文")
+    from_email = models.CharField("送信元", max_length=254)
+    recipient = models.EmailField("宛先")
+    status = models.CharField(
+        "状態", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField("試行回数", default=0)
+    next_attempt_at = models.DateTimeField("次回送信日時", default=timezone.now)
+    locked_until = models.DateTimeField("ロック期限", blank=True, null=True)
+    claim_token = models.CharField("取得トークン", max_length=32, blank=True, default="")
+    last_error = models.TextField("直近のエラー", blank=True, default="")
+    created_at = models.DateTimeField("作成日時", auto_now_add=True)
+    sent_at = models.DateTimeField("送信日時", blank=True, null=True)
+
+
+    class Meta:
+        verbose_name = "メールアウトボックス"
+        verbose_name_plural = "メールアウトボックス"
+        indexes = [
+            # ワーカーが送信対象を取り出すときの検索用
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_next_idx"),
+        ]
+
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}（{self.get_status_display()}）"
@@ -31,6 +31,15 @@ class EmployeeProfile(models.Model):
     class Meta:
         verbose_name = "従業員プロフィール"
         verbose_name_plural = "従業員プロフィール"
+        # 従業員名簿 API（accounts.api.pagination.EmployeeDirectoryPagination）の絞り込み + 並び順用
+        indexes = [
+            models.Index(fields=["lastname", "firstname", "user"], name="employee_name_idx"),
+            models.Index(fields=["department", "lastname", "firstname", "user"], name="employee_dept_name_idx"),
+            models.Index(fields=["position", "lastname", "firstname", "user"], name="employee_position_name_idx"),
+            models.Index(fields=["hire_date", "user"], name="employee_hire_date_idx"),
+            models.Index(fields=["department", "hire_date", "user"], name="employee_dept_hire_date_idx"),
+            models.Index(fields=["position", "hire_date", "user"], name="employee_pos_hire_date_idx"),
+        ]
 
 
     def __str__(self):
@@ -2,11 +2,60 @@
 
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
+from ..hashing import get_hash_executor
+from ..sharding import bind_user, db_for_email, place_user, release_ids
 
-class CustomUserManager(BaseUserManager):
+
+class CustomUserQuerySet(models.QuerySet):
+    """CustomUser 用のクエリセット。"""
+
+    PROFILE_RELATIONS = ("sns_profile", "employee_profile", "customer_profile")
+
+    def with_profiles(self):
+        """3 種類のプロフィールを LEFT OUTER JOIN で 1 クエリにまとめて取得します。
+
+        Returns:
+            CustomUserQuerySet: プロフィールを select_related したクエリセット
+        """
+        return self.select_related(*self.PROFILE_RELATIONS)
+
+    def for_email(self, email):
+        """メールアドレスで大文字・小文字を区別せずに絞り込みます。
+
+        LOWER(email) = ? で比較するので、一意インデックス user_email_lower_uniq を使います
+        （email__iexact は SQLite では LIKE になり、インデックスを使えません）。
+
+        Args:
+            email (str): メールアドレス
+
+        Returns:
+            CustomUserQuerySet: 該当するユーザー（0 件または 1 件）
+        """
+        return self.alias(email_lower=Lower("email")).filter(email_lower=email.lower())
+
+    def for_emails(self, emails):
+        """for_email() の複数版（LOWER(email) IN (...)）。
+
+        Args:
+            emails (Iterable[str]): メールアドレス
+
+        Returns:
+            CustomUserQuerySet: 該当するユーザー
+        """
+        return self.alias(email_lower=Lower("email")).filter(
+            email_lower__in=[email.lower() for email in emails]
+        )
+
+
+class CustomUserManager(BaseUserManager.from_queryset(CustomUserQuerySet)):
     """マネージャークラスで、CustomUserモデルのユーザー作成を管理します。
     create_user と create_superuser メソッドを提供し、ユーザー作成時の処理を統一します。
+
+    シャーディング（USER_SHARDS）有効時は、作成・メールアドレスでの取得を
+    メールアドレスから決まるシャードで行います（accounts.sharding）。
     """
 
     def create_user(self, email, password=None, **extra_fields):
@@ -26,10 +75,32 @@ class CustomUserManager(BaseUserManager):
         if not email:
             raise ValueError("メールアドレスは必須です")
         email = self.normalize_email(email)
+        extra_fields.setdefault("is_active", False)  # 初回はメール認証などでアクティブ化
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
-        user.is_active = False  # 初回はメール認証などでアクティブ化
-        user.save(using=self._db)
+        # シャーディング有効時はシャードを決めて UserDirectory で ID を採番
+        using = self._db or place_user(user)
+        try:
+            user.save(using=using, force_insert=True)
+        except BaseException:
+            if not self._db:
+                release_ids([user.pk])
+            raise
+        return user
+
+    def get_by_natural_key(self, username):
+        """メールアドレスでユーザーを取得します（ModelBackend のログインで使われます）。
+
+        大文字・小文字を区別せず、LOWER(email) の一意インデックスで引きます。
+        """
+        user = self.db_manager(self._db or db_for_email(username)).for_email(username).get()
+        bind_user(user)
+        return user
+
+    async def aget_by_natural_key(self, username):
+        """get_by_natural_key() の非同期版"""
+        user = await self.db_manager(self._db or db_for_email(username)).for_email(username).aget()
+        bind_user(user)
         return user
 
 
@@ -46,9 +117,8 @@ class CustomUserManager(BaseUserManager):
         """
         extra_fields.setdefault("is_staff", True)
         extra_fields.setdefault("is_superuser", True)
-        user = self.create_user(email, password, **extra_fields)
-        user.is_active = True  # スーパーユーザーは即アクティブ
-        return user
+        extra_fields.setdefault("is_active", True)  # スーパーユーザーは即アクティブ
+        return self.create_user(email, password, **extra_fields)
 
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
@@ -58,7 +128,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     権限管理には PermissionsMixin を利用。
     
     Attributes:
-        email (str): ユーザーのメールアドレス（ユニーク）
+        email (str): ユーザーのメールアドレス（大文字・小文字を区別せずユニーク）
+        display_name (str): 表示名（プロフィール保存時に signals で同期する非正規化カラム）
+        date_joined (datetime): 登録日時（未認証アカウントの期限切れ判定に使用）
         is_active (bool): アカウントが有効かどうか
         is_staff (bool): 管理画面アクセス権限を持つか
         objects (CustomUserManager): このモデル用のマネージャー
@@ -67,32 +139,101 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     """
 
     email = models.EmailField(unique=True)
+    display_name = models.CharField("表示名", max_length=255, blank=True, default="")
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
+    date_joined = models.DateTimeField("登録日時", default=timezone.now)
 
     objects = CustomUserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            # 未認証アカウントの一括有効化・期限切れ処理用
+            models.Index(fields=["is_active", "date_joined"], name="user_active_joined_idx"),
+        ]
+        constraints = [
+            # 大文字・小文字だけが違うメールアドレスの重複を防ぎ、ログイン時の検索（for_email）にも使う
+            models.UniqueConstraint(
+                Lower("email"),
+                name="user_email_lower_uniq",
+                violation_error_message="このメールアドレスは既に登録されています。",
+            ),
+        ]
+
+    def set_password(self, raw_password):
+        """パスワードをハッシュ化して設定します（PASSWORD_HASH_EXECUTOR で実行）。"""
+        self.password = get_hash_executor().make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """パスワードを照合します（PASSWORD_HASH_EXECUTOR で実行）。
+
+        照合に成功し、ハッシュ方式や反復回数が古い場合は Django 標準と同様に再ハッシュして保存します。
+        ModelBackend（authenticate / ObtainAuthToken）はこのメソッドを経由します。
+        """
+
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # パスワード変更扱いにはしない（password_changed を発火させない）
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return get_hash_executor().check_password(raw_password, self.password, setter)
 
-def get_display_name(self) -> str:
-    # SNSプロフィールのニックネーム
-    if hasattr(self, 'sns_profile') and self.sns_profile.nickname:
-        return self.sns_profile.nickname
+    async def acheck_password(self, raw_password):
+        """check_password() の非同期版。ハッシュ計算はイベントループの外で実行します。"""
 
-    # EmployeeProfile
-    if hasattr(self, 'employee_profile'):
-        ep = self.employee_profile
-        if ep.firstname or ep.lastname:
-            return f"{ep.firstname} {ep.lastname}".strip()
+        async def setter(raw_password):
+            self.password = await get_hash_executor().amake_password(raw_password)
+            self._password = None
+            await self.asave(update_fields=["password"])
 
-    # CustomerProfile
-    if hasattr(self, 'customer_profile'):
-        cp = self.customer_profile
-        if cp.firstname or cp.lastname:
-            return f"{cp.firstname} {cp.lastname}".strip()
+        return await get_hash_executor().acheck_password(raw_password, self.password, setter)
 
-    # 最終的にメールアドレス
-    return self.email
+    def get_display_name(self) -> str:
+        """表示名を返します（クエリは発行しません）。
 
+        プロフィール未登録などで display_name が空の場合はメールアドレスを返します。
+        """
+        return self.display_name or self.email
+
+    def compute_display_name(self) -> str:
+        """プロフィールから表示名を組み立てます。
+
+        優先順位は SNS のニックネーム → 従業員の氏名 → 顧客の氏名。
+        どれも無ければ空文字を返します（get_display_name() はメールアドレスで補完）。
+        with_profiles() で取得したインスタンスなら追加のクエリは発行されません。
+        """
+        # SNSプロフィールのニックネーム
+        sns = getattr(self, "sns_profile", None)
+        if sns is not None and sns.nickname:
+            return sns.nickname
+
+        # EmployeeProfile / CustomerProfile
+        for relation in ("employee_profile", "customer_profile"):
+            profile = getattr(self, relation, None)
+            if profile is not None and (profile.firstname or profile.lastname):
+                return f"{profile.firstname} {profile.lastname}".strip()
+
+        return ""
+
+    def refresh_display_name(self) -> str:
+        """プロフィールから表示名を再計算し、変わっていれば display_name だけを UPDATE します。
+
+        Returns:
+            str: 再計算後の表示名
+        """
+        users = type(self).objects.db_manager(self._state.db)
+        user = users.with_profiles().filter(pk=self.pk).first()
+        if user is None:
+            # ユーザー削除に伴うプロフィールの連鎖削除中など
+            return self.display_name
+        display_name = user.compute_display_name()
+        if display_name != user.display_name:
+            # post_save（トークンキャッシュの無効化など）を発火させないよう QuerySet.update() を使う
+            users.filter(pk=self.pk).update(display_name=display_name)
+        self.display_name = display_name
+        return display_name
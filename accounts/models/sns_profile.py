@@ -17,6 +17,8 @@ class SNSProfile(models.Model):
     nickname = models.CharField("ニックネーム", max_length=50, blank=True, null=True)
     bio = models.TextField("自己紹介", blank=True, null=True)
     avatar = models.ImageField("アバター画像", upload_to="avatars/", blank=True, null=True)
+    # 縮小版（WebP）のファイル名 {"辺の長さ": ファイル名}。accounts.avatar_service が設定する
+    avatar_variants = models.JSONField("アバター縮小版", default=dict, blank=True)
 
 
     class Meta:
@@ -0,0 +1,23 @@
+# rest_template_backend/accounts/models/user_directory.py
+
+from django.db import models
+
+
+class UserDirectory(models.Model):
+    """
+    ユーザー ID → シャードの対応表（USER_SHARDS でシャーディングする場合のみ使用）
+    常に default データベースに置く。
+
+    id はそのままユーザーの主キーとして使う（シャードをまたいで一意な ID の採番を兼ねる）。
+    ユーザーの作成に失敗した場合は採番した行を消す（accounts.sharding.release_ids）。
+    プロセスの停止などで消せなかった行は、ID の欠番になるだけで害はない。
+    """
+
+    shard = models.CharField("シャード", max_length=64)
+
+    class Meta:
+        verbose_name = "ユーザーディレクトリ"
+        verbose_name_plural = "ユーザーディレクトリ"
+
+    def __str__(self):
+        return f"{self.pk} → {self.shard}"
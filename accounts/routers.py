@@ -0,0 +1,152 @@
+# accounts/routers.py
+
+"""
+accounts.routers モジュール
+
+データベースルーター。DATABASE_ROUTERS には UserShardRouter → PrimaryReplicaRouter の順に並べる。
+
+- UserShardRouter: シャーディング（accounts.sharding）有効時に、ユーザー関連のモデルをユーザーのシャードへ送る
+- PrimaryReplicaRouter: 認証まわりのモデルの読み取りをレプリカへ、書き込みをプライマリ（default）へ送る
+
+以下は PrimaryReplicaRouter について。
+
+対象モデル（ROUTED_MODELS）: CustomUser / Token / CustomerProfile / EmployeeProfile / SNSProfile
+
+書き込み直後の読み取りがレプリカの遅延で古い値にならないよう、対象モデルへの書き込みがあると
+REPLICA_PIN_SECONDS 秒間はそのリクエスト（コンテキスト）の読み取りもプライマリへ送る。
+固定は書き込んだ側が pin_to_primary() で行う（save() / delete() は accounts.signals のシグナルで、
+bulk_create / QuerySet.update() はそれぞれの書き込み処理で）。ルーター自体は状態を変えない。
+リクエストをまたいだ固定は ReplicaPinningMiddleware が Cookie（と REPLICA_PIN_CACHE）で引き継ぐ。
+
+設定:
+    REPLICA_DATABASES: レプリカのエイリアスのリスト（空ならすべてプライマリ）
+    REPLICA_PIN_SECONDS: 書き込み後にプライマリへ固定する秒数
+    REPLICA_PIN_CACHE: Cookie を使わないクライアントの固定を Authorization ヘッダーごとに引き継ぐ
+        CACHES のエイリアス（プロセス間で共有するもの。None で無効）
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .sharding import get_current_shard, get_shards
+
+PRIMARY = "default"
+
+ROUTED_MODELS = {
+    "accounts.customuser",
+    "accounts.customerprofile",
+    "accounts.employeeprofile",
+    "accounts.snsprofile",
+    "authtoken.token",
+}
+
+_pinned_until = ContextVar("accounts_primary_pinned_until", default=0.0)
+
+
+def get_replicas():
+    return list(getattr(settings, "REPLICA_DATABASES", []))
+
+
+def get_pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def pin_to_primary(seconds=None):
+    """現在のコンテキストの読み取りを seconds 秒間プライマリに固定する"""
+    seconds = get_pin_seconds() if seconds is None else seconds
+    _pinned_until.set(max(_pinned_until.get(), time.monotonic() + seconds))
+
+
+def primary_pinned_until():
+    """プライマリへの固定が切れる時刻（time.monotonic() 基準、固定なしは 0）"""
+    return _pinned_until.get()
+
+
+def is_pinned_to_primary():
+    return _pinned_until.get() > time.monotonic()
+
+
+@contextmanager
+def primary_pin_scope():
+    """固定なしの状態からブロックを実行し、終了時に元の状態へ戻す（リクエスト単位のリセット用）"""
+    token = _pinned_until.set(0.0)
+    try:
+        yield
+    finally:
+        _pinned_until.reset(token)
+
+
+def _is_user_model(model):
+    """ユーザー関連のモデル（ManyToMany の中間テーブルを含む）か"""
+    owner = model._meta.auto_created or model
+    return owner._meta.label_lower in ROUTED_MODELS
+
+
+class UserShardRouter:
+    """
+    ユーザー関連のモデル（ROUTED_MODELS）を、ユーザーのシャードへ送る。
+    シャーディング無効時、またはシャードが分からないときは None を返して次のルーターに任せる。
+
+    1. ヒントのインスタンス（関連オブジェクトの取得・保存時）が置かれているシャード
+    2. 現在のシャード（accounts.sharding.bind_user / use_shard で設定）
+    """
+
+    def _db_for(self, model, hints):
+        if not _is_user_model(model):
+            return None
+        shards = get_shards()
+        if not shards:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in shards:
+            return instance._state.db
+        return get_current_shard()
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        shards = get_shards()
+        if obj1._state.db in shards or obj2._state.db in shards:
+            # シャードをまたぐ関連は作れない
+            return obj1._state.db == obj2._state.db
+        return None
+
+
+class PrimaryReplicaRouter:
+    """
+    対象モデルの読み取りはレプリカ（ランダムに 1 つ）、書き込みはプライマリへ送る。
+    対象外のモデルは None を返して既定の振り分け（default）に任せる。
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in ROUTED_MODELS:
+            return None
+        replicas = get_replicas()
+        if not replicas or is_pinned_to_primary():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower not in ROUTED_MODELS:
+            return None
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # レプリカのスキーマはプライマリからの複製で作られる
+        if db in get_replicas():
+            return False
+        return None
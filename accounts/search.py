@@ -0,0 +1,170 @@
+# accounts/search.py
+
+"""
+accounts.search モジュール
+
+プロフィールの全文検索（SQLite FTS5）。
+
+- 従業員: 姓・名・保有資格（EmployeeProfile.lastname / firstname / qualifications）
+- SNS: ニックネーム・自己紹介（SNSProfile.nickname / bio）
+
+索引はマイグレーション 0007 が作る FTS5 の仮想テーブル（外部コンテンツ、trigram トークナイザ）で、
+プロフィールテーブルのトリガーが保存・削除のたびに更新する（bulk_create / update / 連鎖削除も含む）。
+索引と元データがずれた場合は rebuild_search_index コマンドで作り直す。
+
+検索語は空白区切りの AND 検索（大文字・小文字は区別しない部分一致）。
+3 文字以上の語は索引で検索して bm25 で順位付けし、2 文字以下の語は索引の各列への LIKE で絞り込む
+（trigram の索引は 3 文字単位のため）。SQLite 以外のデータベースでは icontains で検索する。
+
+含まれる主な関数:
+- search_profiles: 検索して順位順のプロフィールを返す
+- rebuild_index: 索引をチャンクごとに作り直す
+"""
+
+from dataclasses import dataclass
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from .models import EmployeeProfile, SNSProfile
+from .sharding import user_databases
+
+MIN_INDEXED_TERM_LENGTH = 3  # trigram で索引を使える語の長さ
+MAX_TERMS = 8
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """FTS5 の仮想テーブルと、その元になるモデル・列"""
+
+    model: type
+    table: str
+    columns: tuple
+
+    @property
+    def content_table(self):
+        return self.model._meta.db_table
+
+
+SEARCH_INDEXES = {
+    "employee": SearchIndex(
+        EmployeeProfile, "accounts_employeeprofile_search", ("lastname", "firstname", "qualifications")
+    ),
+    "sns": SearchIndex(SNSProfile, "accounts_snsprofile_search", ("nickname", "bio")),
+}
+
+
+def parse_query(query):
+    """検索文字列を（重複を除いた）検索語のリストにする"""
+    return list(dict.fromkeys(query.split()))[:MAX_TERMS]
+
+
+def _uses_fts(alias):
+    return connections[alias].vendor == "sqlite"
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_fts(index, alias, terms, limit):
+    """FTS5 で検索し、[(順位のスコア, プロフィールの ID)] を返す（スコアは小さいほど上位）"""
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_TERM_LENGTH]
+    short = [term for term in terms if len(term) < MIN_INDEXED_TERM_LENGTH]
+
+    where, params = [], []
+    if indexed:
+        # 各語をフレーズとして引用する（FTS5 の演算子や記号をそのまま検索できるように）
+        where.append(f"{index.table} MATCH %s")
+        params.append(" ".join('"{}"'.format(term.replace('"', '""')) for term in indexed))
+    for term in short:
+        where.append("(" + " OR ".join(f"{column} LIKE %s ESCAPE '\\'" for column in index.columns) + ")")
+        params += [f"%{_escape_like(term)}%"] * len(index.columns)
+    score = f"bm25({index.table})" if indexed else "0.0"
+
+    sql = (
+        f"SELECT {score} AS score, rowid FROM {index.table} WHERE {' AND '.join(where)} "
+        f"ORDER BY score, rowid LIMIT %s"
+    )
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return cursor.fetchall()
+
+
+def _search_icontains(index, alias, terms, limit):
+    """FTS5 が使えないデータベース用。icontains で絞り込み、ID 順に返す（順位付けなし）"""
+    condition = reduce(and_, [
+        reduce(or_, [Q(**{f"{column}__icontains": term}) for column in index.columns])
+        for term in terms
+    ])
+    ids = index.model.objects.using(alias).filter(condition).order_by("pk").values_list("pk", flat=True)
+    return [(0.0, pk) for pk in ids[:limit]]
+
+
+def search_profiles(kind, query, limit, offset=0):
+    """
+    kind（"employee" / "sns"）のプロフィールを検索し、順位順に offset 件目から最大 limit 件を返す。
+    プロフィールは user を select_related 済み。シャーディング有効時は各シャードの結果をスコアでマージする。
+    """
+    index = SEARCH_INDEXES[kind]
+    terms = parse_query(query)
+    if not terms:
+        return []
+
+    hits = []
+    for database in user_databases():
+        alias = database or router.db_for_read(index.model)
+        search = _search_fts if _uses_fts(alias) else _search_icontains
+        hits += [(score, alias, pk) for score, pk in search(index, alias, terms, offset + limit)]
+    hits.sort()
+    hits = hits[offset:offset + limit]
+
+    profiles = {}
+    for alias in {alias for _, alias, _ in hits}:
+        ids = [pk for _, hit_alias, pk in hits if hit_alias == alias]
+        profiles[alias] = index.model.objects.using(alias).select_related("user").in_bulk(ids)
+    # 検索後に削除されたプロフィールは除く
+    return [profiles[alias][pk] for _, alias, pk in hits if pk in profiles[alias]]
+
+
+def rebuild_index(kind, using, chunk_size=1000, progress=None):
+    """
+    データベース using の kind の索引を空にしてから、プロフィールを ID 順に chunk_size 件ずつ登録し直す。
+    チャンクごとにコミットするので、作り直している間の検索結果は不完全になる。
+
+    Returns:
+        int: 登録した件数
+    """
+    index = SEARCH_INDEXES[kind]
+    columns = ", ".join(index.columns)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {index.table}({index.table}) VALUES ('delete-all')")
+
+    total = last_id = 0
+    while True:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM {index.content_table} "
+                f"WHERE id > %s ORDER BY id LIMIT %s)",
+                [last_id, chunk_size],
+            )
+            upper, count = cursor.fetchone()
+            if not count:
+                break
+            cursor.execute(
+                f"INSERT INTO {index.table}(rowid, {columns}) SELECT id, {columns} "
+                f"FROM {index.content_table} WHERE id > %s AND id <= %s",
+                [last_id, upper],
+            )
+        total += count
+        last_id = upper
+        if progress is not None:
+            progress(total)
+
+    with connection.cursor() as cursor:
+        # 登録で細かく分かれた索引の b-tree をまとめる
+        cursor.execute(f"INSERT INTO {index.table}({index.table}) VALUES ('optimize')")
+    return total
@@ -0,0 +1,102 @@
+# accounts/session_service.py
+
+"""
+accounts.session_service モジュール
+
+セッション（SESSION_MODE）の失効済みデータの削除。
+
+- db / cached_db: django_session の失効済みの行を expire_date の索引でチャンクごとに削除する
+  （標準の clearsessions は 1 文の DELETE で全件を消すため、件数が多いとテーブルを長くロックする）
+- キャッシュがファイル（SESSION_CACHE_BACKEND = "file"）の場合: 期限切れのキャッシュファイルを削除する
+  （FileBasedCache は期限切れのファイルを読まれるまで残すため）
+- プロセス内メモリのキャッシュ・signed_cookies: 削除するものはない（期限切れの項目はキャッシュが自分で捨てる）
+
+含まれる主な関数:
+- uses_database / uses_cache: 現在の SESSION_ENGINE が django_session・キャッシュを使うか
+- purge_expired_sessions: 失効済みの行をチャンクごとに削除
+- purge_expired_cache_files: 期限切れのキャッシュファイルを削除
+"""
+
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import router
+from django.utils import timezone
+
+DATABASE_ENGINES = {
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+}
+CACHE_ENGINES = {
+    "django.contrib.sessions.backends.cache",
+    "django.contrib.sessions.backends.cached_db",
+}
+
+
+def uses_database():
+    # API 専用プロファイル（API_ONLY）では sessions アプリ（django_session）がない
+    return apps.is_installed("django.contrib.sessions") and settings.SESSION_ENGINE in DATABASE_ENGINES
+
+
+def uses_cache():
+    return settings.SESSION_ENGINE in CACHE_ENGINES
+
+
+def purge_expired_sessions(chunk_size=1000, pause=0.0, progress=None):
+    """
+    django_session の失効済みの行を、expire_date の古い順に chunk_size 件ずつ削除する。
+
+    Returns:
+        int: 削除した件数
+    """
+    from django.contrib.sessions.models import Session
+
+    now = timezone.now()
+    sessions = Session.objects.using(router.db_for_write(Session))
+    total = 0
+    while True:
+        keys = list(
+            sessions.filter(expire_date__lt=now).order_by("expire_date").values_list("pk", flat=True)[:chunk_size]
+        )
+        if not keys:
+            break
+        # 選んだ後に延長（再ログインなど）されたセッションは消さない
+        deleted, _ = sessions.filter(pk__in=keys, expire_date__lt=now).delete()
+        total += deleted
+        if progress is not None:
+            progress(total)
+        if len(keys) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def purge_expired_cache_files(alias=None):
+    """
+    キャッシュ alias（既定: SESSION_CACHE_ALIAS）がファイルの場合に、期限切れのファイルを削除する。
+    ファイル一覧はリストにせず 1 件ずつ読み進める。
+
+    Returns:
+        int: 削除したファイル数（ファイルのキャッシュでなければ 0）
+    """
+    cache = caches[alias or settings.SESSION_CACHE_ALIAS]
+    if not isinstance(cache, FileBasedCache) or not os.path.isdir(cache._dir):
+        return 0
+    removed = 0
+    with os.scandir(cache._dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(cache.cache_suffix):
+                continue
+            try:
+                with open(entry.path, "rb") as file:
+                    # 期限切れなら FileBasedCache 自身がファイルを削除する
+                    removed += cache._is_expired(file)
+            except FileNotFoundError:
+                # 他のプロセスが先に削除した
+                continue
+    return removed
@@ -0,0 +1,141 @@
+# accounts/sharding.py
+
+"""
+accounts.sharding モジュール
+
+ユーザー（CustomUser）とプロフィール・トークンを複数のデータベース（シャード）に分散して置く。
+USER_SHARDS にシャードのエイリアスを指定したときだけ有効になる（空なら従来どおり default のみ）。
+
+- 置き場所: 正規化したメールアドレスのハッシュで決める（ランデブーハッシュ）。
+  シャードを追加しても移動が必要なのは約 1/N のユーザーだけで済む。
+- ID: default の UserDirectory で採番し、ID → シャードの対応もそこに記録する。
+- 振り分け: 「現在のシャード」を ContextVar に持ち、accounts.routers.UserShardRouter が
+  ヒントのないクエリ（Token.objects.filter(user=...) など）をそのシャードへ送る。
+  create_user / get_by_natural_key / 有効化 / トークン認証がユーザーのシャードを設定し、
+  ShardContextMiddleware がリクエストごとにリセットする。
+
+含まれる主な関数:
+- shard_for_email: メールアドレスからシャードを決める
+- db_for_email / db_for_user_id: ユーザーのデータベース（シャーディング無効時は None = ルーターに任せる）
+- place_user: 新規ユーザーのシャードと ID を決める
+- release_ids: 作成に失敗したユーザーに採番した ID を UserDirectory から消す
+- use_shard / bind_user: 現在のシャードの設定
+- user_databases: ユーザーを保持するデータベースの一覧（バッチ処理用）
+"""
+
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.base_user import BaseUserManager
+
+_current_shard = ContextVar("accounts_current_shard", default=None)
+
+
+def get_shards():
+    return list(getattr(settings, "USER_SHARDS", []))
+
+
+def sharding_enabled():
+    return bool(getattr(settings, "USER_SHARDS", []))
+
+
+def user_databases():
+    """ユーザーを保持するデータベースのエイリアス（シャーディング無効時は [None]）"""
+    return get_shards() or [None]
+
+
+def _email_key(email):
+    return BaseUserManager.normalize_email(email).strip().lower()
+
+
+def shard_for_email(email):
+    """
+    メールアドレスを置くシャード（ランデブーハッシュ: シャード名との組のハッシュが最大のもの）。
+    大文字・小文字の違いは同じシャードになる。
+    """
+    key = _email_key(email)
+    return max(
+        get_shards(),
+        key=lambda shard: hashlib.blake2b(f"{shard}:{key}".encode(), digest_size=8).digest(),
+    )
+
+
+def db_for_email(email):
+    """メールアドレスのユーザーを置くデータベース。シャーディング無効時は None（ルーターに任せる）"""
+    return shard_for_email(email) if sharding_enabled() else None
+
+
+def db_for_user_id(user_id):
+    """ユーザー ID のデータベース。シャーディング無効時・未登録の ID は None"""
+    if not sharding_enabled():
+        return None
+    from .models import UserDirectory
+
+    return UserDirectory.objects.using("default").filter(pk=user_id).values_list("shard", flat=True).first()
+
+
+async def adb_for_user_id(user_id):
+    """db_for_user_id() の非同期版"""
+    if not sharding_enabled():
+        return None
+    from .models import UserDirectory
+
+    return await (
+        UserDirectory.objects.using("default").filter(pk=user_id).values_list("shard", flat=True).afirst()
+    )
+
+
+def place_user(user):
+    """
+    新規ユーザー（未保存）のシャードを決め、UserDirectory で採番した ID を設定する。
+    現在のシャードもそのシャードに切り替える（続くプロフィール作成などが同じシャードへ向かう）。
+
+    Returns:
+        str | None: 保存先のデータベース（シャーディング無効時は None）
+    """
+    if not sharding_enabled():
+        return None
+    from .models import UserDirectory
+
+    shard = shard_for_email(user.email)
+    user.pk = UserDirectory.objects.using("default").create(shard=shard).pk
+    _current_shard.set(shard)
+    return shard
+
+
+def release_ids(user_ids):
+    """採番したのにユーザーを保存できなかった ID を UserDirectory から消す（作成失敗時の後始末）"""
+    if not sharding_enabled() or not user_ids:
+        return
+    from .models import UserDirectory
+
+    UserDirectory.objects.using("default").filter(pk__in=user_ids).delete()
+
+
+def get_current_shard():
+    return _current_shard.get()
+
+
+def bind_user(user):
+    """以降のヒントのないクエリを user のシャードへ送る（認証・ログイン時に呼ぶ）"""
+    if user is not None and user._state.db in get_shards():
+        _current_shard.set(user._state.db)
+
+
+@contextmanager
+def use_shard(alias):
+    """ブロック内の現在のシャードを alias にする（None ならシャードなし）"""
+    token = _current_shard.set(alias)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+@contextmanager
+def shard_scope():
+    """現在のシャードなしでブロックを実行し、終了時に元へ戻す（リクエスト単位のリセット用）"""
+    with use_shard(None):
+        yield
@@ -0,0 +1,94 @@
+# accounts/signals.py
+
+"""
+accounts.signals モジュール
+
+モデルの保存・削除に連動する処理（AccountsConfig.ready() で読み込まれる）。
+
+- トークン削除（LogoutView など）・ユーザーの更新・削除時に、トークン認証キャッシュを無効化
+- プロフィールの保存・削除時に、CustomUser.display_name を同期
+- シャーディング有効時、ユーザー削除で UserDirectory の行も削除
+- ユーザー・トークン・プロフィールの保存・削除後、そのリクエストの読み取りをプライマリ DB に固定
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .models import CustomerProfile, EmployeeProfile, SNSProfile, UserDirectory
+from .routers import pin_to_primary
+from .sharding import sharding_enabled
+
+# CustomUser.compute_display_name() が参照するプロフィールの列
+DISPLAY_NAME_FIELDS = {"nickname", "firstname", "lastname"}
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """トークンが削除されたらキャッシュからも取り除く"""
+    invalidate_token(instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_tokens_of_updated_user(sender, instance, created, update_fields=None, **kwargs):
+    """
+    ユーザーが更新されたら（無効化・権限変更など）キャッシュ上のユーザーを捨てる。
+    last_login だけの更新（ログイン時）は認証結果に影響しないので対象外。
+    """
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_tokens_of_deleted_user(sender, instance, **kwargs):
+    """削除されたユーザー（未認証アカウントの期限切れ削除など）をキャッシュから捨てる"""
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=SNSProfile)
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=SNSProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_delete, sender=CustomerProfile)
+def sync_display_name(sender, instance, raw=False, origin=None, update_fields=None, **kwargs):
+    """プロフィールが変わったらユーザーの表示名（display_name）を再計算する"""
+    if raw:
+        # loaddata 中は関連するユーザーがまだ無いことがある
+        return
+    if update_fields is not None and not set(update_fields) & DISPLAY_NAME_FIELDS:
+        # アバターの変更など、表示名に関係しない列だけの更新
+        return
+    if origin is not None and getattr(origin, "model", type(origin)) is get_user_model():
+        # ユーザー削除に伴う連鎖削除なら再計算は不要（一括削除でのクエリ増加を避ける）
+        return
+    # ユーザー本体は読み込まず、refresh_display_name() の 1 クエリで再計算する
+    user = get_user_model()(pk=instance.user_id)
+    user._state.db = instance._state.db  # プロフィールと同じデータベース（シャード）
+    user.refresh_display_name()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_user_directory_entry(sender, instance, **kwargs):
+    """シャーディング有効時、削除したユーザーを UserDirectory からも取り除く"""
+    if sharding_enabled():
+        UserDirectory.objects.using("default").filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=SNSProfile)
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=Token)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=SNSProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_delete, sender=CustomerProfile)
+def pin_reads_to_primary(sender, **kwargs):
+    """書き込んだリクエストの以降の読み取りをプライマリに固定する（accounts.routers.PrimaryReplicaRouter）"""
+    pin_to_primary()
@@ -0,0 +1,338 @@
+# accounts/signup_service.py
+
+"""
+accounts.signup_service モジュール
+
+ユーザー登録（サインアップ）のサービス層。
+
+含まれる主な関数:
+- signup_account: 1 件のサインアップ（ユーザー・プロフィール・有効化メールを 1 トランザクションで登録）
+- bulk_signup_employees: 従業員の一括登録（検証 → 並列ハッシュ化 → チャンク単位の bulk_create）
+- import_accounts: 移行データの登録（import_accounts コマンドの 1 チャンク分）
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from .email_service import send_activation_emails
+from .hashing import get_hash_executor, hash_passwords
+from .models import EmployeeProfile, UserDirectory
+from .routers import pin_to_primary
+from .sharding import db_for_email, release_ids, use_shard
+
+User = get_user_model()
+
+# SQLite の変数上限（古い版は 999）を超えないよう IN 句を分割する
+LOOKUP_CHUNK_SIZE = 500
+
+DUPLICATE_EMAIL_ERROR = {"email": ["このメールアドレスは既に登録されています。"]}
+
+# メールアドレスの一意制約（LOWER(email) の一意インデックスと email 列の一意制約）。
+# 違反した制約はエラーメッセージに含まれる（SQLite: インデックス名 / テーブル.列、PostgreSQL: 制約名）
+EMAIL_UNIQUE_CONSTRAINTS = (
+    "user_email_lower_uniq",
+    f"{User._meta.db_table}.email",
+    f"{User._meta.db_table}_email_key",
+)
+
+
+@dataclass
+class BulkSignupResult:
+    """一括登録の結果（行番号は入力の 0 始まりのインデックス）"""
+
+    created: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def add_error(self, index, errors):
+        self.errors.append({"index": index, "errors": errors})
+
+
+def is_duplicate_email(error):
+    """
+    IntegrityError がメールアドレスの一意制約の違反によるものか。
+    サインアップは同じトランザクションでプロフィール・アウトボックスも INSERT するので、
+    それ以外の制約違反（NOT NULL・外部キーなど）は重複として扱わず、呼び出し元で送出し直す。
+    """
+    message = str(error)
+    return any(name in message for name in EMAIL_UNIQUE_CONSTRAINTS)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _by_database(items, email_of):
+    """items をユーザーを置くデータベース（シャーディング無効時は None）ごとに分ける"""
+    groups = defaultdict(list)
+    for item in items:
+        groups[db_for_email(email_of(item))].append(item)
+    return groups
+
+
+def _existing_emails(emails):
+    """
+    登録済みのメールアドレスを IN 句をまとめたクエリで（シャードごとに）取得する。
+    大文字・小文字は区別しないので、小文字にしたメールアドレスを渡し、小文字で返す。
+    """
+    existing = set()
+    for database, group in _by_database(emails, lambda email: email).items():
+        for chunk in _chunks(group, LOOKUP_CHUNK_SIZE):
+            existing.update(
+                email.lower()
+                for email in User.objects.using(database).for_emails(chunk).values_list("email", flat=True)
+            )
+    return existing
+
+
+def _assign_ids(database, users):
+    """シャーディング有効時、UserDirectory でまとめて ID を採番する（1 回の INSERT）"""
+    if database is None:
+        return
+    entries = UserDirectory.objects.using("default").bulk_create(
+        [UserDirectory(shard=database) for _ in users]
+    )
+    for user, entry in zip(users, entries):
+        user.pk = entry.pk
+
+
+def _build_account(data, password_hash, is_active, profile_model):
+    """検証済みデータから（未保存の）ユーザーと profile_model のプロフィールを組み立てる"""
+    user = User(email=data["email"], password=password_hash, is_active=is_active)
+    profile_fields = {field.attname for field in profile_model._meta.concrete_fields}
+    profile = profile_model(**{name: value for name, value in data.items() if name in profile_fields})
+    profile.user = user
+    # bulk_create ではシグナルが動かないので、表示名はここで計算しておく
+    user.display_name = user.compute_display_name()
+    return user, profile
+
+
+def _validate_rows(rows, serializer_class, result):
+    """
+    (行番号, 入力) を 1 行ずつシリアライザで検証し、有効な (行番号, validated_data) のリストを返す。
+    入力内で重複したメールアドレス・登録済みのメールアドレスの行はエラーとして result に記録する。
+    """
+    valid = []
+    seen = set()
+    for index, row in rows:
+        if not isinstance(row, dict):
+            result.add_error(index, {"non_field_errors": ["オブジェクトを指定してください。"]})
+            continue
+        serializer = serializer_class(data=row)
+        if not serializer.is_valid():
+            result.add_error(index, serializer.errors)
+            continue
+        data = dict(serializer.validated_data)
+        data["email"] = User.objects.normalize_email(data["email"])
+        if data["email"].lower() in seen:
+            result.add_error(index, {"email": ["入力内でメールアドレスが重複しています。"]})
+            continue
+        seen.add(data["email"].lower())
+        valid.append((index, data))
+
+    existing = _existing_emails(seen)
+    for index, data in valid:
+        if data["email"].lower() in existing:
+            result.add_error(index, DUPLICATE_EMAIL_ERROR)
+    return [(index, data) for index, data in valid if data["email"].lower() not in existing]
+
+
+def _write_entries(entries, result, notify=None):
+    """
+    (行番号, ユーザー, プロフィール) を chunk_size 件ごとのトランザクションで bulk_create する
+    （シャーディング有効時はシャードごと）。notify(users) は各チャンクの同じトランザクション内で呼ぶ。
+    """
+    chunk_size = getattr(settings, "BULK_SIGNUP_CHUNK_SIZE", 500)
+    for database, group in _by_database(entries, lambda entry: entry[1].email).items():
+        with use_shard(database):
+            for chunk in _chunks(group, chunk_size):
+                users = [user for _, user, _ in chunk]
+                _assign_ids(database, users)
+                try:
+                    with transaction.atomic(using=database):
+                        _insert_chunk(chunk, notify)
+                except IntegrityError:
+                    # 検証後に他のリクエストが同じメールで登録した場合など。
+                    # チャンク全体を巻き戻し、1 行ずつセーブポイント付きで登録し直す
+                    try:
+                        _insert_rows_one_by_one(chunk, notify, result, database)
+                    finally:
+                        # 登録できなかった行に採番した ID は UserDirectory から消す
+                        created = {entry["id"] for entry in result.created}
+                        release_ids([user.pk for user in users if user.pk not in created])
+                    continue
+                except BaseException:
+                    release_ids([user.pk for user in users])
+                    raise
+                for index, user, _ in chunk:
+                    result.created.append({"index": index, "id": user.pk, "email": user.email})
+
+
+def signup_account(request, data, profile_model, password_hash=None):
+    """
+    1 件のサインアップ。ユーザーと profile_model のプロフィール（USE_EMAIL_VERIFICATION のときは
+    有効化メールのアウトボックス行も）を 1 つのトランザクションで INSERT する。
+
+    - パスワードのハッシュ化はトランザクションの外で行う（書き込みロックを持ったまま計算しない）
+    - is_active・表示名は INSERT 前に決めておき、保存し直さない
+    - メールアドレスの重複は事前に SELECT せず、INSERT 時の一意制約（LOWER(email)）の違反で検出する
+    シャーディング無効時に発行する SQL は BEGIN・COMMIT と INSERT 2 文（有効化メールありは 3 文）だけ。
+
+    Args:
+        request: 有効化メールの URL 生成に使うリクエスト
+        data (dict): サインアップシリアライザの validated_data（email, password, プロフィールの項目）
+        profile_model: 作成するプロフィールのモデル
+        password_hash (str | None): ハッシュ化済みのパスワード（非同期ビューが amake_password で計算したもの）。
+            None なら data["password"] をここでハッシュ化する
+
+    Returns:
+        CustomUser: 作成されたユーザー
+
+    Raises:
+        IntegrityError: メールアドレスが登録済みの場合（大文字・小文字の違いを含む。is_duplicate_email() で判定する）
+            やその他の制約違反
+    """
+    use_verification = getattr(settings, "USE_EMAIL_VERIFICATION", False)
+    data = {**data, "email": User.objects.normalize_email(data["email"])}
+    if password_hash is None:
+        password_hash = get_hash_executor().make_password(data["password"])
+    user, profile = _build_account(data, password_hash, not use_verification, profile_model)
+
+    database = db_for_email(user.email)
+    notify = (lambda users: send_activation_emails(request, users)) if use_verification else None
+    with use_shard(database):
+        _assign_ids(database, [user])
+        try:
+            with transaction.atomic(using=database):
+                # bulk_create は post_save（表示名の再計算など）を送らない。表示名は _build_account で計算済み
+                _insert_chunk([(None, user, profile)], notify)
+        except BaseException:
+            # UserDirectory はシャードのトランザクションの外（default）なので、採番した ID を別に消す
+            release_ids([user.pk])
+            raise
+    return user
+
+
+def bulk_signup_employees(request, rows, serializer_class):
+    """
+    従業員をまとめて登録する。
+
+    1. 全行をシリアライザで検証し、メール重複（入力内・登録済み）をまとめて確認
+    2. 有効な行のパスワードをプロセスプールで並列ハッシュ化
+    3. BULK_SIGNUP_CHUNK_SIZE 件ごとのトランザクションで CustomUser と EmployeeProfile を bulk_create
+       （シャーディング有効時はシャードごと）
+
+    エラーのある行はスキップして行ごとのエラーとして返し、バッチ全体は中断しない。
+
+    Args:
+        request: 有効化メールの URL 生成に使うリクエスト
+        rows (list[dict]): EmployeeSignupSerializer 形式の入力のリスト
+        serializer_class: 1 行分の検証に使うシリアライザ
+
+    Returns:
+        BulkSignupResult: 作成されたユーザーと行ごとのエラー
+    """
+    result = BulkSignupResult()
+
+    # ① 検証（入力内・登録済みの重複もここで弾く）
+    valid = _validate_rows(enumerate(rows), serializer_class, result)
+
+    # ② パスワードの並列ハッシュ化
+    hashes = hash_passwords([data["password"] for _, data in valid])
+
+    # ③ チャンク単位で書き込み
+    use_verification = getattr(settings, "USE_EMAIL_VERIFICATION", False)
+    entries = [
+        (index, *_build_account(data, password_hash, not use_verification, EmployeeProfile))
+        for (index, data), password_hash in zip(valid, hashes)
+    ]
+    notify = (lambda users: send_activation_emails(request, users)) if use_verification else None
+    _write_entries(entries, result, notify)
+
+    result.errors.sort(key=lambda error: error["index"])
+    return result
+
+
+def import_accounts(rows, serializer_class, profile_model, is_active=True):
+    """
+    移行データ（import_accounts コマンドの 1 チャンク分）を登録する。
+
+    bulk_signup_employees と同じ手順で、任意のプロフィールモデルを作成する。
+    パスワードは平文（password、並列ハッシュ化する）か、ハッシュ済みの値（password_hash、そのまま保存）。
+    有効化メールは送らない。
+
+    Args:
+        rows (iterable[tuple[int, dict]]): (行番号, 入力) のリスト
+        serializer_class: 1 行分の検証に使うシリアライザ（accounts.api.serializers の *ImportSerializer）
+        profile_model: 作成するプロフィールのモデル
+        is_active (bool): 作成するユーザーを有効にするか
+
+    Returns:
+        BulkSignupResult: 作成されたユーザーと行ごとのエラー
+    """
+    result = BulkSignupResult()
+    valid = _validate_rows(rows, serializer_class, result)
+
+    plain = [data for _, data in valid if "password_hash" not in data]
+    for data, password_hash in zip(plain, hash_passwords([data["password"] for data in plain])):
+        data["password_hash"] = password_hash
+
+    entries = [
+        (index, *_build_account(data, data["password_hash"], is_active, profile_model))
+        for index, data in valid
+    ]
+    _write_entries(entries, result)
+    result.errors.sort(key=lambda error: error["index"])
+    return result
+
+
+def _insert_chunk(chunk, notify=None):
+    """1 チャンク分のユーザーとプロフィールを bulk_create する"""
+    users = User.objects.bulk_create([user for _, user, _ in chunk])
+
+    if any(user.pk is None for user in users):
+        # INSERT ... RETURNING に対応していない DB では主キーを引き直す
+        ids = dict(
+            User.objects.filter(email__in=[user.email for user in users]).values_list("email", "pk")
+        )
+        for user in users:
+            user.pk = ids[user.email]
+
+    profiles = []
+    for _, user, profile in chunk:
+        # _build_account の時点ではシャードが決まっていないので、保存先をユーザーに合わせる
+        profile._state.db = user._state.db
+        profile.user = user
+        profiles.append(profile)
+    type(profiles[0]).objects.bulk_create(profiles)
+    # bulk_create は post_save を送らないので、読み取りのプライマリへの固定もここで行う
+    pin_to_primary()
+
+    if notify is not None:
+        notify(users)
+
+
+def _insert_rows_one_by_one(chunk, notify, result, database=None):
+    """チャンクの一括登録に失敗したときのフォールバック（行ごとにエラーを記録）"""
+    for index, user, profile in chunk:
+        if database is None:
+            user.pk = None  # シャーディング時は採番済みの ID をそのまま使う
+        profile.pk = None
+        try:
+            with transaction.atomic(using=database):
+                user.save(using=database, force_insert=True)
+                profile._state.db = user._state.db
+                profile.user = user
+                profile.save()
+                if notify is not None:
+                    notify([user])
+        except IntegrityError as exc:
+            if not is_duplicate_email(exc):
+                raise
+            result.add_error(index, DUPLICATE_EMAIL_ERROR)
+        else:
+            result.created.append({"index": index, "id": user.pk, "email": user.email})
@@ -0,0 +1,37 @@
+# accounts/sqlite.py
+
+"""
+accounts.sqlite モジュール
+
+SQLite の接続ごとに SQLITE_PRAGMAS の PRAGMA を適用する connection_created フック。
+（journal_mode=WAL はデータベースファイルに記録されるが、synchronous や cache_size などは
+接続ごとの設定なので、新しい接続を開くたびに実行する必要がある）
+
+AccountsConfig.ready() で読み込まれる。SQLite 以外のデータベースでは何もしない。
+"""
+
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+
+
+def apply_pragmas(connection, pragmas):
+    """接続に PRAGMA をまとめて適用する"""
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if not _PRAGMA_NAME.match(name):
+                raise ValueError(f"不正な PRAGMA 名です: {name!r}")
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def _tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if pragmas:
+        apply_pragmas(connection, pragmas)
@@ -1,3 +1,1646 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, is_password_usable, make_password
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail, signing
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import get_connection
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import (
+    activation_service, admission, authentication, avatar_service, benchmarks, email_service, export_service, hashing,
+    idempotency, instrumentation, routers, search, session_service, sharding, signup_service, sqlite, token_service,
+    tokens,
+)
+from .api.pagination import EmployeeDirectoryPagination
+from .api.serializers import EmployeeSignupSerializer
+from .middleware import ReplicaPinningMiddleware
+from .models import AvatarImage, CustomerProfile, CustomUser, EmailOutbox, EmployeeProfile, SNSProfile, UserDirectory
+
+def requires_databases(*aliases):
+    """テスト用の設定（rest_template_backend.settings_test）で追加するデータベースを使うテスト"""
+    return skipUnless(
+        set(aliases) <= settings.DATABASES.keys(), "--settings=rest_template_backend.settings_test で実行してください"
+    )
+
+
+def configured_databases(*aliases):
+    """
+    default と aliases のうち設定にあるもの（テストの databases 用）。
+    テストランナーはスキップするテストの databases も確かめるので、ないデータベースは含めない
+    """
+    return {"default", *aliases} & settings.DATABASES.keys()
+
+
+FAST_HASHING = {
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    "PASSWORD_HASH_EXECUTOR": "accounts.hashing.InlineHashExecutor",
+}
+
+# SESSION_MODE ごとの SESSION_ENGINE（settings.py と同じ対応）
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=True, EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class EmailOutboxTests(TestCase):
+    """有効化メールのアウトボックス（accounts.email_service）と send_outbox_emails コマンド"""
+
+    def enqueue(self, count):
+        for number in range(count):
+            email_service.enqueue_email("件名", "本文", f"user{number}@example.com")
+
+    def test_outbox_row_is_rolled_back_with_signup(self):
+        def enqueue_then_fail(request, users):
+            email_service.send_activation_emails(request, users)
+            self.assertEqual(EmailOutbox.objects.count(), 1)  # 同じトランザクション内では見える
+            raise RuntimeError
+
+        with mock.patch("accounts.signup_service.send_activation_emails", side_effect=enqueue_then_fail):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    reverse("accounts:signup_customer"), {"email": "taro@example.com", "password": "pw-Strong-123"},
+                    content_type="application/json",
+                )
+        self.assertFalse(EmailOutbox.objects.exists())
+        self.assertFalse(CustomUser.objects.exists())
+
+    def test_worker_sends_batch_over_one_connection(self):
+        self.enqueue(3)
+        with mock.patch("accounts.email_service.get_connection", wraps=get_connection) as connect:
+            call_command("send_outbox_emails", "--once", stdout=StringIO())
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f"user{n}@example.com" for n in range(3)])
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 3)
+
+    @override_settings(EMAIL_OUTBOX_BACKOFF_SECONDS=30)
+    def test_failed_send_is_retried_with_backoff_then_marked_failed(self):
+        self.enqueue(1)
+        connection = get_connection()
+        with mock.patch.object(connection, "send_messages", side_effect=SMTPException("boom")):
+            with self.assertLogs("accounts.email_service", "WARNING"):
+                result = email_service.deliver_outbox_batch(max_attempts=2, connection=connection)
+        self.assertEqual((result.sent, result.retried), (0, 1))
+        row = EmailOutbox.objects.get()
+        self.assertEqual((row.status, row.attempts), (EmailOutbox.STATUS_PENDING, 1))
+        self.assertIn("boom", row.last_error)
+        self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+        # 再送時刻前は取り出さない
+        self.assertEqual(email_service.deliver_outbox_batch(max_attempts=2).claimed, 0)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        with mock.patch.object(connection, "send_messages", side_effect=SMTPException("boom")):
+            with self.assertLogs("accounts.email_service", "ERROR"):
+                result = email_service.deliver_outbox_batch(max_attempts=2, connection=connection)
+        self.assertEqual(result.failed, 1)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_FAILED)
+        self.assertEqual(mail.outbox, [])
+
+    def test_row_claimed_by_another_worker_is_not_sent_twice(self):
+        self.enqueue(1)
+        [claimed] = email_service._claim_batch(10)  # 別のワーカーが取得済み
+        self.assertEqual(email_service.deliver_outbox_batch().claimed, 0)
+
+        # ロック期限切れで取り直された後に、元のワーカーの遅れた書き込みが来ても上書きしない
+        EmailOutbox.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(email_service.deliver_outbox_batch().sent, 1)
+        result = email_service.OutboxDeliveryResult()
+        with self.assertLogs("accounts.email_service", "WARNING"):
+            email_service._schedule_retry(claimed, SMTPException("timeout"), 5, result)
+        self.assertEqual(result.retried, 0)
+        row = EmailOutbox.objects.get()
+        self.assertEqual((row.status, row.attempts), (EmailOutbox.STATUS_SENT, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False, BULK_SIGNUP_CHUNK_SIZE=2)
+class EmployeeBulkSignupTests(TestCase):
+    """従業員一括登録 API（signup_service.bulk_signup_employees）"""
+
+    client_class = APIClient
+
+    def setUp(self):
+        self.client.force_authenticate(CustomUser.objects.create_superuser("admin@example.com", "pw-Admin-123"))
+
+    def post(self, data, **kwargs):
+        return self.client.post(reverse("accounts:signup_employee_bulk"), data, format="json", **kwargs)
+
+    def test_rows_are_inserted_per_chunk_and_errors_reported_per_row(self):
+        CustomUser.objects.create_user("taken@example.com", "pw-Strong-123")
+        rows = [
+            {"email": f"emp{number}@example.com", "password": "pw-Strong-123", "department": "開発部"}
+            for number in range(5)
+        ]
+        rows += [
+            {"email": "EMP0@example.com", "password": "pw-Strong-123"},  # 入力内で重複
+            {"email": "Taken@example.com", "password": "pw-Strong-123"},  # 登録済み
+            {"email": "not-an-email", "password": "pw-Strong-123"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(rows)
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((body["created_count"], body["error_count"]), (5, 3))
+        self.assertEqual([error["index"] for error in body["errors"]], [5, 6, 7])
+        # 5 件を 2 件ずつのチャンク（3 回）で INSERT する
+        user_inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "accounts_customuser"')]
+        self.assertEqual(len(user_inserts), 3)
+        self.assertEqual(EmployeeProfile.objects.filter(department="開発部").count(), 5)
+
+    def test_ndjson_body_is_accepted(self):
+        body = "\n".join(
+            json.dumps({"email": f"emp{number}@example.com", "password": "pw-Strong-123"}) for number in range(3)
+        )
+        response = self.client.post(reverse("accounts:signup_employee_bulk"), body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created_count"], 3)
+
+    @override_settings(BULK_SIGNUP_MAX_ROWS=2)
+    def test_too_many_rows_are_rejected(self):
+        rows = [{"email": f"emp{number}@example.com", "password": "pw-Strong-123"} for number in range(3)]
+        self.assertEqual(self.post(rows).status_code, 400)
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_non_admin_is_forbidden(self):
+        self.client.force_authenticate(CustomUser.objects.create_user("user@example.com", "pw-Strong-123"))
+        self.assertEqual(self.post([]).status_code, 403)
+
+
+@override_settings(**FAST_HASHING)
+class HashExecutorTests(SimpleTestCase):
+    """パスワードのハッシュエグゼキュータ（accounts.hashing）"""
+
+    def test_inline_executor_hashes_and_rehashes_outdated_passwords(self):
+        executor = hashing.get_hash_executor()
+        encoded = executor.make_password("pw-Strong-123")
+        self.assertTrue(executor.check_password("pw-Strong-123", encoded))
+        self.assertFalse(executor.check_password("wrong", encoded))
+
+        setter = mock.Mock()
+        with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher", *FAST_HASHING["PASSWORD_HASHERS"]]):
+            self.assertTrue(hashing.get_hash_executor().check_password("pw-Strong-123", encoded, setter))
+        setter.assert_called_once_with("pw-Strong-123")
+
+    def test_hash_passwords_keeps_order_and_unusable_passwords(self):
+        hashes = hashing.hash_passwords(["a-Password-1", None, "b-Password-2"])
+        self.assertTrue(check_password("a-Password-1", hashes[0]))
+        self.assertFalse(is_password_usable(hashes[1]))
+        self.assertTrue(check_password("b-Password-2", hashes[2]))
+
+    @override_settings(PASSWORD_HASH_EXECUTOR="accounts.hashing.ProcessPoolHashExecutor", PASSWORD_HASH_WORKERS=2)
+    def test_process_pool_executor_matches_inline_results(self):
+        executor = hashing.get_hash_executor()
+        self.addCleanup(executor.shutdown)
+        passwords = [f"pw-Strong-{number}" for number in range(executor.threshold + 2)]
+        hashes = executor.make_passwords(passwords)
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+        self.assertTrue(executor.check_password(passwords[0], hashes[0]))
+        encoded = async_to_sync(executor.amake_password)("pw-Async-1")
+        self.assertTrue(async_to_sync(executor.acheck_password)("pw-Async-1", encoded))
+
+
+@override_settings(**FAST_HASHING)
+class TokenAuthCacheTests(TestCase):
+    """トークン認証キャッシュ（accounts.authentication.CachedTokenAuthentication）"""
+
+    def setUp(self):
+        authentication.reset_token_cache()
+        self.addCleanup(authentication.reset_token_cache)
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self):
+        return authentication.CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+    def me(self):
+        return self.client.get(reverse("accounts:me"), headers={"Authorization": f"Token {self.token.key}"})
+
+    def test_cached_token_is_resolved_without_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(authentication.get_token_cache_stats()["local_hits"], 1)
+
+    def test_logout_invalidates_cached_token(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.client.post(reverse("accounts:logout_api"), headers={"Authorization": f"Token {self.token.key}"})
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivating_user_invalidates_cache(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_bulk_update_is_invalidated_after_commit(self):
+        pending = CustomUser.objects.create_user("jiro@example.com", "pw-Strong-123", is_active=False)
+        with mock.patch("accounts.activation_service.invalidate_users") as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                activation_service.activate_pending_accounts()
+                invalidate.assert_not_called()  # コミット前には捨てない
+        invalidate.assert_called_once_with([pending.pk])
+
+        # QuerySet.update() で無効化したユーザーは invalidate_users() で捨てる
+        self.authenticate()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        authentication.invalidate_users([self.user.pk])
+        self.assertEqual(self.me().status_code, 401)
+
+
+@override_settings(**FAST_HASHING, AUTH_TOKEN_MODE="signed")
+class SignedTokenTests(TestCase):
+    """署名付きアクセストークン（accounts.tokens / SignedTokenAuthentication）"""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        cache_settings = {**settings.CACHES, "token_revocations": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location,
+        }}
+        self.enterContext(override_settings(CACHES=cache_settings))
+        authentication.reset_token_cache()
+        self.addCleanup(authentication.reset_token_cache)
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+
+    def login(self):
+        response = self.client.post(
+            reverse("accounts:login_api"), {"username": "taro@example.com", "password": "pw-Strong-123"},
+            content_type="application/json",
+        )
+        return response.json()["token"]
+
+    def me(self, token):
+        return self.client.get(reverse("accounts:me"), headers={"Authorization": f"Bearer {token}"})
+
+    def test_login_issues_token_verified_without_database(self):
+        token = self.login()
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(tokens.verify_access_token(token), self.user.pk)
+        self.assertEqual(self.me(token).status_code, 200)
+        with self.assertRaises(signing.BadSignature):
+            tokens.verify_access_token(token[:-2] + "xx")
+        with override_settings(SIGNED_TOKEN_MAX_AGE=-1), self.assertRaises(signing.SignatureExpired):
+            tokens.verify_access_token(token)
+
+    def test_logout_revokes_token_for_every_process(self):
+        token = self.login()
+        self.client.post(reverse("accounts:logout_api"), headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(self.me(token).status_code, 401)
+        # 別のプロセス（別のキャッシュ接続）からも失効が見える
+        other_process = caches.create_connection("token_revocations")
+        self.assertIsNotNone(other_process.get(tokens.REVOCATION_KEY_PREFIX + str(self.user.pk)))
+
+        # 失効後に発行したトークンは有効
+        with mock.patch("accounts.tokens._now_ms", return_value=tokens._now_ms() + 1):
+            self.assertEqual(self.me(self.login()).status_code, 200)
+
+    def test_deleted_user_is_rejected(self):
+        token = self.login()
+        self.assertEqual(self.me(token).status_code, 200)
+        self.user.delete()
+        self.assertEqual(self.me(token).status_code, 401)
+
+    def test_process_local_revocation_cache_fails_system_check(self):
+        self.assertEqual(tokens.check_revocation_cache(), [])
+        with override_settings(SIGNED_TOKEN_REVOCATION_CACHE="default"):
+            self.assertEqual([error.id for error in tokens.check_revocation_cache()], ["accounts.E001"])
+
+
+@override_settings(**FAST_HASHING)
+class DisplayNameTests(TestCase):
+    """プロフィールの一括取得（with_profiles）と表示名（display_name）の同期"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123")
+
+    def test_display_name_follows_profile_priority(self):
+        self.assertEqual(self.user.get_display_name(), "taro@example.com")
+        CustomerProfile.objects.create(user=self.user, firstname="太郎", lastname="山田")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, "太郎 山田")
+
+        sns = SNSProfile.objects.create(user=self.user, nickname="たろう")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, "たろう")
+
+        sns.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, "太郎 山田")
+
+    def test_with_profiles_loads_all_profiles_in_one_query(self):
+        EmployeeProfile.objects.create(user=self.user, firstname="太郎", lastname="山田", department="開発部")
+        with self.assertNumQueries(1):
+            user = CustomUser.objects.with_profiles().get(pk=self.user.pk)
+            self.assertEqual(user.employee_profile.department, "開発部")
+            self.assertIsNone(getattr(user, "sns_profile", None))
+            self.assertEqual(user.compute_display_name(), "太郎 山田")
+
+    def test_profile_str_does_not_query(self):
+        profile = EmployeeProfile.objects.create(user=self.user, firstname="太郎", lastname="山田")
+        profile = EmployeeProfile.objects.select_related("user").get(pk=profile.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(profile), "太郎 山田（部署未設定）")
+
+    def test_unrelated_profile_update_skips_recompute(self):
+        profile = SNSProfile.objects.create(user=self.user, nickname="たろう")
+        with self.assertNumQueries(1):  # UPDATE のみ（表示名は再計算しない）
+            profile.bio = "よろしく"
+            profile.save(update_fields=["bio"])
+
+
+@override_settings(**FAST_HASHING)
+class AccountActivationTests(TestCase):
+    """有効化リンク（accounts.activation_service / accounts.tokens.ActivationTokenGenerator）"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123")
+
+    def activate(self, token=None):
+        uidb64 = urlsafe_base64_encode(force_bytes(self.user.pk))
+        token = token or tokens.make_activation_token(self.user)
+        return self.client.get(reverse("accounts:activate", kwargs={"uidb64": uidb64, "token": token}))
+
+    def test_link_activates_once(self):
+        token = tokens.make_activation_token(self.user)
+        with self.assertNumQueries(2):  # 検証用の SELECT, 条件付き UPDATE
+            self.assertEqual(self.activate(token).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        response = self.activate(token)
+        self.assertEqual((response.status_code, response.json()["detail"]), (200, "アカウントは既に有効化されています。"))
+
+    @override_settings(USE_EMAIL_VERIFICATION=True)
+    def test_link_in_signup_email_activates_account(self):
+        self.client.post(
+            reverse("accounts:signup_customer"), {"email": "jiro@example.com", "password": "pw-Strong-123"},
+            content_type="application/json",
+        )
+        link = EmailOutbox.objects.get(recipient="jiro@example.com").body.split("testserver", 1)[1]
+        self.assertEqual(self.client.get(link).status_code, 200)
+        self.assertTrue(CustomUser.objects.get(email="jiro@example.com").is_active)
+
+    def test_link_dies_after_password_change(self):
+        token = tokens.make_activation_token(self.user)
+        self.user.set_password("other-Pw-999")
+        self.user.save()
+        self.assertEqual(self.activate(token).status_code, 400)
+        self.assertFalse(CustomUser.objects.get(pk=self.user.pk).is_active)
+
+    def test_link_does_not_reactivate_deactivated_account(self):
+        token = tokens.make_activation_token(self.user)
+        CustomUser.objects.filter(pk=self.user.pk).update(last_login=timezone.now())  # 管理者が無効化したアカウント
+        self.assertEqual(self.activate(token).status_code, 400)
+
+    @override_settings(PASSWORD_RESET_TIMEOUT=-1)
+    def test_expired_or_forged_link_is_invalid(self):
+        self.assertEqual(self.activate().status_code, 400)
+        with override_settings(PASSWORD_RESET_TIMEOUT=3600):
+            self.assertEqual(self.activate("abc-123").status_code, 400)
+
+    def test_bulk_activation_and_expiry_skip_logged_in_accounts(self):
+        old = CustomUser.objects.create_user("old@example.com", "pw-Strong-123", date_joined=timezone.now() - timedelta(days=10))
+        CustomUser.objects.create_user("disabled@example.com", "pw-Strong-123", last_login=timezone.now(), date_joined=old.date_joined)
+        self.assertEqual(activation_service.expire_pending_accounts(timezone.now() - timedelta(days=7), chunk_size=1), 1)
+        self.assertFalse(CustomUser.objects.filter(pk=old.pk).exists())
+        self.assertEqual(activation_service.activate_pending_accounts(chunk_size=1), 1)
+        self.assertEqual(list(CustomUser.objects.filter(is_active=False).values_list("email", flat=True)), ["disabled@example.com"])
+
+
+# 非同期ビュー（ACCOUNTS_API_ASYNC=True の URLconf）のテスト用
+urlpatterns = [path("api/accounts/", include("accounts.api.async_urls"))]
+
+
+@override_settings(**FAST_HASHING, ROOT_URLCONF=__name__, USE_EMAIL_VERIFICATION=False)
+class AsyncViewTests(TestCase):
+    """非同期版のサインアップ・ログイン・ログアウト・エクスポート（accounts.api.async_views）"""
+
+    body = {"email": "taro@example.com", "password": "pw-Strong-123"}
+
+    async def post(self, name, data, **kwargs):
+        return await self.async_client.post(reverse(f"accounts:{name}"), data, content_type="application/json", **kwargs)
+
+    async def test_signup_login_logout(self):
+        response = await self.post("signup_sns", {**self.body, "nickname": "たろう"})
+        self.assertEqual(response.status_code, 201)
+        user = await CustomUser.objects.select_related("sns_profile").aget(email="taro@example.com")
+        self.assertEqual((user.sns_profile.nickname, user.display_name), ("たろう", "たろう"))
+
+        wrong = await self.post("login_api", {"username": "taro@example.com", "password": "wrong"})
+        self.assertEqual(wrong.status_code, 400)
+        token = (await self.post("login_api", {"username": "Taro@Example.com", "password": "pw-Strong-123"})).json()["token"]
+        headers = {"Authorization": f"Token {token}"}
+        self.assertEqual((await self.async_client.get(reverse("accounts:me"), headers=headers)).status_code, 200)
+
+        self.assertEqual((await self.post("logout_api", {}, headers=headers)).status_code, 200)
+        self.assertFalse(await Token.objects.filter(key=token).aexists())
+        self.assertEqual((await self.post("logout_api", {}, headers=headers)).status_code, 401)
+
+    async def test_malformed_body_is_rejected(self):
+        response = await self.async_client.post(reverse("accounts:signup_customer"), "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_export_streams_for_staff_only(self):
+        admin = await CustomUser.objects.acreate(email="admin@example.com", is_active=True, is_staff=True)
+        user_token = await Token.objects.acreate(user=await CustomUser.objects.acreate(email="user@example.com", is_active=True))
+        admin_token = await Token.objects.acreate(user=admin)
+        url = reverse("accounts:user_export") + "?output=ndjson"
+
+        response = await self.async_client.get(url, headers={"Authorization": f"Token {user_token.key}"})
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(url, headers={"Authorization": f"Token {admin_token.key}"})
+        self.assertEqual(response.status_code, 200)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(sorted(row["email"] for row in rows), ["admin@example.com", "user@example.com"])
+
+
+class BenchmarkHelperTests(TestCase):
+    """bench_* 管理コマンドの集計・比較ヘルパー（accounts.benchmarks）"""
+
+    def test_summarize(self):
+        latencies = [i / 1000 for i in range(1, 101)]
+        summary = benchmarks.summarize(latencies, elapsed=2.0)
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["throughput"], 50.0)
+        self.assertAlmostEqual(summary["mean_ms"], 50.5)
+        self.assertAlmostEqual(summary["p50_ms"], 50.0)
+        self.assertAlmostEqual(summary["p95_ms"], 95.0)
+        self.assertAlmostEqual(summary["p99_ms"], 99.0)
+        self.assertEqual(benchmarks.summarize([], 0)["throughput"], 0.0)
+
+    def test_compare_results(self):
+        baseline = {"login": {"p95_ms": 10.0, "queries": 3}, "me": {"p95_ms": 2.0, "queries": 1}}
+        current = {
+            "login": {"p95_ms": 11.9, "queries": 4},
+            "me": {"p95_ms": 2.5, "queries": 1},
+            "new": {"p95_ms": 99.0, "queries": 9},
+        }
+        self.assertEqual(
+            benchmarks.compare_results(baseline, current, tolerance=0.2),
+            ["login.queries: 3 → 4", "me.p95_ms: 2.00 → 2.50"],
+        )
+
+    def test_query_counter(self):
+        with benchmarks.QueryCounter() as counter:
+            CustomUser.objects.count()
+            CustomUser.objects.exists()
+        self.assertEqual(counter.count, 2)
+
+    def test_run_concurrently_reraises_worker_errors(self):
+        def func(i):
+            if i == 3:
+                raise ValueError(i)
+
+        with self.assertRaises(ValueError):
+            benchmarks.run_concurrently(func, total=5, threads=2)
+        latencies, elapsed = benchmarks.run_concurrently(lambda i: None, total=5, threads=2)
+        self.assertEqual(len(latencies), 5)
+        self.assertGreaterEqual(elapsed, sum(latencies))
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False, REQUEST_TIMING_SAMPLE_RATE=1.0)
+class RequestTimingTests(TestCase):
+    """RequestTimingMiddleware の Server-Timing ヘッダーと構造化ログ（accounts.instrumentation）"""
+
+    body = {"email": "taro@example.com", "password": "pw-Strong-123", "nickname": "たろう"}
+
+    def test_signup_reports_queries_and_hash_span(self):
+        with self.assertLogs("accounts.timing", "INFO") as logs:
+            response = self.client.post(reverse("accounts:signup_sns"), self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        entries = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertEqual(set(entries), {"total", "db", "hash"})
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record["method"], record["path"], record["status"]), ("POST", reverse("accounts:signup_sns"), 201))
+        self.assertGreater(record["queries"], 0)
+        self.assertIn(f'"{record["queries"]} queries"', entries["db"])
+        self.assertEqual(set(record["spans"]), {"hash"})
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.post(reverse("accounts:signup_sns"), self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_async_view_is_measured(self):
+        response = await self.async_client.post(reverse("accounts:signup_sns"), self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("hash;dur=", response["Server-Timing"])
+
+    def test_nested_spans_are_counted_once(self):
+        metrics, token = instrumentation.start_request()
+        with instrumentation.span("hash"), instrumentation.span("hash"):
+            CustomUser.objects.exists()
+        instrumentation.finish_request(metrics, token)
+        self.assertEqual((metrics.queries, dict(metrics.span_counts)), (1, {"hash": 1}))
+        # 計測の終了後は加算しない
+        with instrumentation.span("hash"):
+            CustomUser.objects.exists()
+        self.assertEqual((metrics.queries, dict(metrics.span_counts)), (1, {"hash": 1}))
+
+
+class SQLitePragmaTests(TestCase):
+    """接続ごとの PRAGMA の適用（accounts.sqlite）"""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_is_tuned(self):
+        if connection.vendor != "sqlite" or not settings.SQLITE_PRAGMAS:
+            self.skipTest("SQLite の PRAGMA が設定されていない")
+        # synchronous=NORMAL は 1、temp_store=MEMORY は 2
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("temp_store"), 2)
+
+    def test_apply_pragmas(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite 以外")
+        self.addCleanup(sqlite.apply_pragmas, connection, {"cache_size": self.pragma("cache_size")})
+        sqlite.apply_pragmas(connection, {"cache_size": -4000})
+        self.assertEqual(self.pragma("cache_size"), -4000)
+        with self.assertRaises(ValueError):
+            sqlite.apply_pragmas(connection, {"cache_size = 0; DROP TABLE x; --": 1})
+
+
+@requires_databases("replica")
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False, REPLICA_DATABASES=["replica"])
+class PrimaryReplicaRouterTests(TestCase):
+    """
+    読み取りレプリカへの振り分け（accounts.routers.PrimaryReplicaRouter）。
+    テスト用の replica は複製されないので、プライマリにしかない行はレプリカから読めない。
+    """
+
+    databases = configured_databases("replica")
+    body = {"email": "taro@example.com", "password": "pw-Strong-123", "nickname": "たろう"}
+
+    def setUp(self):
+        self.enterContext(routers.primary_pin_scope())
+        caches["default"].clear()
+
+    def exists_on_read(self):
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            exists = CustomUser.objects.filter(email="taro@example.com").exists()
+        return exists, len(replica_queries)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        with routers.primary_pin_scope():
+            CustomUser.objects.create_user("taro@example.com", "pw")
+        self.assertEqual(self.exists_on_read(), (False, 1))
+        self.assertTrue(CustomUser.objects.using("default").filter(email="taro@example.com").exists())
+        # ルーターは振り分けるだけで、固定（状態の変更）はしない
+        router = routers.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_write(CustomUser), "default")
+        self.assertIsNone(router.db_for_write(EmailOutbox))
+        self.assertFalse(routers.is_pinned_to_primary())
+
+    def test_reads_after_write_are_pinned_to_primary(self):
+        CustomUser.objects.create_user("taro@example.com", "pw")
+        self.assertEqual(self.exists_on_read(), (True, 0))
+        later = time.monotonic() + settings.REPLICA_PIN_SECONDS + 1
+        with mock.patch("accounts.routers.time.monotonic", return_value=later):
+            self.assertEqual(self.exists_on_read(), (False, 1))
+
+    @override_settings(AUTH_TOKEN_TTL_MODE="sliding")
+    def test_queryset_update_pins_to_primary(self):
+        with routers.primary_pin_scope():
+            token = Token.objects.create(user=CustomUser.objects.create_user("taro@example.com", "pw"))
+        token.created -= timedelta(hours=1)
+        token_service.refresh_token_expiry(token)
+        self.assertTrue(routers.is_pinned_to_primary())
+
+    def test_pin_carries_over_to_the_next_request(self):
+        response = self.client.post(reverse("accounts:signup_sns"), self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+        login = {"username": "taro@example.com", "password": "pw-Strong-123"}
+        self.assertEqual(self.client.post(reverse("accounts:login_api"), login).status_code, 200)
+
+        # Cookie を送らないクライアントは、REPLICA_PIN_CACHE がなければ引き継がない（接続元 IP は見ない）
+        self.assertEqual(self.client_class().post(reverse("accounts:login_api"), login).status_code, 400)
+
+    @override_settings(REPLICA_PIN_CACHE="default")
+    def test_pin_carries_over_by_authorization_header(self):
+        # 認証クラスが扱わない形式の Authorization（API ゲートウェイのクライアント ID など）
+        client = self.client_class(headers={"Authorization": "Client app-1"})
+        response = client.post(reverse("accounts:signup_sns"), self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        # Cookie を送らなくても、同じ Authorization ならキャッシュの印でプライマリから読む
+        login = {"username": "taro@example.com", "password": "pw-Strong-123"}
+        self.assertEqual(
+            self.client_class(headers={"Authorization": "Client app-1"}).post(reverse("accounts:login_api"), login).status_code,
+            200,
+        )
+        # 同じ接続元でも、別のクライアントには引き継がない
+        self.assertEqual(
+            self.client_class(headers={"Authorization": "Client app-2"}).post(reverse("accounts:login_api"), login).status_code,
+            400,
+        )
+        self.assertEqual(self.client_class().post(reverse("accounts:login_api"), login).status_code, 400)
+
+
+SHARDED = {"USER_SHARDS": ["shard1", "shard2"], "AUTHENTICATION_BACKENDS": ["accounts.backends.ShardedModelBackend"]}
+
+
+def email_on(shard, prefix="user"):
+    """shard に置かれるメールアドレス"""
+    return next(
+        email for email in (f"{prefix}{i}@example.com" for i in range(100)) if sharding.shard_for_email(email) == shard
+    )
+
+
+@requires_databases("shard1", "shard2")
+@override_settings(**FAST_HASHING, **SHARDED, USE_EMAIL_VERIFICATION=False)
+class ShardingTests(TestCase):
+    """ユーザーのシャーディング（accounts.sharding / accounts.routers.UserShardRouter）"""
+
+    databases = configured_databases("shard1", "shard2")
+    password = "pw-Strong-123"
+
+    def setUp(self):
+        self.enterContext(sharding.shard_scope())
+
+    def signup(self, email):
+        return self.client.post(
+            reverse("accounts:signup_sns"), {"email": email, "password": self.password, "nickname": "n"},
+            content_type="application/json",
+        )
+
+    def test_rendezvous_placement(self):
+        emails = [f"user{i}@example.com" for i in range(200)]
+        placement = {email: sharding.shard_for_email(email) for email in emails}
+        self.assertEqual(set(placement.values()), {"shard1", "shard2"})
+        self.assertEqual(sharding.shard_for_email("USER1@Example.com"), placement["user1@example.com"])
+        # シャードを追加しても、移動するのは新しいシャードへ移るユーザーだけ
+        with override_settings(USER_SHARDS=["shard1", "shard2", "shard3"]):
+            moved = {email for email in emails if sharding.shard_for_email(email) != placement[email]}
+            self.assertTrue(moved)
+            self.assertEqual({sharding.shard_for_email(email) for email in moved}, {"shard3"})
+
+    def test_signup_login_and_token_auth_across_shards(self):
+        ids = set()
+        for shard in ("shard1", "shard2"):
+            email = email_on(shard)
+            self.assertEqual(self.signup(email).status_code, 201)
+            user = CustomUser.objects.using(shard).get(email=email)
+            self.assertFalse(CustomUser.objects.using("shard1" if shard == "shard2" else "shard2").filter(email=email).exists())
+            self.assertEqual(UserDirectory.objects.get(pk=user.pk).shard, shard)
+            ids.add(user.pk)
+
+            with sharding.shard_scope():
+                response = self.client.post(reverse("accounts:login_api"), {"username": email.upper(), "password": self.password})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(Token.objects.using(shard).filter(user_id=user.pk).exists())
+            with sharding.shard_scope():
+                me = self.client.get(reverse("accounts:me"), headers={"Authorization": f"Token {response.json()['token']}"})
+            self.assertEqual((me.status_code, me.json()["email"]), (200, email))
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(UserDirectory.objects.count(), 2)
+
+    def test_failed_signup_releases_directory_id(self):
+        email = email_on("shard2")
+        self.assertEqual(self.signup(email).status_code, 201)
+        self.assertEqual(self.signup(email.upper()).status_code, 400)
+        self.assertEqual(UserDirectory.objects.count(), 1)
+
+        with mock.patch("accounts.signup_service._insert_chunk", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self.signup(email_on("shard1"))
+        self.assertEqual(UserDirectory.objects.count(), 1)
+
+    def test_bulk_signup_fallback_releases_directory_ids(self):
+        existing = email_on("shard1", "dup")
+        self.assertEqual(self.signup(existing).status_code, 201)
+        rows = [{"email": email, "password": self.password, "firstname": "f", "lastname": "l"} for email in (existing, email_on("shard1", "new"))]
+        # 検証後に同じメールアドレスが登録された場合（一意制約違反 → 1 行ずつ登録し直す）
+        with mock.patch("accounts.signup_service._existing_emails", return_value=set()):
+            result = signup_service.bulk_signup_employees(None, rows, EmployeeSignupSerializer)
+        self.assertEqual([error["index"] for error in result.errors], [0])
+        self.assertEqual(len(result.created), 1)
+        self.assertEqual(
+            set(UserDirectory.objects.values_list("pk", flat=True)),
+            set(CustomUser.objects.using("shard1").values_list("pk", flat=True)),
+        )
+
+    def test_rebalance_moves_users_to_their_shard(self):
+        emails = [email_on("shard1"), email_on("shard2")]
+        with override_settings(USER_SHARDS=["shard1"]):
+            for email in emails:
+                self.assertEqual(self.signup(email).status_code, 201)
+        self.assertEqual(CustomUser.objects.using("shard1").count(), 2)
+
+        out = StringIO()
+        call_command("rebalance_user_shards", stdout=out)
+        self.assertIn("移動: 1 件", out.getvalue())
+        moved = CustomUser.objects.using("shard2").select_related("sns_profile").get(email=emails[1])
+        self.assertEqual(moved.sns_profile.nickname, "n")
+        self.assertFalse(CustomUser.objects.using("shard1").filter(email=emails[1]).exists())
+        self.assertEqual(UserDirectory.objects.get(pk=moved.pk).shard, "shard2")
+        response = self.client.post(reverse("accounts:login_api"), {"username": emails[1], "password": self.password})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(USER_SHARDS=[], AUTHENTICATION_BACKENDS=["django.contrib.auth.backends.ModelBackend"])
+    def test_unsharded_fallback(self):
+        self.assertIsNone(sharding.db_for_email("taro@example.com"))
+        self.assertEqual(self.signup("taro@example.com").status_code, 201)
+        self.assertTrue(CustomUser.objects.using("default").filter(email="taro@example.com").exists())
+        self.assertFalse(UserDirectory.objects.exists())
+        response = self.client.post(reverse("accounts:login_api"), {"username": "taro@example.com", "password": self.password})
+        self.assertEqual(response.status_code, 200)
+
+
+class EmployeeDirectoryTests(TestCase):
+    """従業員名簿 API のキーセットページネーション（accounts.api.pagination）"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(email="admin@example.com", is_active=True, is_staff=True)
+        hire_dates = [None, "2024-04-01", "2024-04-01", "2023-10-01", None, "2025-01-15", "2024-04-01"]
+        for i, hire_date in enumerate(hire_dates):
+            EmployeeProfile.objects.create(
+                user=CustomUser.objects.create(email=f"emp{i}@example.com", is_active=True),
+                lastname="山田" if i % 2 else "佐藤", firstname=f"{i}", hire_date=hire_date,
+                department="開発部" if i < 5 else "営業部", position="主任" if i % 3 == 0 else None,
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def walk(self, **params):
+        """next をたどって全ページの結果を集める"""
+        url, rows = reverse("accounts:employee_directory"), []
+        response = self.client.get(url, {"limit": 2, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            rows += response.data["results"]
+            if response.data["next"] is None:
+                return rows
+            response = self.client.get(response.data["next"])
+
+    def expected(self, ordering, **filters):
+        """NULL を先頭にした並び順（EmployeeDirectoryPagination.orderings）の user_id"""
+        profiles = list(EmployeeProfile.objects.filter(**filters))
+        if ordering == "name":
+            profiles.sort(key=lambda p: (p.lastname, p.firstname, p.user_id))
+        else:
+            profiles.sort(key=lambda p: (p.hire_date is not None, p.hire_date or date.min, p.user_id), reverse=ordering.startswith("-"))
+            profiles.sort(key=lambda p: p.hire_date is not None)  # 降順でも NULL は先頭
+        return [p.user_id for p in profiles]
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for ordering in ("name", "hire_date", "-hire_date"):
+            with self.subTest(ordering=ordering):
+                rows = self.walk(ordering=ordering)
+                self.assertEqual([row["user_id"] for row in rows], self.expected(ordering))
+
+        rows = self.walk(ordering="-hire_date", department="開発部", hired_from="2024-01-01")
+        self.assertEqual(
+            [row["user_id"] for row in rows],
+            self.expected("-hire_date", department="開発部", hire_date__gte="2024-01-01"),
+        )
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse("accounts:employee_directory"), {"fields": "user_id,email", "limit": 1})
+        self.assertEqual(list(response.data["results"][0]), ["user_id", "email"])
+
+    def test_invalid_requests(self):
+        url = reverse("accounts:employee_directory")
+        self.assertEqual(self.client.get(url, {"ordering": "email"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "not-a-cursor"}).status_code, 404)
+        cursor = self.client.get(url, {"limit": 1}).data["next"].split("cursor=")[1]
+        self.assertEqual(self.client.get(url, {"cursor": cursor, "ordering": "hire_date"}).status_code, 404)
+        self.client.force_authenticate(CustomUser.objects.get(email="emp0@example.com"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_filter_and_ordering_use_an_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite の実行計画で確認する")
+        url = reverse("accounts:employee_directory")
+        for column in ("department", "position"):
+            for ordering in EmployeeDirectoryPagination.orderings:
+                with self.subTest(column=column, ordering=ordering):
+                    with CaptureQueriesContext(connection) as queries:
+                        self.client.get(url, {column: "開発部", "ordering": ordering, "limit": 1})
+                    sql = next(query["sql"] for query in queries if "accounts_employeeprofile" in query["sql"])
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                        plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+                    self.assertRegex(plan, rf"USING (COVERING )?INDEX employee_\w+ \({column}=\?")
+                    self.assertNotIn("TEMP B-TREE", plan)
+
+
+class ProfileSearchTests(TestCase):
+    """プロフィールの全文検索（accounts.search、FTS5 の索引とトリガー）"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(email="admin@example.com", is_active=True, is_staff=True)
+        for i, (lastname, qualifications) in enumerate([
+            ("山田", "基本情報技術者, 応用情報技術者"),
+            ("山本", "Python 3 エンジニア認定"),
+            ("田中", "応用情報技術者"),
+        ]):
+            EmployeeProfile.objects.create(
+                user=CustomUser.objects.create(email=f"emp{i}@example.com", is_active=True),
+                lastname=lastname, firstname="太郎", qualifications=qualifications,
+            )
+
+    def search(self, query, kind="employee"):
+        return [profile.user.email for profile in search.search_profiles(kind, query, limit=10)]
+
+    def test_terms_are_anded_and_case_insensitive(self):
+        self.assertEqual(sorted(self.search("応用情報")), ["emp0@example.com", "emp2@example.com"])
+        self.assertEqual(self.search("応用情報 山田"), ["emp0@example.com"])  # 2 文字の語は LIKE で絞り込む
+        self.assertEqual(self.search("PYTHON"), ["emp1@example.com"])
+        self.assertEqual(self.search("山"), ["emp0@example.com", "emp1@example.com"])
+        self.assertEqual(self.search('"応用 OR * NEAR('), [])  # FTS5 の構文としては解釈しない
+
+    def test_triggers_follow_writes(self):
+        profile = EmployeeProfile.objects.get(lastname="田中")
+        profile.qualifications = "データベーススペシャリスト"
+        profile.save()
+        self.assertEqual(self.search("スペシャリスト"), ["emp2@example.com"])
+        EmployeeProfile.objects.filter(pk=profile.pk).update(lastname="鈴木")
+        self.assertEqual(self.search("鈴木 スペシャリスト"), ["emp2@example.com"])
+        CustomUser.objects.filter(email="emp2@example.com").delete()  # プロフィールは連鎖削除
+        self.assertEqual(self.search("スペシャリスト"), [])
+
+        user = CustomUser.objects.create(email="sns@example.com", is_active=True)
+        SNSProfile.objects.bulk_create([SNSProfile(user=user, nickname="たろう", bio="写真とカメラが好き")])
+        self.assertEqual(self.search("カメラが", "sns"), ["sns@example.com"])
+
+    def test_rebuild_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO accounts_employeeprofile_search(accounts_employeeprofile_search) VALUES ('delete-all')")
+        self.assertEqual(self.search("情報技術者"), [])
+        out = StringIO()
+        call_command("rebuild_search_index", "--type", "employee", "--chunk-size", "2", stdout=out)
+        self.assertIn("3 件", out.getvalue())
+        self.assertEqual(sorted(self.search("情報技術者")), ["emp0@example.com", "emp2@example.com"])
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_api_pages_and_permissions(self):
+        url = reverse("accounts:profile_search")
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(url, {"q": "太郎", "limit": 1})
+        self.assertEqual(len(response.data["results"]), 1)
+        response = self.client.get(response.data["next"])
+        self.assertEqual((len(response.data["results"]), response.data["next"]), (1, None))
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+        self.client.force_authenticate(CustomUser.objects.get(email="emp0@example.com"))
+        self.assertEqual(self.client.get(url, {"q": "太郎"}).status_code, 403)
+
+
+def png_file(name="avatar.png", size=(120, 80), color="red"):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class AvatarTests(TestCase):
+    """アバター画像のアップロードと縮小版の生成（accounts.avatar_service）"""
+
+    client_class = APIClient
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, AVATAR_VARIANT_SIZES=(64, 256)))
+        self.users = []
+        for i in range(2):
+            user = CustomUser.objects.create(email=f"sns{i}@example.com", is_active=True)
+            SNSProfile.objects.create(user=user, nickname=f"n{i}")
+            self.users.append(user)
+        self.client.force_authenticate(self.users[0])
+
+    def upload(self, file, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        return self.client.put(reverse("accounts:avatar"), {"avatar": file}, format="multipart")
+
+    def test_same_image_is_stored_once(self):
+        first = self.upload(png_file("a.png"))
+        self.assertEqual(first.status_code, 200)
+        second = self.upload(png_file("b.png"), user=self.users[1])
+        self.assertEqual(second.status_code, 200)
+
+        image = AvatarImage.objects.get()
+        self.assertEqual((image.width, image.height, image.status), (120, 80, AvatarImage.STATUS_PENDING))
+        self.assertEqual(image.original, f"avatars/{image.sha256[:2]}/{image.sha256}.png")
+        self.assertTrue(default_storage.exists(image.original))
+        self.assertEqual(len(os.listdir(default_storage.path(os.path.dirname(image.original)))), 1)
+        self.assertEqual(
+            set(SNSProfile.objects.values_list("avatar", flat=True)), {image.original}
+        )
+        self.assertEqual(second.data["avatar"]["variants"], {})
+
+    def test_variants_are_generated_by_the_worker(self):
+        self.upload(png_file())
+        result = avatar_service.process_avatar_batch()
+        self.assertEqual((result.claimed, result.ready), (1, 1))
+
+        image = AvatarImage.objects.get()
+        self.assertEqual(image.status, AvatarImage.STATUS_READY)
+        profile = SNSProfile.objects.get(user=self.users[0])
+        self.assertEqual(profile.avatar_variants, image.variants)
+        from PIL import Image
+
+        for size, edge in (("64", 64), ("256", 80)):  # 元画像より大きくはしない
+            with default_storage.open(image.variants[size], "rb") as file, Image.open(file) as variant:
+                self.assertEqual((variant.format, variant.size), ("WEBP", (edge, edge)))
+
+        # 生成済みの画像を使うプロフィールには最初から縮小版を返す
+        response = self.upload(png_file(), user=self.users[1])
+        self.assertEqual(set(response.data["avatar"]["variants"]), {"64", "256"})
+        self.assertEqual(avatar_service.process_avatar_batch().claimed, 0)
+
+    def test_failed_generation_is_retried_then_given_up(self):
+        self.upload(png_file())
+        with mock.patch("accounts.avatar_service.generate_variants", side_effect=OSError("broken")):
+            with self.assertLogs("accounts.avatar_service", "WARNING"):
+                self.assertEqual(avatar_service.process_avatar_batch(max_attempts=2).retried, 1)
+            image = AvatarImage.objects.get()
+            self.assertEqual((image.status, image.attempts), (AvatarImage.STATUS_PENDING, 1))
+            self.assertGreater(image.next_attempt_at, timezone.now())
+            self.assertEqual(avatar_service.process_avatar_batch().claimed, 0)  # バックオフ中
+
+            AvatarImage.objects.update(next_attempt_at=timezone.now())
+            with self.assertLogs("accounts.avatar_service", "ERROR"):
+                self.assertEqual(avatar_service.process_avatar_batch(max_attempts=2).failed, 1)
+        image.refresh_from_db()
+        self.assertEqual((image.status, image.last_error), (AvatarImage.STATUS_FAILED, "OSError: broken"))
+
+    def test_invalid_uploads(self):
+        text = SimpleUploadedFile("a.png", b"not an image", content_type="image/png")
+        self.assertEqual(self.upload(text).status_code, 400)
+        with override_settings(AVATAR_MAX_PIXELS=100):
+            self.assertEqual(self.upload(png_file()).status_code, 400)
+        with override_settings(AVATAR_MAX_UPLOAD_SIZE=100):
+            self.assertEqual(self.upload(png_file(size=(400, 400))).status_code, 413)
+        self.assertFalse(AvatarImage.objects.exists())
+
+    def test_clear_avatar(self):
+        self.upload(png_file())
+        self.assertEqual(self.client.delete(reverse("accounts:avatar")).status_code, 204)
+        profile = SNSProfile.objects.get(user=self.users[0])
+        self.assertFalse(profile.avatar)
+        self.assertEqual(profile.avatar_variants, {})
+        self.assertTrue(default_storage.exists(AvatarImage.objects.get().original))  # 共有の可能性があるので残す
+
+
+@override_settings(**FAST_HASHING)
+class ImportAccountsTests(TestCase):
+    """移行データの一括登録（import_accounts コマンド）"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        call_command("import_accounts", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_rows_are_created_or_reported(self):
+        CustomUser.objects.create_user("taken@example.com", "pw")
+        hashed = make_password("hashed-pw")
+        path = self.write("customers.csv", "\n".join([
+            "email,password,password_hash,lastname,firstname,phone_number",
+            "a@example.com,pw-Strong-123,,山田,太郎,",
+            f"b@example.com,,{hashed},,,090-0000-0000",
+            "A@Example.com,pw-Strong-123,,,,",  # ファイル内の重複
+            "TAKEN@example.com,pw-Strong-123,,,,",  # 登録済み
+            "not-an-email,pw-Strong-123,,,,",
+            "c@example.com,,,,,",  # パスワードなし
+        ]) + "\n")
+        errors = os.path.join(self.tmpdir, "errors.ndjson")
+        output = self.run_import(path, "--type", "customer", "--chunk-size", "2", "--errors", errors)
+        self.assertIn("作成 2 件 / エラー 4 件", output)
+
+        a = CustomUser.objects.select_related("customer_profile").get(email="a@example.com")
+        self.assertTrue(a.is_active)
+        self.assertTrue(a.check_password("pw-Strong-123"))
+        self.assertEqual((a.customer_profile.lastname, a.display_name), ("山田", "太郎 山田"))
+        b = CustomUser.objects.select_related("customer_profile").get(email="b@example.com")
+        self.assertEqual(b.password, hashed)
+        self.assertEqual(b.customer_profile.phone_number, "090-0000-0000")
+        with open(errors, encoding="utf-8") as file:
+            self.assertEqual([json.loads(line)["row"] for line in file], [3, 4, 5, 6])
+
+    def test_ndjson_inactive_and_malformed_lines(self):
+        path = self.write("sns.ndjson", '{"email": "s@example.com", "password": "pw-Strong-123", "nickname": "えす"}\n\n{oops\n')
+        errors = os.path.join(self.tmpdir, "errors.ndjson")
+        self.assertIn("作成 1 件 / エラー 1 件", self.run_import(path, "--type", "sns", "--inactive", "--errors", errors))
+        user = CustomUser.objects.get(email="s@example.com")
+        self.assertEqual((user.is_active, user.display_name), (False, "えす"))
+        with open(errors, encoding="utf-8") as file:
+            self.assertEqual(json.loads(file.read())["row"], 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_resume_from_checkpoint(self):
+        rows = [{"email": f"e{i}@example.com", "password": "pw-Strong-123", "firstname": "f", "lastname": "l"} for i in range(5)]
+        path = self.write("employees.ndjson", "".join(json.dumps(row) + "\n" for row in rows))
+        real = signup_service.import_accounts
+        calls = []
+
+        def interrupted(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return real(*args, **kwargs)
+
+        with mock.patch("accounts.management.commands.import_accounts.import_accounts", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import(path, "--type", "employee", "--chunk-size", "2")
+        self.assertEqual(CustomUser.objects.count(), 2)
+        with open(f"{path}.checkpoint", encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["rows"], 2)
+
+        output = self.run_import(path, "--type", "employee", "--chunk-size", "2", "--resume")
+        self.assertIn("完了: 5 行 / 作成 5 件 / エラー 0 件", output)
+        self.assertEqual(EmployeeProfile.objects.count(), 5)
+
+        with self.assertRaises(CommandError):
+            self.run_import(path, "--type", "customer", "--resume")
+
+
+class ExportUsersTests(TestCase):
+    """ユーザーとプロフィールの全件エクスポート（accounts.export_service）"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(email="admin@example.com", is_active=True, is_staff=True)
+        EmployeeProfile.objects.create(
+            user=CustomUser.objects.create(email="emp@example.com", is_active=True),
+            firstname="太郎", lastname="山田", hire_date=date(2024, 4, 1), qualifications='"引用", 改行\nあり',
+        )
+        SNSProfile.objects.create(user=CustomUser.objects.create(email="sns@example.com"), nickname="えす")
+
+    def test_ndjson_rows(self):
+        with self.assertNumQueries(1):
+            rows = [json.loads(line) for line in "".join(export_service.iter_export("ndjson")).splitlines()]
+        self.assertEqual([row["email"] for row in rows], ["admin@example.com", "emp@example.com", "sns@example.com"])
+        employee = rows[1]
+        self.assertEqual(
+            (employee["employee_lastname"], employee["employee_hire_date"], employee["sns_nickname"], employee["is_active"]),
+            ("山田", "2024-04-01", None, True),
+        )
+        self.assertEqual(rows[2]["is_active"], False)
+
+    def test_csv_rows_and_chunks(self):
+        chunks = list(export_service.iter_export("csv", chunk_size=2))
+        self.assertEqual(len(chunks), 2)  # ヘッダー + 1 行、残りの 2 行
+        rows = list(csv.DictReader(StringIO("".join(chunks))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]["employee_qualifications"], '"引用", 改行\nあり')
+        self.assertEqual((rows[1]["is_active"], rows[2]["is_active"], rows[2]["employee_lastname"]), ("true", "false", ""))
+
+    def test_command_and_api(self):
+        path = os.path.join(tempfile.mkdtemp(), "users.ndjson")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command("export_users", "--output", path, stderr=StringIO())
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(len(file.readlines()), 3)
+
+        url = reverse("accounts:user_export")
+        self.client.force_authenticate(CustomUser.objects.get(email="emp@example.com"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(url, {"output": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertRegex(response["Content-Disposition"], r'attachment; filename="users-\d{8}\.csv"')
+        self.assertEqual(len(list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))), 4)
+
+
+@override_settings(**FAST_HASHING, AUTH_TOKEN_TTL=3600, AUTH_TOKEN_SLIDING_INTERVAL=300)
+class TokenExpiryTests(TestCase):
+    """DRF Token の有効期限と期限切れトークンの削除（accounts.token_service）"""
+
+    def setUp(self):
+        authentication.reset_token_cache()
+        self.addCleanup(authentication.reset_token_cache)
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+
+    def make_token(self, user=None, age=0):
+        token = Token.objects.create(user=user or self.user)
+        Token.objects.filter(pk=token.pk).update(created=timezone.now() - timedelta(seconds=age))
+        return Token.objects.get(pk=token.pk)
+
+    def me(self, token):
+        return self.client.get(reverse("accounts:me"), headers={"Authorization": f"Token {token.key}"})
+
+    def test_absolute_expiry(self):
+        token = self.make_token(age=3000)
+        self.assertEqual(self.me(token).status_code, 200)
+        # キャッシュ済みでも期限を確かめ、期限切れのトークンは削除する
+        later = timezone.now() + timedelta(seconds=700)
+        with mock.patch("accounts.token_service.timezone.now", return_value=later):
+            self.assertEqual(self.me(token).status_code, 401)
+        self.assertFalse(Token.objects.filter(pk=token.pk).exists())
+
+        response = self.client.post(reverse("accounts:login_api"), {"username": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertNotEqual(response.json()["token"], token.key)
+
+    @override_settings(AUTH_TOKEN_TTL_MODE="sliding")
+    def test_sliding_expiry_is_extended_at_most_once_per_interval(self):
+        token = self.make_token(age=3000)
+        self.assertEqual(self.me(token).status_code, 200)
+        refreshed = Token.objects.get(pk=token.pk).created
+        self.assertGreater(refreshed, token.created + timedelta(seconds=2900))
+        self.assertEqual(self.me(token).status_code, 200)
+        self.assertEqual(Token.objects.get(pk=token.pk).created, refreshed)
+
+    def test_purge_deletes_expired_tokens_in_chunks(self):
+        expired = [self.make_token(CustomUser.objects.create(email=f"old{i}@example.com", is_active=True), age=4000) for i in range(5)]
+        fresh = self.make_token(age=10)
+        # キャッシュ済みのトークンも、削除と同時にキャッシュから取り除く
+        authentication.CachedTokenAuthentication()._resolve(expired[0].key)
+        self.assertIsNotNone(authentication._get_local_cache().get(expired[0].key))
+
+        batches = []
+        self.assertEqual(token_service.purge_expired_tokens("default", chunk_size=2, progress=batches.append), 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(list(Token.objects.values_list("pk", flat=True)), [fresh.pk])
+        self.assertIsNone(authentication._get_local_cache().get(expired[0].key))
+
+    def test_purge_command(self):
+        self.make_token(age=4000)
+        out = StringIO()
+        call_command("purge_expired_tokens", "--dry-run", stdout=out)
+        self.assertIn("対象: 1 件", out.getvalue())
+        call_command("purge_expired_tokens", stdout=out)
+        self.assertFalse(Token.objects.exists())
+        with override_settings(AUTH_TOKEN_TTL=None), self.assertRaises(CommandError):
+            call_command("purge_expired_tokens", stdout=out)
+
+
+@override_settings(**FAST_HASHING)
+class SessionModeTests(TestCase):
+    """セッションの保存先（SESSION_MODE）と失効済みセッションの削除（accounts.session_service）"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        self.addCleanup(caches[settings.SESSION_CACHE_ALIAS].clear)
+
+    def test_login_and_logout_in_each_mode(self):
+        for mode, engine in SESSION_ENGINES.items():
+            with self.subTest(mode=mode), override_settings(SESSION_MODE=mode, SESSION_ENGINE=engine):
+                self.client = self.client_class()
+                self.assertTrue(self.client.login(username="taro@example.com", password="pw-Strong-123"))
+                session_key = self.client.session.session_key
+                self.assertEqual(self.client.get(reverse("accounts:me")).status_code, 200)
+
+                # サーバー側に保存されるのは db / cached_db（django_session）と cached_db / cache（キャッシュ）だけ
+                self.assertEqual(Session.objects.filter(pk=session_key).exists(), mode in ("db", "cached_db"))
+                self.assertEqual(session_service.uses_database(), mode in ("db", "cached_db"))
+                self.assertEqual(session_service.uses_cache(), mode in ("cached_db", "cache"))
+
+                self.assertEqual(self.client.post(reverse("accounts:logout_api")).status_code, 200)
+                self.assertEqual(self.client.get(reverse("accounts:me")).status_code, 401)
+                self.assertFalse(Session.objects.filter(pk=session_key).exists())
+
+    @override_settings(SESSION_MODE="cached_db", SESSION_ENGINE=SESSION_ENGINES["cached_db"])
+    def test_cached_db_reads_from_cache(self):
+        self.client.login(username="taro@example.com", password="pw-Strong-123")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse("accounts:me")).status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if "django_session" in q["sql"]])
+
+    def test_purge_expired_sessions_in_chunks(self):
+        store = SessionStore()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"expired{i}", session_data=store.encode({}), expire_date=timezone.now() - timedelta(days=1)
+            )
+        Session.objects.create(session_key="active", session_data=store.encode({}), expire_date=timezone.now() + timedelta(days=1))
+
+        batches = []
+        self.assertEqual(session_service.purge_expired_sessions(chunk_size=2, progress=batches.append), 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(list(Session.objects.values_list("pk", flat=True)), ["active"])
+
+    def test_purge_expired_cache_files(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        file_cache = {**settings.CACHES["sessions"], "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}
+        with override_settings(CACHES={**settings.CACHES, "sessions": file_cache}):
+            cache = caches["sessions"]
+            cache.set("expired", 1, timeout=0)
+            cache.set("active", 1, timeout=60)
+            self.assertEqual(session_service.purge_expired_cache_files(), 1)
+            self.assertEqual(cache.get("active"), 1)
+            self.assertEqual(len(os.listdir(location)), 1)
+        # ファイルのキャッシュでなければ何もしない
+        self.assertEqual(session_service.purge_expired_cache_files(), 0)
+
+    def test_purge_command(self):
+        Session.objects.create(session_key="expired", session_data="", expire_date=timezone.now() - timedelta(days=1))
+        out = StringIO()
+        call_command("purge_expired_sessions", stdout=out)
+        self.assertIn("django_session: 1 件を削除", out.getvalue())
+        self.assertFalse(Session.objects.exists())
+
+        with override_settings(SESSION_MODE="signed_cookies", SESSION_ENGINE=SESSION_ENGINES["signed_cookies"]):
+            call_command("purge_expired_sessions", stdout=out)
+        self.assertIn("サーバー側に保存されたセッションはありません", out.getvalue())
+
+
+# 子プロセスで設定を読み込み、メモリ上のテスト用 DB でログイン → me/ → ログアウトを行う
+PROFILE_PROBE = """
+import json
+import django
+django.setup()
+from django.apps import apps
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment
+setup_test_environment()
+override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]).enable()
+connection.creation.create_test_db(verbosity=0)
+from accounts.models import CustomUser
+CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+client = Client()
+login = client.post("/api/accounts/login/", {"username": "taro@example.com", "password": "pw-Strong-123"})
+headers = {"Authorization": "Token " + login.json()["token"]}
+me = client.get("/api/accounts/me/", headers=headers)
+print(json.dumps({
+    "sessions": apps.is_installed("django.contrib.sessions"),
+    "login": login.status_code,
+    "me": me.status_code,
+    "me_content_type": me["Content-Type"],
+    "logout": client.post("/api/accounts/logout/", headers=headers).status_code,
+    "admin": client.get("/admin/").status_code,
+}))
+"""
+
+
+class ApiOnlyProfileTests(SimpleTestCase):
+    """API 専用プロファイル（API_ONLY）。設定は読み込み時に決まるため、新しいプロセスで確かめる"""
+
+    def probe(self, api_only):
+        env = {**os.environ, "API_ONLY": api_only, "DJANGO_SETTINGS_MODULE": "rest_template_backend.settings"}
+        completed = subprocess.run(
+            [sys.executable, "-c", PROFILE_PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def test_api_only_profile_serves_token_api(self):
+        result = self.probe("True")
+        self.assertFalse(result["sessions"])
+        self.assertEqual((result["login"], result["me"], result["logout"]), (200, 200, 200))
+        # ブラウザ表示用のレンダラーはなく、管理画面も読み込まない
+        self.assertEqual(result["me_content_type"], "application/json")
+        self.assertEqual(result["admin"], 404)
+
+    def test_full_profile(self):
+        result = self.probe("False")
+        self.assertTrue(result["sessions"])
+        self.assertEqual((result["login"], result["me"], result["logout"]), (200, 200, 200))
+        self.assertEqual(result["admin"], 302)
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False)
+class EmailCaseInsensitiveTests(TestCase):
+    """メールアドレスの大文字・小文字を区別しない一意性・検索と、既存の重複のまとめ（0010 / merge_email_duplicates）"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+
+    def test_lookups_ignore_case(self):
+        self.assertEqual(CustomUser.objects.for_email("Taro@Example.COM").get(), self.user)
+        self.assertEqual(list(CustomUser.objects.for_emails(["TARO@example.com", "jiro@example.com"])), [self.user])
+        self.assertEqual(CustomUser.objects.get_by_natural_key("TARO@EXAMPLE.COM"), self.user)
+
+        response = self.client.post(reverse("accounts:login_api"), {"username": "Taro@Example.com", "password": "pw-Strong-123"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_duplicates_are_rejected(self):
+        response = self.client.post(
+            reverse("accounts:signup_customer"), {"email": "TARO@example.com", "password": "pw-Strong-123"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create(email="Taro@example.com")
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def make_duplicates(self):
+        # 制約の追加前の状態を作る（テストのトランザクションごと戻る）
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX user_email_lower_uniq")
+        admin = CustomUser.objects.create(email="Taro@example.com", is_staff=True, display_name="管理者")
+        other = CustomUser.objects.create(email="TARO@EXAMPLE.COM", is_active=True)
+        SNSProfile.objects.create(user=other, nickname="たろう")
+        token = Token.objects.create(user=other)
+        return admin, other, token
+
+    def test_merge_command_dry_run_reports_ids(self):
+        admin, other, _ = self.make_duplicates()
+        out = StringIO()
+        call_command("merge_email_duplicates", "--dry-run", stdout=out)
+        self.assertIn(f"taro@example.com: 残す {admin.pk} / 削除 {self.user.pk}, {other.pk}", out.getvalue())
+        self.assertIn("対象: 1 グループ", out.getvalue())
+        self.assertEqual(CustomUser.objects.count(), 3)
+
+    def test_merge_keeps_admin_and_moves_related_rows(self):
+        admin, other, token = self.make_duplicates()
+        with self.assertLogs("accounts.email_merge", "WARNING") as logs:
+            call_command("merge_email_duplicates", stdout=StringIO())
+        self.assertIn(f"残す={admin.pk} 削除={[self.user.pk, other.pk]}", logs.output[0])
+
+        # 管理者を残し、有効・プロフィール・トークンは他のユーザーから引き継ぐ
+        self.assertEqual(list(CustomUser.objects.values_list("pk", flat=True)), [admin.pk])
+        admin.refresh_from_db()
+        self.assertTrue(admin.is_staff)
+        self.assertTrue(admin.is_active)
+        self.assertEqual(admin.display_name, "管理者")
+        self.assertEqual(SNSProfile.objects.get().user_id, admin.pk)
+        self.assertEqual(Token.objects.get().pk, token.pk)
+        self.assertEqual(Token.objects.get().user_id, admin.pk)
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False)
+class SignupQueryCountTests(TransactionTestCase):
+    """
+    サインアップ 1 件あたりの SQL 文の数（signup_service.signup_account）。
+    TestCase ではトランザクションがセーブポイントになり SAVEPOINT / RELEASE も数えられるため、
+    本番と同じ BEGIN / COMMIT で動く TransactionTestCase で計測する（BEGIN・COMMIT も 1 文として数える）。
+    """
+
+    def signup(self, name, data):
+        return self.client.post(reverse(f"accounts:{name}"), data, content_type="application/json")
+
+    def test_customer_signup_inserts_user_and_profile(self):
+        with self.assertNumQueries(4):  # BEGIN, INSERT ユーザー, INSERT プロフィール, COMMIT
+            response = self.signup("signup_customer", {"email": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertEqual(response.status_code, 201)
+        user = CustomUser.objects.get(email="taro@example.com")
+        self.assertTrue(user.is_active)
+        self.assertTrue(hasattr(user, "customer_profile"))
+
+    def test_employee_signup_saves_profile_fields(self):
+        data = {"email": "jiro@example.com", "password": "pw-Strong-123", "department": "開発部", "position": "主任"}
+        with self.assertNumQueries(4):
+            response = self.signup("signup_employee", data)
+        self.assertEqual(response.status_code, 201)
+        profile = CustomUser.objects.get(email="jiro@example.com").employee_profile
+        self.assertEqual((profile.department, profile.position), ("開発部", "主任"))
+
+    def test_sns_signup_sets_display_name(self):
+        data = {"email": "hanako@example.com", "password": "pw-Strong-123", "nickname": "はなこ"}
+        with self.assertNumQueries(4):
+            response = self.signup("signup_sns", data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CustomUser.objects.get(email="hanako@example.com").display_name, "はなこ")
+
+    @override_settings(USE_EMAIL_VERIFICATION=True)
+    def test_verification_signup_enqueues_email_in_same_transaction(self):
+        with self.assertNumQueries(5):  # BEGIN, INSERT ユーザー / プロフィール / アウトボックス, COMMIT
+            response = self.signup("signup_customer", {"email": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(CustomUser.objects.get(email="taro@example.com").is_active)
+        self.assertEqual(EmailOutbox.objects.filter(recipient="taro@example.com").count(), 1)
+
+    def test_duplicate_email_is_detected_by_constraint(self):
+        self.signup("signup_customer", {"email": "Taro@Example.com", "password": "pw-Strong-123"})
+        with self.assertNumQueries(3):  # BEGIN, INSERT（一意制約違反）, ROLLBACK。事前の SELECT はしない
+            response = self.signup("signup_customer", {"email": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    @override_settings(USE_EMAIL_VERIFICATION=True)
+    def test_failure_after_user_insert_leaves_no_orphan(self):
+        with mock.patch("accounts.signup_service.send_activation_emails", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.signup("signup_customer", {"email": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertFalse(CustomUser.objects.exists())
+
+    def without_firstname(self):
+        """プロフィールの NOT NULL 列を空にして INSERT させる（メールアドレス以外の制約違反）"""
+        build = signup_service._build_account
+
+        def build_account(*args):
+            user, profile = build(*args)
+            profile.firstname = None
+            return user, profile
+
+        return mock.patch("accounts.signup_service._build_account", build_account)
+
+    def test_other_constraint_violation_is_not_reported_as_duplicate(self):
+        data = {"email": "jiro@example.com", "password": "pw-Strong-123", "department": "開発部"}
+        with self.without_firstname(), self.assertRaisesMessage(IntegrityError, "NOT NULL"):
+            self.signup("signup_employee", data)
+        self.assertFalse(CustomUser.objects.exists())
+
+    # 非同期版（async_views）も同じ signup_account を使う。
+    # sync_to_async の処理はこのスレッドで実行されるので、同じ接続でクエリを数えられる
+    def asignup(self, name, data):
+        return async_to_sync(self.async_client.post)(reverse(f"accounts:{name}"), data, content_type="application/json")
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_signup_uses_one_transaction(self):
+        data = {"email": "hanako@example.com", "password": "pw-Strong-123", "nickname": "はなこ"}
+        with self.assertNumQueries(4):
+            response = self.asignup("signup_sns", data)
+        self.assertEqual(response.status_code, 201)
+        user = CustomUser.objects.select_related("sns_profile").get(email="hanako@example.com")
+        self.assertEqual((user.sns_profile.nickname, user.display_name), ("はなこ", "はなこ"))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_duplicate_email_is_rejected(self):
+        self.asignup("signup_customer", {"email": "Taro@Example.com", "password": "pw-Strong-123"})
+        with self.assertNumQueries(3):
+            response = self.asignup("signup_customer", {"email": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_other_constraint_violation_is_not_reported_as_duplicate(self):
+        data = {"email": "jiro@example.com", "password": "pw-Strong-123", "department": "開発部"}
+        with self.without_firstname(), self.assertRaisesMessage(IntegrityError, "NOT NULL"):
+            self.asignup("signup_employee", data)
+        self.assertFalse(CustomUser.objects.exists())
+
+    @override_settings(ROOT_URLCONF=__name__, USE_EMAIL_VERIFICATION=True)
+    def test_async_failure_after_user_insert_leaves_no_orphan(self):
+        with mock.patch("accounts.signup_service.send_activation_emails", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.asignup("signup_customer", {"email": "taro@example.com", "password": "pw-Strong-123"})
+        self.assertFalse(CustomUser.objects.exists())
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False)
+class IdempotencyKeyTests(TestCase):
+    """Idempotency-Key 付きの POST（accounts.middleware.IdempotencyMiddleware）"""
+
+    body = {"email": "taro@example.com", "password": "pw-Strong-123"}
+
+    def setUp(self):
+        idempotency.get_cache().clear()
+
+    def signup(self, data, key="key-1"):
+        return self.client.post(
+            reverse("accounts:signup_customer"), data, content_type="application/json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_retry_replays_stored_response_without_running_view(self):
+        first = self.signup(self.body)
+        with self.assertNumQueries(0):
+            retry = self.signup(self.body)
+        self.assertEqual((retry.status_code, retry.content), (first.status_code, first.content))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        self.signup(self.body)
+        response = self.signup({**self.body, "password": "other-Pw-999"})
+        self.assertEqual(response.status_code, 422)
+
+    def signup_request(self):
+        return RequestFactory().post(reverse("accounts:signup_customer"), self.body, content_type="application/json")
+
+    @override_settings(IDEMPOTENCY_RETRY_AFTER=2)
+    def test_request_in_flight_is_not_executed_twice(self):
+        # 同じキー・同じ内容のリクエストが実行中。同期版は待たずに 409 を返す
+        execution = idempotency.begin(self.signup_request(), "key-1")
+        started = time.monotonic()
+        with self.assertNumQueries(0):
+            response = self.signup(self.body)
+        self.assertLess(time.monotonic() - started, 1)  # IDEMPOTENCY_WAIT_SECONDS（既定 10 秒）待たない
+        self.assertEqual((response.status_code, response["Retry-After"]), (409, "2"))
+        idempotency.finish(execution, None)
+        self.assertEqual(self.signup(self.body).status_code, 201)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=5)
+    def test_async_waits_for_request_in_flight(self):
+        execution = idempotency.begin(self.signup_request(), "key-1")
+        timer = threading.Timer(0.1, idempotency.finish, (execution, HttpResponse(b"done", status=201)))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        waited = async_to_sync(idempotency.abegin)(self.signup_request(), "key-1")
+        self.assertEqual((waited.response.status_code, waited.response.content), (201, b"done"))
+        self.assertEqual(waited.response["Idempotent-Replayed"], "true")
+
+    def test_login_response_is_not_stored(self):
+        CustomUser.objects.create_user("taro@example.com", "pw-Strong-123", is_active=True)
+        data = {"username": "taro@example.com", "password": "pw-Strong-123"}
+        headers = {"Idempotency-Key": "key-1"}
+        first = self.client.post(reverse("accounts:login_api"), data, headers=headers)
+        self.client.post(reverse("accounts:logout_api"), headers={"Authorization": f"Token {first.json()['token']}"})
+
+        # 保存した応答（失効したトークン）を返さず、ログインし直す
+        retry = self.client.post(reverse("accounts:login_api"), data, headers=headers)
+        self.assertEqual(retry.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", retry)
+        self.assertNotEqual(retry.json()["token"], first.json()["token"])
+
+
+@override_settings(**FAST_HASHING, USE_EMAIL_VERIFICATION=False, ADMISSION_MAX_CONCURRENT=1, ADMISSION_MAX_QUEUE=1)
+class AdmissionControlTests(TestCase):
+    """ログイン・サインアップの同時実行数の制限（accounts.middleware.AdmissionControlMiddleware）"""
+
+    body = {"email": "taro@example.com", "password": "pw-Strong-123"}
+
+    def signup(self):
+        return self.client.post(reverse("accounts:signup_customer"), self.body, content_type="application/json")
+
+    @override_settings(ADMISSION_MAX_QUEUE=0)
+    def test_excess_request_is_shed_with_retry_after(self):
+        limiter = admission.get_limiter()
+        self.assertTrue(limiter.acquire())  # 実行枠を埋める
+        try:
+            with self.assertNumQueries(0):
+                response = self.signup()
+            # 制限の対象外のエンドポイントは処理される
+            self.assertEqual(self.client.get(reverse("accounts:me")).status_code, 401)
+        finally:
+            limiter.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(admission.get_admission_stats()["rejected_queue_full"], 1)
+        self.assertEqual(self.signup().status_code, 201)
+
+    @override_settings(ADMISSION_QUEUE_TIMEOUT=0.05)
+    def test_queued_request_times_out(self):
+        limiter = admission.get_limiter()
+        self.assertTrue(limiter.acquire())
+        try:
+            self.assertFalse(limiter.acquire())
+        finally:
+            limiter.release()
+        stats = admission.get_admission_stats()
+        self.assertEqual((stats["rejected_timeout"], stats["queue_depth"], stats["in_flight"]), (1, 0, 0))
+
+    @override_settings(ADMISSION_QUEUE_TIMEOUT=5)
+    def test_release_hands_slot_to_waiting_request(self):
+        limiter = admission.get_limiter()
+        self.assertTrue(limiter.acquire())
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+        waiter.start()
+        while limiter.stats()["queue_depth"] == 0:
+            time.sleep(0.001)
+        limiter.release()
+        waiter.join()
+        self.assertEqual(results, [True])
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+        limiter.release()
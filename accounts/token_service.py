@@ -0,0 +1,155 @@
+# accounts/token_service.py
+
+"""
+accounts.token_service モジュール
+
+DRF の Token（AUTH_TOKEN_MODE = "db"）の有効期限。
+
+Token は作成日時（created）しか持たないので、有効期限は created から AUTH_TOKEN_TTL 秒とする。
+- "absolute": 発行（ログイン）から AUTH_TOKEN_TTL 秒で失効する
+- "sliding": 最後に使われてから AUTH_TOKEN_TTL 秒で失効する。利用時に created を現在時刻へ進めるが、
+  毎リクエストの UPDATE を避けるため、前回の延長から AUTH_TOKEN_SLIDING_INTERVAL 秒以上経った場合だけ更新する
+どちらも「created < 現在時刻 - AUTH_TOKEN_TTL」の行が失効済みなので、
+purge_expired_tokens コマンドは created の索引（マイグレーション 0010）で範囲検索して削除する。
+
+含まれる主な関数:
+- is_token_expired: トークンが失効しているか
+- refresh_token_expiry / arefresh_token_expiry: sliding 方式の期限の延長
+- obtain_token / aobtain_token: ログイン時のトークンの取得（失効済みなら作り直す）
+- purge_expired_tokens: 失効済みのトークンをチャンクごとに削除
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .routers import pin_to_primary
+
+ABSOLUTE = "absolute"
+SLIDING = "sliding"
+
+
+def get_token_ttl():
+    """有効秒数（None なら無期限）"""
+    return getattr(settings, "AUTH_TOKEN_TTL", 60 * 60 * 24 * 14)
+
+
+def get_ttl_mode():
+    return getattr(settings, "AUTH_TOKEN_TTL_MODE", ABSOLUTE)
+
+
+def expiry_cutoff(now=None):
+    """この日時より前に作成（sliding では最後に延長）されたトークンは失効済み。無期限なら None"""
+    ttl = get_token_ttl()
+    if ttl is None:
+        return None
+    return (now or timezone.now()) - timedelta(seconds=ttl)
+
+
+def is_token_expired(token, now=None):
+    cutoff = expiry_cutoff(now)
+    return cutoff is not None and token.created < cutoff
+
+
+def _extended_created(token, now):
+    """sliding 方式で延長が必要なら新しい created を返す（不要なら None）"""
+    if get_ttl_mode() != SLIDING or get_token_ttl() is None:
+        return None
+    interval = timedelta(seconds=getattr(settings, "AUTH_TOKEN_SLIDING_INTERVAL", 300))
+    if token.created > now - interval:
+        return None
+    return now
+
+
+def refresh_token_expiry(token, now=None):
+    """
+    sliding 方式のとき、トークンの期限を延長する（created を現在時刻にする）。
+    呼び出し元のインスタンス（キャッシュ上のものを含む）も書き換えるので、同じプロセスでは
+    AUTH_TOKEN_SLIDING_INTERVAL 秒のあいだ UPDATE しない。
+    """
+    now = now or timezone.now()
+    created = _extended_created(token, now)
+    if created is None:
+        return
+    Token.objects.using(token._state.db).filter(pk=token.pk, created__lt=created).update(created=created)
+    pin_to_primary()
+    token.created = created
+
+
+async def arefresh_token_expiry(token, now=None):
+    """refresh_token_expiry() の非同期版"""
+    now = now or timezone.now()
+    created = _extended_created(token, now)
+    if created is None:
+        return
+    await Token.objects.using(token._state.db).filter(pk=token.pk, created__lt=created).aupdate(
+        created=created
+    )
+    pin_to_primary()
+    token.created = created
+
+
+def obtain_token(user):
+    """
+    ログイン時のトークン。既存のトークンが失効していれば削除して新しいキーで作り直す
+    （sliding 方式では期限を延長する）。
+    """
+    token, created = Token.objects.get_or_create(user=user)
+    if created:
+        return token
+    if is_token_expired(token):
+        token.delete()
+        # 同時ログインで先に作り直されていればそれを使う
+        return Token.objects.get_or_create(user=user)[0]
+    refresh_token_expiry(token)
+    return token
+
+
+async def aobtain_token(user):
+    """obtain_token() の非同期版"""
+    token, created = await Token.objects.aget_or_create(user=user)
+    if created:
+        return token
+    if is_token_expired(token):
+        await token.adelete()
+        return (await Token.objects.aget_or_create(user=user))[0]
+    await arefresh_token_expiry(token)
+    return token
+
+
+def purge_expired_tokens(using, chunk_size=1000, pause=0.0, progress=None):
+    """
+    データベース using の失効済みトークンを chunk_size 件ずつ削除する。
+
+    created の索引で古い順に chunk_size 件のキーを選び、そのキーだけを 1 文の DELETE で消すので、
+    1 回のロックは短い。pause 秒ずつ間を空けて、他の書き込みを優先させることもできる。
+    QuerySet.delete() で消すので、post_delete シグナルでトークン認証キャッシュからも取り除かれる。
+
+    Returns:
+        int: 削除した件数
+    """
+    cutoff = expiry_cutoff()
+    if cutoff is None:
+        return 0
+
+    tokens = Token.objects.using(using)
+    total = 0
+    while True:
+        keys = list(
+            tokens.filter(created__lt=cutoff).order_by("created").values_list("pk", flat=True)[:chunk_size]
+        )
+        if not keys:
+            break
+        # 選んだ後に（sliding 方式で）延長されたトークンは消さない
+        deleted, _ = tokens.filter(pk__in=keys, created__lt=cutoff).delete()
+        total += deleted
+        if progress is not None:
+            progress(total)
+        if len(keys) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
@@ -0,0 +1,166 @@
+# accounts/tokens.py
+
+"""
+accounts.tokens モジュール
+
+DB を使わない署名付きアクセストークン（AUTH_TOKEN_MODE = "signed" のときに使用）。
+
+トークンは django.core.signing（SECRET_KEY による HMAC）で署名した
+ユーザー ID と発行時刻で、検証に DB の読み込みは不要。
+有効期限は SIGNED_TOKEN_MAX_AGE 秒。
+
+失効（ログアウト）はユーザーごとの「この時刻より前に発行されたトークンは無効」という
+タイムスタンプをキャッシュ（SIGNED_TOKEN_REVOCATION_CACHE）に保存して行う。
+期限切れ後のトークンはどのみち無効なので、タイムスタンプは SIGNED_TOKEN_MAX_AGE 秒だけ保持すればよい。
+失効を全ワーカーに反映させるため、キャッシュはプロセス間で共有されるもの（既定はファイル、複数ホストでは
+Redis / Memcached など）でなければならない。プロセス内のキャッシュ（LocMemCache など）を指定すると、
+AUTH_TOKEN_MODE = "signed" では起動時のシステムチェック（check_revocation_cache）でエラーになる。
+
+含まれる主な関数:
+- issue_access_token: トークンを発行
+- verify_access_token: トークンを検証してユーザー ID を返す
+- revoke_access_tokens: ユーザーの発行済みトークンをすべて失効させる
+  （非同期ビュー用に averify_access_token / arevoke_access_tokens もある）
+- make_activation_token / check_activation_token: アカウント有効化リンク用トークン
+- check_revocation_cache: 失効情報のキャッシュがプロセス間で共有されるかのシステムチェック
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core import checks, signing
+from django.core.cache import caches
+
+SALT = "accounts.tokens.access"
+REVOCATION_KEY_PREFIX = "accounts:tokens-valid-after:"
+
+# プロセス内にしか保存されないキャッシュ（失効が他のワーカーに伝わらない）
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+class TokenRevoked(signing.BadSignature):
+    """ログアウトなどで失効済みのトークン"""
+
+
+def get_token_mode():
+    """トークンの方式: "db"（DRF の Token）または "signed"（署名付きトークン）"""
+    return getattr(settings, "AUTH_TOKEN_MODE", "db")
+
+
+def get_max_age():
+    return getattr(settings, "SIGNED_TOKEN_MAX_AGE", 3600)
+
+
+def _revocation_alias():
+    return getattr(settings, "SIGNED_TOKEN_REVOCATION_CACHE", "token_revocations")
+
+
+def _revocations():
+    return caches[_revocation_alias()]
+
+
+@checks.register(checks.Tags.security)
+def check_revocation_cache(app_configs=None, **kwargs):
+    """署名付きトークンを使うのに、失効情報をプロセス内のキャッシュに保存していないか"""
+    if get_token_mode() != "signed":
+        return []
+    alias = _revocation_alias()
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend in PROCESS_LOCAL_CACHES:
+        return [checks.Error(
+            f"SIGNED_TOKEN_REVOCATION_CACHE（{alias!r}）がプロセス内のキャッシュ（{backend}）です。"
+            "ログアウトしたトークンが他のワーカーで有効なままになります。",
+            hint="ファイル・Redis・Memcached などプロセス間で共有されるキャッシュを指定してください。",
+            id="accounts.E001",
+        )]
+    return []
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def issue_access_token(user):
+    """
+    ユーザーの署名付きアクセストークンを発行する。
+
+    Returns:
+        str: トークン文字列
+    """
+    return signing.dumps({"uid": user.pk, "iat": _now_ms()}, salt=SALT, compress=False)
+
+
+def verify_access_token(token):
+    """
+    トークンの署名・有効期限・失効を確認し、ユーザー ID を返す。
+
+    Raises:
+        signing.SignatureExpired: 有効期限切れ
+        TokenRevoked: 失効済み
+        signing.BadSignature: 改ざん・形式不正
+    """
+    uid, issued_at = _load_access_token(token)
+    _check_revocation(uid, issued_at, _revocations().get(REVOCATION_KEY_PREFIX + str(uid)))
+    return uid
+
+
+async def averify_access_token(token):
+    """verify_access_token() の非同期版"""
+    uid, issued_at = _load_access_token(token)
+    _check_revocation(uid, issued_at, await _revocations().aget(REVOCATION_KEY_PREFIX + str(uid)))
+    return uid
+
+
+def _load_access_token(token):
+    payload = signing.loads(token, salt=SALT, max_age=get_max_age())
+    try:
+        return payload["uid"], int(payload["iat"])
+    except (TypeError, KeyError, ValueError):
+        raise signing.BadSignature("トークンの形式が不正です。")
+
+
+def _check_revocation(uid, issued_at, valid_after):
+    if valid_after is not None and issued_at < valid_after:
+        raise TokenRevoked("トークンは失効しています。")
+
+
+def revoke_access_tokens(user_id):
+    """ユーザーに発行済みの署名付きトークンをすべて失効させる"""
+    _revocations().set(REVOCATION_KEY_PREFIX + str(user_id), _now_ms(), timeout=get_max_age())
+
+
+async def arevoke_access_tokens(user_id):
+    """revoke_access_tokens() の非同期版"""
+    await _revocations().aset(REVOCATION_KEY_PREFIX + str(user_id), _now_ms(), timeout=get_max_age())
+
+
+class ActivationTokenGenerator(PasswordResetTokenGenerator):
+    """
+    アカウント有効化リンク用のトークン。
+
+    パスワードリセットのトークンと同じく、ユーザーの状態（パスワードのハッシュ・最終ログイン日時・
+    メールアドレス）に is_active を加えた値から作るので、有効化・ログイン・パスワード変更のあとは
+    同じリンクが使えなくなる。有効期限は PASSWORD_RESET_TIMEOUT 秒。
+    """
+
+    key_salt = "accounts.tokens.ActivationTokenGenerator"
+
+    def _make_hash_value(self, user, timestamp):
+        return f"{super()._make_hash_value(user, timestamp)}{user.is_active}"
+
+
+activation_token_generator = ActivationTokenGenerator()
+
+
+def make_activation_token(user):
+    """アカウント有効化リンク用のトークンを発行する"""
+    return activation_token_generator.make_token(user)
+
+
+def check_activation_token(user, token):
+    """有効化トークンがユーザーの現在の状態に対して有効か"""
+    return activation_token_generator.check_token(user, token)
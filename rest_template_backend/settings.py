@@ -10,7 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,6 +31,13 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# API 専用プロファイル（API サーバーのワーカー向け）
+# True にすると、accounts API が使わない管理画面・セッション・メッセージ・静的ファイルのアプリと
+# セッション・CSRF・認証・メッセージ・クリックジャッキング対策のミドルウェアを外し、
+# DRF のブラウザ表示用レンダラーとセッション認証も無効にする（起動時間・1 リクエストあたりの処理の削減）。
+# テンプレートのログイン画面・管理画面は使えなくなる。効果は bench_startup で計測する。
+API_ONLY = config("API_ONLY", default=False, cast=bool)
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -38,12 +45,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
+    'rest_framework.authtoken',
     'accounts',
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'accounts.middleware.IdempotencyMiddleware',
+    'accounts.middleware.AdmissionControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'accounts.middleware.ReplicaPinningMiddleware',
+    'accounts.middleware.ShardContextMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -51,6 +65,21 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in {
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    }]
+    MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in {
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    }]
+
 ROOT_URLCONF = 'rest_template_backend.urls'
 
 TEMPLATES = [
@@ -63,7 +92,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-            ],
+            ] if not API_ONLY else [],
         },
     },
 ]
@@ -81,6 +110,123 @@ DATABASES = {
     }
 }
 
+# SQLite の同時書き込み向けチューニング（accounts/sqlite.py の connection_created フックで PRAGMA を適用）
+SQLITE_TUNED = config("SQLITE_TUNED", default=True, cast=bool)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # 読み取りと書き込みを並行させる
+    'synchronous': 'NORMAL',  # WAL ではコミットごとの fsync を省いても破損しない
+    'busy_timeout': 5000,  # ロック待ちの上限（ミリ秒）
+    'cache_size': -20000,  # ページキャッシュ（負の値は KiB 単位、約 20MB）
+    'mmap_size': 134217728,  # メモリマップ I/O（128MB）
+    'temp_store': 'MEMORY',
+} if SQLITE_TUNED else {}
+
+if SQLITE_TUNED:
+    DATABASES['default'].update({
+        'OPTIONS': {
+            # 書き込みトランザクションを開始時にロック（読み取りから書き込みへの昇格で「database is locked」にならない）
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+        'CONN_MAX_AGE': 600,  # 接続を使い回す（秒）
+        'CONN_HEALTH_CHECKS': True,  # 使い回す前に接続の生存を確認
+    })
+
+# 読み取り用レプリカ（accounts.routers.PrimaryReplicaRouter）
+# DATABASE_REPLICAS にカンマ区切りで SQLite ファイルのパスを指定すると replica1, replica2, ... として追加する。
+# （ファイルの複製は Litestream などで行う。テスト時は default をミラーする）
+REPLICA_DATABASES = []
+for _index, _name in enumerate(config("DATABASE_REPLICAS", default="", cast=Csv()), start=1):
+    DATABASES[f'replica{_index}'] = {
+        **DATABASES['default'],
+        'NAME': _name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica{_index}')
+
+
+# ユーザーのシャーディング（accounts/sharding.py、既定では無効）
+# USER_SHARD_DATABASES にカンマ区切りで SQLite ファイルのパスを指定すると shard1, shard2, ... として追加し、
+# ユーザー・プロフィール・トークンをメールアドレスのハッシュで振り分ける（ID → シャードは default の UserDirectory）。
+# 各シャードは migrate --database shardN で作成し、シャードを増減したら rebalance_user_shards を実行する。
+USER_SHARDS = []
+for _index, _name in enumerate(config("USER_SHARD_DATABASES", default="", cast=Csv()), start=1):
+    DATABASES[f'shard{_index}'] = {**DATABASES['default'], 'NAME': _name, 'TEST': {}}
+    USER_SHARDS.append(f'shard{_index}')
+if USER_SHARDS:
+    AUTHENTICATION_BACKENDS = ['accounts.backends.ShardedModelBackend']
+
+DATABASE_ROUTERS = ['accounts.routers.UserShardRouter', 'accounts.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 5  # 書き込み後、読み取りをプライマリに固定する秒数（レプリカの遅延より長く）
+# Cookie を保存しないクライアントの固定を Authorization ヘッダーごとに引き継ぐ CACHES のエイリアス（None で Cookie のみ）。
+# プロセス内のキャッシュでは他のワーカーに伝わらないので、REPLICA_PIN_CACHE_LOCATION（共有するディレクトリ）を
+# 指定したときだけ有効にする（CACHES["replica_pins"]）
+REPLICA_PIN_CACHE = "replica_pins" if config("REPLICA_PIN_CACHE_LOCATION", default="") else None
+
+
+# Cache / Session
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+
+# セッション（テンプレートのログイン画面・管理画面・logout()）の保存先
+#   "db":             django_session テーブル（セッションを使うリクエストごとに読み込み、変更時に書き込み）
+#   "cached_db":      キャッシュから読み、書き込みはキャッシュと DB の両方（キャッシュが消えても DB から復元）
+#   "cache":          キャッシュのみ（DB を使わない。キャッシュが消えるとログアウト扱いになる）
+#   "signed_cookies": 署名付き Cookie に保存（サーバー側の保存なし。ログアウト前の Cookie は期限まで有効）
+# 失効済みのセッションは purge_expired_sessions で削除する（accounts.session_service）。
+SESSION_MODE = config("SESSION_MODE", default="db")
+SESSION_ENGINE = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}[SESSION_MODE]
+
+# セッション用キャッシュ（cached_db / cache のとき）
+#   "locmem": プロセス内メモリ（プロセス間で共有されないため、複数プロセスでは cached_db と組み合わせる）
+#   "file":   SESSION_CACHE_LOCATION のファイル（同じホストのプロセス間で共有される）
+SESSION_CACHE_BACKEND = config("SESSION_CACHE_BACKEND", default="locmem")
+SESSION_CACHE_ALIAS = "sessions"
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "sessions": {
+        "BACKEND": {
+            "locmem": "django.core.cache.backends.locmem.LocMemCache",
+            "file": "django.core.cache.backends.filebased.FileBasedCache",
+        }[SESSION_CACHE_BACKEND],
+        "LOCATION": (
+            config("SESSION_CACHE_LOCATION", default=str(BASE_DIR / "session_cache"))
+            if SESSION_CACHE_BACKEND == "file" else "sessions"
+        ),
+        # 既定の 300 件では上限を超えた時点で有効なセッションまで間引かれる
+        "OPTIONS": {"MAX_ENTRIES": config("SESSION_CACHE_MAX_ENTRIES", default=100000, cast=int)},
+    },
+    # Idempotency-Key の応答（accounts.idempotency）。上限を超えると古い項目から間引かれる。
+    # 同時の再送をプロセスをまたいでまとめるには、IDEMPOTENCY_CACHE_LOCATION を指定してファイルで共有する
+    "idempotency": {
+        "BACKEND": (
+            "django.core.cache.backends.filebased.FileBasedCache"
+            if config("IDEMPOTENCY_CACHE_LOCATION", default="")
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("IDEMPOTENCY_CACHE_LOCATION", default="") or "idempotency",
+        "OPTIONS": {"MAX_ENTRIES": config("IDEMPOTENCY_CACHE_MAX_ENTRIES", default=10000, cast=int)},
+    },
+    # 署名付きトークンの失効情報（accounts.tokens）。ログアウトを全ワーカーに反映させるため、既定でプロセス間で共有する。
+    # 複数ホストで動かす場合は共有キャッシュ（Redis / Memcached など）に差し替える。
+    # 上限を超えて間引かれると失効が取り消されるので、MAX_ENTRIES はログアウト数に対して十分大きくする
+    "token_revocations": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("SIGNED_TOKEN_REVOCATION_LOCATION", default=str(BASE_DIR / "token_revocations")),
+        "OPTIONS": {"MAX_ENTRIES": config("SIGNED_TOKEN_REVOCATION_MAX_ENTRIES", default=100000, cast=int)},
+    },
+}
+if REPLICA_PIN_CACHE:
+    # 読み取りレプリカの固定（accounts.middleware.ReplicaPinningMiddleware）。ワーカー間で共有する
+    CACHES[REPLICA_PIN_CACHE] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("REPLICA_PIN_CACHE_LOCATION"),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -115,6 +261,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# アップロードファイル（アバター画像など）
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -129,4 +279,103 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
-DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
\ No newline at end of file
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# メールアウトボックス（send_outbox_emails コマンドで送信）
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # 最大試行回数（超えたら送信失敗として残す）
+EMAIL_OUTBOX_BACKOFF_SECONDS = 30  # 再送間隔の初期値（試行ごとに倍増）
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = 3600  # 再送間隔の上限
+EMAIL_OUTBOX_LEASE_SECONDS = 300  # ワーカーが取得した行のロック期限
+
+# 従業員一括登録 API (signup/employee/bulk/)
+BULK_SIGNUP_MAX_ROWS = 10000  # 1 リクエストあたりの最大件数
+BULK_SIGNUP_CHUNK_SIZE = 500  # 1 トランザクションで書き込む件数
+
+# パスワードのハッシュ化・照合を実行するエグゼキュータ（accounts/hashing.py）
+#   accounts.hashing.InlineHashExecutor:      リクエストスレッドでそのまま実行
+#   accounts.hashing.ProcessPoolHashExecutor: プロセスプールで実行（スレッドワーカーで複数コアを活用）
+# プロセスプールはワーカープロセスごとに作られるので、既定はそのまま実行する版。
+# 少数プロセス × 多スレッドで動かすデプロイでだけ、環境変数で指定する
+# （ワーカープロセス数 × PASSWORD_HASH_WORKERS が CPU 数を超えないようにする）
+PASSWORD_HASH_EXECUTOR = config("PASSWORD_HASH_EXECUTOR", default="accounts.hashing.InlineHashExecutor")
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=0, cast=int) or None  # プロセス数（None で CPU 数）
+
+# Django REST framework
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'accounts.authentication.CachedTokenAuthentication',
+        'accounts.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+if API_ONLY:
+    # セッション（AuthenticationMiddleware）がないのでセッション認証は使えない。レスポンスは JSON のみ
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].remove('rest_framework.authentication.SessionAuthentication')
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ['rest_framework.renderers.JSONRenderer']
+
+# トークン認証キャッシュ（accounts.authentication.CachedTokenAuthentication）
+TOKEN_AUTH_CACHE_MAXSIZE = 10000  # プロセス内キャッシュの最大件数
+TOKEN_AUTH_CACHE_TTL = 30  # プロセス内キャッシュの有効秒数（他プロセスでの無効化の反映遅延の上限）
+TOKEN_AUTH_SHARED_CACHE = None  # 共有キャッシュに使う CACHES のエイリアス（None で無効）
+TOKEN_AUTH_SHARED_CACHE_TTL = 300  # 共有キャッシュの有効秒数
+
+# ログイン API が発行するトークンの方式（accounts/tokens.py）
+#   "db":     DRF の Token（authtoken_token テーブル）
+#   "signed": 署名付きアクセストークン（Authorization: Bearer、検証に DB を使わない）
+AUTH_TOKEN_MODE = "db"
+SIGNED_TOKEN_MAX_AGE = 3600  # 署名付きトークンの有効秒数
+SIGNED_TOKEN_REVOCATION_CACHE = "token_revocations"  # 失効情報を保存する CACHES のエイリアス（プロセス内のキャッシュは不可）
+
+# DRF Token（AUTH_TOKEN_MODE = "db"）の有効期限（accounts.token_service、失効済みは purge_expired_tokens で削除）
+AUTH_TOKEN_TTL = 60 * 60 * 24 * 14  # 有効秒数（None で無期限）
+AUTH_TOKEN_TTL_MODE = "absolute"  # "absolute": ログインから / "sliding": 最後の利用から
+AUTH_TOKEN_SLIDING_INTERVAL = 300  # sliding: 期限を延長する最短間隔（毎リクエストの UPDATE を避ける）
+
+# Idempotency-Key（accounts.middleware.IdempotencyMiddleware、サインアップ・ログインなどの再送対策）
+IDEMPOTENCY_PATHS = ['/api/accounts/']  # 対象の POST のパス（前方一致）
+IDEMPOTENCY_EXCLUDED_PATHS = ['/api/accounts/login/']  # 対象外のパス（前方一致。トークンを返す応答は保存しない）
+IDEMPOTENCY_CACHE = "idempotency"  # 応答を保存する CACHES のエイリアス
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # 応答を保存する秒数（この間の再送に同じ応答を返す）
+IDEMPOTENCY_LOCK_SECONDS = 30  # 実行中の印の有効秒数（処理中にプロセスが落ちても、この秒数後に再実行できる）
+IDEMPOTENCY_WAIT_SECONDS = 10  # 非同期版: 実行中の同じキーの完了を待つ上限（超えたら 409）
+IDEMPOTENCY_RETRY_AFTER = 1  # 実行中の同じキーへの 409 に付ける Retry-After（秒。同期版は待たずにすぐ返す）
+
+# 同時実行数の制限（accounts.middleware.AdmissionControlMiddleware、パスワードのハッシュ化を伴う API）
+# 上限と待ち行列はプロセスごと。上限 + 待ち行列の合計をワーカーのスレッド数より小さくすると、
+# ログインが殺到しても他のエンドポイントを処理するスレッドが残る
+ADMISSION_PATHS = ['/api/accounts/login/', '/api/accounts/signup/']  # 対象の POST のパス（前方一致）
+ADMISSION_MAX_CONCURRENT = None  # 同時実行数（None で PASSWORD_HASH_WORKERS、未指定なら CPU 数）
+ADMISSION_MAX_QUEUE = None  # 待ち行列の長さ（None で同時実行数の 2 倍、満杯なら 503）
+ADMISSION_QUEUE_TIMEOUT = 2.0  # 待ち行列で待つ上限の秒数（超えたら 503）
+ADMISSION_RETRY_AFTER = 1  # 503 の Retry-After（秒）
+
+# 未認証アカウントの期限（process_pending_accounts expire の既定値、日数）
+PENDING_ACCOUNT_EXPIRE_DAYS = 7
+
+# 従業員名簿・顧客一覧 API（accounts.api.pagination.KeysetPagination）の 1 ページの件数
+DIRECTORY_PAGE_SIZE = 50  # ?limit= を省略したとき
+DIRECTORY_MAX_PAGE_SIZE = 200  # ?limit= の上限
+
+# プロフィール検索 API（accounts.search）
+SEARCH_PAGE_SIZE = 20  # ?limit= を省略したときの件数
+SEARCH_MAX_RESULTS = 1000  # ページ送りでたどれる件数の上限（関連度順は深いページほど重いため）
+
+# ユーザーのエクスポート（accounts.export_service、API と export_users コマンド）
+EXPORT_CHUNK_SIZE = 2000  # データベースから 1 回に読み出す行数（= レスポンスに 1 回で書き出す行数）
+
+# アバター画像（accounts.avatar_service、縮小版は process_avatars コマンドで生成）
+AVATAR_MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # アップロードできる最大バイト数
+AVATAR_MAX_PIXELS = 4096 * 4096  # 元画像の最大画素数
+AVATAR_VARIANT_SIZES = (64, 256)  # 縮小版（正方形の WebP）の辺の長さ
+AVATAR_WEBP_QUALITY = 80  # 縮小版の WebP の品質
+AVATAR_MAX_ATTEMPTS = 3  # 縮小版の生成の最大試行回数
+AVATAR_BACKOFF_SECONDS = 30  # 再試行間隔の初期値（試行ごとに倍増）
+AVATAR_LEASE_SECONDS = 300  # ワーカーが取得した行のロック期限
+
+# accounts API を非同期ビュー（accounts/api/async_views.py）で提供するか（ASGI 運用時に True）
+ACCOUNTS_API_ASYNC = config("ACCOUNTS_API_ASYNC", default=False, cast=bool)
+
+# リクエスト計測（accounts.middleware.RequestTimingMiddleware）
+REQUEST_TIMING_SAMPLE_RATE = config("REQUEST_TIMING_SAMPLE_RATE", default=0.1, cast=float)  # 計測するリクエストの割合
+REQUEST_TIMING_HEADER = True  # 計測したリクエストに Server-Timing ヘッダーを付ける
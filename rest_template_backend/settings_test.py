@@ -0,0 +1,15 @@
+"""
+テスト用の設定（settings を読み込み、テストで使うデータベースを追加する）。
+
+    python manage.py test accounts --settings=rest_template_backend.settings_test
+    DJANGO_SETTINGS_MODULE=rest_template_backend.settings_test pytest
+
+replica・shard1・shard2 は、テストで REPLICA_DATABASES / USER_SHARDS を差し替えて使う。
+replica は複製されない別のデータベースなので、レプリカに届く前の読み取りを再現できる。
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+for _alias in ('replica', 'shard1', 'shard2'):
+    DATABASES.setdefault(_alias, {**DATABASES['default'], 'TEST': {}})
@@ -14,9 +14,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path
+from django.conf import settings
+from django.conf.urls.static import static
+from django.urls import include, path
+
+# ASGI で運用する場合は ACCOUNTS_API_ASYNC=True で非同期ビュー版の API を使う
+ACCOUNTS_API_URLCONF = (
+    'accounts.api.async_urls' if getattr(settings, 'ACCOUNTS_API_ASYNC', False) else 'accounts.api.urls'
+)
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('api/accounts/', include(ACCOUNTS_API_URLCONF)),
 ]
+
+# API 専用プロファイル（API_ONLY=True）では管理画面を読み込まない
+if not getattr(settings, 'API_ONLY', False):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
+# 開発時（DEBUG=True）のアップロードファイルの配信。本番は Web サーバーから MEDIA_ROOT を配信する
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)